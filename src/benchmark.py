@@ -0,0 +1,127 @@
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+from config.config import Config
+from src.graph_generator.schema_parser import SchemaParser
+from src.graph_generator.graph_generator import GraphGenerator
+from fca.context_builder import ContextBuilder
+from fca.signature_lattice import build_signature_lattice
+from fca.bitset_lattice import BitsetConceptLattice
+from fcapy.lattice import ConceptLattice
+from utils.logger import setup_logger
+
+
+def lattice_summary(lattice):
+    """
+    Summarizes a concept lattice for comparing the results of different backends.
+
+    :param lattice: A fcapy ConceptLattice or a BitsetConceptLattice.
+    :return: A list of (extent, intent, children) tuples in concept order.
+    """
+    return [(tuple(concept.extent), tuple(concept.intent), sorted(lattice.children_dict[i]))
+            for i, concept in enumerate(lattice)]
+
+
+def time_lattice(compute):
+    """
+    Measures the time needed to compute a concept lattice.
+
+    :param compute: A function computing the lattice.
+    :return: A tuple of the lattice and the elapsed seconds.
+    """
+    start = time.perf_counter()
+    lattice = compute()
+    return lattice, time.perf_counter() - start
+
+
+def benchmark_instance(config, schema_parser, entity, signature_context, worker_counts):
+    """
+    Generates a graph for a schema and computes the concept lattice of its nodes or edges with both backends, and
+    with the cbo backend for every worker count.
+
+    :param config: The configuration used for the graph generation.
+    :param schema_parser: The SchemaParser holding the parsed schema.
+    :param entity: Either NODE or EDGE.
+    :param signature_context: Whether the context is built over signatures instead of elements.
+    :param worker_counts: The numbers of processes the parallel cbo backend is measured with.
+    :return: A tuple of the number of context objects, the number of concepts, the fcapy time, the cbo time, the
+             parallel cbo times and whether all lattices are equal.
+    """
+    random.seed(0)
+    graph_data = GraphGenerator(schema_parser, config).generate_graph()
+
+    if entity == "NODE":
+        context_builder = ContextBuilder(config.get("node_type_extraction"))
+        elements = graph_data.nodes.values()
+    else:
+        context_builder = ContextBuilder(config.get("edge_type_extraction"))
+        elements = graph_data.edges.values()
+    for element in elements:
+        context_builder.add_element(element)
+
+    if signature_context:
+        (context, fcapy_lattice, _), fcapy_time = time_lattice(
+            lambda: build_signature_lattice(context_builder, "fcapy"))
+        (_, cbo_lattice, _), cbo_time = time_lattice(lambda: build_signature_lattice(context_builder, "cbo"))
+        parallel_results = [time_lattice(lambda: build_signature_lattice(context_builder, "cbo", workers=workers)[1])
+                            for workers in worker_counts]
+    else:
+        context = context_builder.to_formal_context()
+        fcapy_lattice, fcapy_time = time_lattice(lambda: ConceptLattice.from_context(context))
+        cbo_lattice, cbo_time = time_lattice(lambda: BitsetConceptLattice.from_context(context))
+        parallel_results = [time_lattice(lambda: BitsetConceptLattice.from_context(context, workers=workers))
+                            for workers in worker_counts]
+
+    summary = lattice_summary(fcapy_lattice)
+    is_equal = summary == lattice_summary(cbo_lattice) and \
+        all(summary == lattice_summary(lattice) for lattice, _ in parallel_results)
+    parallel_times = [parallel_time for _, parallel_time in parallel_results]
+    return context.n_objects, len(cbo_lattice), fcapy_time, cbo_time, parallel_times, is_equal
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the concept lattice backends')
+    parser.add_argument('--config', type=str, help='Path to config file', default='config\\config.json')
+    parser.add_argument('--instances', type=str, help='Directory with the schemas to benchmark',
+                        default='../experiments/time_measurement/instances')
+    parser.add_argument('--entities', type=int, help='Number of elements generated per type', default=1000)
+    parser.add_argument('--signature_context', action='store_true',
+                        help='Build the contexts over signatures instead of elements')
+    parser.add_argument('--workers', type=str, help='Comma separated worker counts of the parallel cbo backend',
+                        default='')
+    args, config_overrides = parser.parse_known_args()
+    # The remaining arguments override config values
+    sys.argv = sys.argv[:1] + config_overrides
+
+    logger = setup_logger('FCA Schema Discovery Benchmark', 'fca_schema_discovery_benchmark.log')
+    config = Config(logger, args.config)
+    config.config["graph_generator_min_entities"] = args.entities
+    config.config["graph_generator_max_entities"] = args.entities
+
+    worker_counts = [int(workers) for workers in args.workers.split(',') if workers]
+    worker_columns = "".join(f"cbo_{workers}_seconds,speedup_{workers}," for workers in worker_counts)
+    print(f"instance,entity,objects,concepts,fcapy_seconds,cbo_seconds,speedup,{worker_columns}equal")
+    for schema_path in sorted(glob.glob(os.path.join(args.instances, '*.pgs'))):
+        with open(schema_path, 'r') as file:
+            schema_parser = SchemaParser(config, file.read())
+        try:
+            schema_parser.parse_schema()
+        except ValueError as e:
+            logger.warning(f"Skipping {schema_path}: {e}")
+            continue
+        for entity in ["NODE", "EDGE"]:
+            n_objects, n_concepts, fcapy_time, cbo_time, parallel_times, is_equal = benchmark_instance(
+                config, schema_parser, entity, args.signature_context, worker_counts)
+            # The speedup of the parallel backend is measured against the single process cbo backend
+            parallel_values = "".join(f"{parallel_time:.4f},{cbo_time / max(parallel_time, 1e-9):.1f},"
+                                      for parallel_time in parallel_times)
+            print(f"{os.path.basename(schema_path)},{entity},{n_objects},{n_concepts},{fcapy_time:.4f},"
+                  f"{cbo_time:.4f},{fcapy_time / max(cbo_time, 1e-9):.1f},{parallel_values}{is_equal}")
+
+
+if __name__ == "__main__":
+    main()
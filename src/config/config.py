@@ -123,10 +123,43 @@ class Config:
             "schema_merge_threshold": float
         }
 
+        optional_fields = {
+            "compact_graph_data": bool,
+            "signature_context": bool,
+            "lattice_backend": str,
+            "iceberg_lattice": bool,
+            "aoc_poset": bool,
+            "lattice_workers": int,
+            "lattice_state_dir": str,
+            "lattice_cache_dir": str,
+            "lattice_cache_size_mb": int,
+            "lattice_concept_budget": int,
+            "lattice_estimation_samples": int,
+            "lattice_budget_action": str,
+            "lattice_visualization": str,
+            "lattice_visualization_max_concepts": int,
+            "lattice_visualization_background": bool,
+            "abstract_type_lsh_min_types": int,
+            "abstract_type_lsh_permutations": int,
+            "neo4j.batch_size": int,
+            "neo4j.parallel_workers": int,
+            "neo4j.signature_extraction": bool,
+            "neo4j.server_side_type_inference": bool,
+            "neo4j_import.import_cmd_path": str,
+            "neo4j_import.directory": str,
+            "neo4j_import.workers": int,
+            "neo4j_import.chunk_size": int,
+            "columnar.nodes_path": str,
+            "columnar.edges_path": str
+        }
+
         allowed_values = {
-            "data_source": ["neo4j"],
+            "data_source": ["neo4j", "neo4j_async", "neo4j_import", "columnar"],
             "node_type_extraction": ["label_based", "property_based", "label_property_based"],
-            "edge_type_extraction": ["label_based", "property_based", "label_property_based"]
+            "edge_type_extraction": ["label_based", "property_based", "label_property_based"],
+            "lattice_backend": ["fcapy", "cbo"],
+            "lattice_budget_action": ["downgrade", "fail"],
+            "lattice_visualization": ["png", "dot", "json", "none"]
         }
 
         if self.get("graph_generator_max_entities") < self.get("graph_generator_min_entities"):
@@ -145,11 +178,28 @@ class Config:
                 errors.append(
                     f"Invalid type for {field}: Expected {expected_type.__name__}, got {type(value).__name__}")
 
+        for field, expected_type in optional_fields.items():
+            value = self.get(field)
+
+            if value is not None and not isinstance(value, expected_type):
+                errors.append(
+                    f"Invalid type for {field}: Expected {expected_type.__name__}, got {type(value).__name__}")
+
         for field, allowed in allowed_values.items():
             value = self.get(field)
+            if value is None and field in optional_fields:
+                continue
             if value not in allowed:
                 errors.append(f"Invalid value for {field}: Expected one of {allowed}, got {value}")
 
+        if self.get("data_source") == "neo4j_import":
+            for field in ["neo4j_import.import_cmd_path", "neo4j_import.directory"]:
+                if not self.get(field):
+                    errors.append(f"{field} is required for data_source neo4j_import.")
+
+        if self.get("data_source") == "columnar" and not self.get("columnar.nodes_path"):
+            errors.append("columnar.nodes_path is required for data_source columnar.")
+
         if errors:
             self.logger.error(errors)
             return False
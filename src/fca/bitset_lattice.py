@@ -0,0 +1,406 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from bitarray import bitarray
+from fcapy.lattice import ConceptLattice
+from fcapy.lattice.formal_concept import FormalConcept
+
+
+def bit_indices(bits):
+    """
+    Returns the positions of the set bits of an integer in ascending order.
+
+    :param bits: The integer bitset.
+    :return: A tuple of bit positions.
+    """
+    if not bits:
+        return ()
+    bit_array = bitarray(endian='little')
+    bit_array.frombytes(bits.to_bytes((bits.bit_length() + 7) // 8, 'little'))
+    return tuple(bit_array.search(1))
+
+
+def fcapy_sort_key(concept):
+    """
+    The order fcapy uses for the concepts of a lattice: descending support, then the comma separated object indices
+    of the extent compared as strings.
+
+    :param concept: A Concept.
+    :return: The sort key.
+    """
+    return -len(concept.extent_i), ','.join(str(g) for g in concept.extent_i)
+
+
+def attribute_extents_of(context):
+    """
+    Returns the extent of every attribute of a formal context as an integer bitset of object indices.
+
+    :param context: A fcapy FormalContext.
+    :return: A list of integer bitsets in attribute order.
+    """
+    n_objects = len(context.object_names)
+    attribute_extents = [bitarray(n_objects, endian='little') for _ in context.attribute_names]
+    for attribute_extent in attribute_extents:
+        attribute_extent.setall(0)
+    for g, row in enumerate(context.data.data):
+        for m in row.itersearch(1):
+            attribute_extents[m][g] = 1
+    return [int.from_bytes(extent.tobytes(), 'little') for extent in attribute_extents]
+
+
+def object_intents_of(context):
+    """
+    Returns the intent of every object of a formal context as an integer bitset of attribute indices.
+
+    :param context: A fcapy FormalContext.
+    :return: A list of integer bitsets in object order.
+    """
+    intents = []
+    intent_of_row = {}
+    for row in context.data.data:
+        # Objects with the same signature have equal rows
+        intent = intent_of_row.get(row)
+        if intent is None:
+            intent = 0
+            for m in row.itersearch(1):
+                intent |= 1 << m
+            intent_of_row[row] = intent
+        intents.append(intent)
+    return intents
+
+
+def intent_of(extent, attribute_extents):
+    """
+    Returns the attributes shared by all objects of an extent.
+
+    :param extent: The integer bitset of the objects.
+    :param attribute_extents: The attribute extents as returned by attribute_extents_of.
+    :return: The integer bitset of the attributes.
+    """
+    intent = 0
+    for m, attribute_extent in enumerate(attribute_extents):
+        if attribute_extent & extent == extent:
+            intent |= 1 << m
+    return intent
+
+
+def support_of(extent, weights=None):
+    """
+    Returns the support of an extent.
+
+    :param extent: The integer bitset of the objects.
+    :param weights: An optional list of object weights.
+    :return: The number of objects or the sum of their weights.
+    """
+    if weights is None:
+        return extent.bit_count()
+    return sum(weights[g] for g in bit_indices(extent))
+
+
+def canonical_children(extent, intent, start, attribute_extents, min_support=0, weights=None):
+    """
+    Generates the children of a concept in the Close-by-One search tree: the closures of adding an attribute from
+    start on that pass the canonicity test, skipping extents below min_support.
+
+    :param extent: The integer bitset of the objects of the concept.
+    :param intent: The integer bitset of the attributes of the concept.
+    :param start: The first attribute that may be added.
+    :param attribute_extents: The attribute extents as returned by attribute_extents_of.
+    :param min_support: The minimum support of a concept.
+    :param weights: An optional list of object weights the support is computed with.
+    :return: An iterator over (extent, intent, start) tuples of the children.
+    """
+    for m in range(start, len(attribute_extents)):
+        if intent >> m & 1:
+            continue
+        new_extent = extent & attribute_extents[m]
+        if min_support > 0 and support_of(new_extent, weights) < min_support:
+            continue
+        new_intent = intent_of(new_extent, attribute_extents)
+        # Canonicity test: the closure must not add an attribute before m
+        lower_mask = (1 << m) - 1
+        if new_intent & lower_mask != intent & lower_mask:
+            continue
+        yield new_extent, new_intent, m + 1
+
+
+def close_by_one(extent, intent, start, attribute_extents, min_support=0, weights=None):
+    """
+    Enumerates all concepts in the Close-by-One search tree below a concept, the concept itself excluded.
+
+    :param extent: The integer bitset of the objects of the concept.
+    :param intent: The integer bitset of the attributes of the concept.
+    :param start: The first attribute that may be added.
+    :param attribute_extents: The attribute extents as returned by attribute_extents_of.
+    :param min_support: The minimum support of a concept.
+    :param weights: An optional list of object weights the support is computed with.
+    :return: A list of (extent, intent) tuples.
+    """
+    found = []
+    stack = [(extent, intent, start)]
+    while stack:
+        for child in canonical_children(*stack.pop(), attribute_extents, min_support, weights):
+            found.append(child[:2])
+            stack.append(child)
+    return found
+
+
+def lower_covers(extent, intent, attribute_extents, extents):
+    """
+    Returns the extents of the lower covers of a concept: the maximal extents obtained by adding one more attribute
+    to its intent. Extents containing a frequent extent are frequent, so the extents of an iceberg lattice that are
+    not computed can be left out beforehand.
+
+    :param extent: The integer bitset of the objects of the concept.
+    :param intent: The integer bitset of the attributes of the concept.
+    :param attribute_extents: The attribute extents as returned by attribute_extents_of.
+    :param extents: A set or dict holding the extents of all computed concepts.
+    :return: A list of extents.
+    """
+    candidates = set()
+    for m, attribute_extent in enumerate(attribute_extents):
+        if not intent >> m & 1:
+            candidate = extent & attribute_extent
+            # An attribute no object has can yield the extent of the bottom concept itself
+            if candidate != extent and candidate in extents:
+                candidates.add(candidate)
+    return [candidate for candidate in candidates
+            if not any(candidate != other and candidate & other == candidate for other in candidates)]
+
+
+_worker_state = {}
+
+
+def _init_worker(attribute_extents, min_support, weights):
+    _worker_state.update(attribute_extents=attribute_extents, min_support=min_support, weights=weights)
+
+
+def _close_by_one_task(task):
+    return close_by_one(*task, **_worker_state)
+
+
+def _lower_covers_task(task):
+    concepts, extents = task
+    return [lower_covers(extent, intent, _worker_state["attribute_extents"], extents) for extent, intent in concepts]
+
+
+class Concept:
+    """
+    A formal concept of a BitsetConceptLattice. Offers the extent/intent attributes of fcapy's FormalConcept, with the
+    object and attribute indices in ascending order.
+    """
+    __slots__ = ("extent_i", "extent", "intent_i", "intent", "extent_bits", "intent_bits")
+
+    def __init__(self, extent_bits, intent_bits, object_names, attribute_names):
+        self.extent_bits = extent_bits
+        self.intent_bits = intent_bits
+        self.extent_i = bit_indices(extent_bits)
+        self.extent = tuple(object_names[g] for g in self.extent_i)
+        self.intent_i = bit_indices(intent_bits)
+        self.intent = tuple(attribute_names[m] for m in self.intent_i)
+
+    @property
+    def support(self):
+        return len(self.extent_i)
+
+
+class BitsetConceptLattice:
+    """
+    Concept lattice computed with the Close-by-One algorithm on Python integers used as bitsets, as an alternative to
+    fcapy's ConceptLattice.from_context. Every attribute is represented by the bitset of the objects having it, so
+    closures and the canonicity test are a few integer operations per attribute. Offers the surface of fcapy's
+    ConceptLattice used by TypeExtractor: len, indexing, iteration, children_dict and parents_dict.
+
+    With several workers, the search tree is expanded breadth-first until there are enough subtrees for all of them,
+    and the subtrees and the cover relation are computed in a process pool.
+
+    It can also hold a part of a lattice, an iceberg lattice or an AOC-poset, with the cover relation of that part.
+    """
+    def __init__(self, concepts, children_dict, pruned_bottom=None):
+        """
+        :param concepts: The list of Concepts, the top concept first and the bottom concept last.
+        :param children_dict: A dict mapping each concept index to the indices of its lower covers.
+        :param pruned_bottom: The bottom Concept of the full lattice, if it is not part of the concepts.
+        """
+        self.concepts = concepts
+        self.pruned_bottom = pruned_bottom
+        self.children_dict = {i: frozenset(children) for i, children in children_dict.items()}
+        parents_dict = {i: set() for i in range(len(concepts))}
+        for parent, children in self.children_dict.items():
+            for child in children:
+                parents_dict[child].add(parent)
+        self.parents_dict = {i: frozenset(parents) for i, parents in parents_dict.items()}
+
+    def __len__(self):
+        return len(self.concepts)
+
+    def __getitem__(self, concept_id):
+        return self.concepts[concept_id]
+
+    def __iter__(self):
+        return iter(self.concepts)
+
+    @classmethod
+    def from_context(cls, context, sort_key=fcapy_sort_key, min_support=0, weights=None, workers=1):
+        """
+        Computes all concepts of a formal context with Close-by-One and their cover relation.
+
+        With a min_support, only the frequent concepts (iceberg lattice) and the top concept are computed. As the
+        support can only shrink when attributes are added, the enumeration does not descend below an infrequent
+        concept. The cover relation of the frequent concepts is the same as in the full lattice.
+
+        :param context: A fcapy FormalContext.
+        :param sort_key: A key function ordering the concepts, by default the order of fcapy.
+        :param min_support: The minimum support of a concept.
+        :param weights: An optional list of object weights the support is computed with.
+        :param workers: The number of processes computing the lattice.
+        :return: A BitsetConceptLattice.
+        """
+        object_names = context.object_names
+        attribute_names = context.attribute_names
+        attribute_extents = attribute_extents_of(context)
+
+        all_objects = (1 << len(object_names)) - 1
+        top = (all_objects, intent_of(all_objects, attribute_extents))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(attribute_extents, min_support, weights)) as executor:
+                concepts, covers = cls._parallel_close_by_one(executor, workers, top, attribute_extents, min_support,
+                                                           weights, sort_key, object_names, attribute_names)
+        else:
+            found = [top] + close_by_one(*top, 0, attribute_extents, min_support, weights)
+            concepts = [Concept(extent, intent, object_names, attribute_names) for extent, intent in found]
+            concepts.sort(key=sort_key)
+            extents = frozenset(concept.extent_bits for concept in concepts)
+            covers = [lower_covers(concept.extent_bits, concept.intent_bits, attribute_extents, extents)
+                      for concept in concepts]
+
+        index_by_extent = {concept.extent_bits: i for i, concept in enumerate(concepts)}
+        children_dict = {i: [index_by_extent[child] for child in children] for i, children in enumerate(covers)}
+        return cls(concepts, children_dict, cls._pruned_bottom(context, attribute_extents, index_by_extent))
+
+    @staticmethod
+    def _parallel_close_by_one(executor, workers, top, attribute_extents, min_support, weights, sort_key,
+                               object_names, attribute_names):
+        """
+        Computes the concepts and their lower covers in a process pool.
+
+        :param executor: The ProcessPoolExecutor, initialized with the attribute extents.
+        :param workers: The number of processes.
+        :param top: The (extent, intent) tuple of the top concept.
+        :param attribute_extents: The attribute extents as returned by attribute_extents_of.
+        :param min_support: The minimum support of a concept.
+        :param weights: An optional list of object weights the support is computed with.
+        :param sort_key: A key function ordering the concepts.
+        :param object_names: The object names of the context.
+        :param attribute_names: The attribute names of the context.
+        :return: A tuple of the sorted Concepts and, per concept, the extents of its lower covers.
+        """
+        # The subtrees of the search tree differ a lot in size, so more subtrees than workers are created
+        found = [top]
+        frontier = [(*top, 0)]
+        while frontier and len(frontier) < 4 * workers:
+            frontier = [child for task in frontier
+                        for child in canonical_children(*task, attribute_extents, min_support, weights)]
+            found.extend(child[:2] for child in frontier)
+        for subtree in executor.map(_close_by_one_task, frontier):
+            found.extend(subtree)
+
+        concepts = [Concept(extent, intent, object_names, attribute_names) for extent, intent in found]
+        concepts.sort(key=sort_key)
+        extents = frozenset(concept.extent_bits for concept in concepts)
+        chunk_size = -(-len(concepts) // workers)
+        tasks = [([(concept.extent_bits, concept.intent_bits) for concept in concepts[i:i + chunk_size]], extents)
+                 for i in range(0, len(concepts), chunk_size)]
+        covers = [children for chunk in executor.map(_lower_covers_task, tasks) for children in chunk]
+        return concepts, covers
+
+    @classmethod
+    def aoc_poset_from_context(cls, context, sort_key=fcapy_sort_key, min_support=0, weights=None):
+        """
+        Computes the AOC-poset of a formal context: the object concepts, introducing the intent of an object, and the
+        attribute concepts, introducing an attribute, together with the top concept. Its size is bounded by the number
+        of distinct objects plus the number of attributes, while the full lattice can grow exponentially. The cover
+        relation is the Hasse diagram of the concepts ordered by their extents, and the concepts are ordered like in
+        the full lattice, but numbered consecutively.
+
+        :param context: A fcapy FormalContext.
+        :param sort_key: A key function ordering the concepts, by default the order of fcapy.
+        :param min_support: The minimum support of a concept other than the top concept.
+        :param weights: An optional list of object weights the support is computed with.
+        :return: A BitsetConceptLattice holding the AOC-poset.
+        """
+        object_names = context.object_names
+        attribute_names = context.attribute_names
+        n_objects = len(object_names)
+        attribute_extents = attribute_extents_of(context)
+
+        all_objects = (1 << n_objects) - 1
+        intents = {all_objects: intent_of(all_objects, attribute_extents)}
+        # The intent of an object is closed, its extent are all objects having at least these attributes
+        for row in set(context.data.data):
+            extent = all_objects
+            intent = 0
+            for m in row.itersearch(1):
+                extent &= attribute_extents[m]
+                intent |= 1 << m
+            intents[extent] = intent
+        for attribute_extent in attribute_extents:
+            if attribute_extent not in intents:
+                intents[attribute_extent] = intent_of(attribute_extent, attribute_extents)
+
+        concepts = [Concept(extent, intent, object_names, attribute_names) for extent, intent in intents.items()
+                    if extent == all_objects or min_support <= 0 or support_of(extent, weights) >= min_support]
+        concepts.sort(key=sort_key)
+
+        # A concept below another one is a lower cover unless it is below a bigger lower cover found before
+        by_support = sorted(range(len(concepts)), key=lambda i: -concepts[i].extent_bits.bit_count())
+        children_dict = {}
+        for i, concept in enumerate(concepts):
+            covers = []
+            for j in by_support:
+                extent = concepts[j].extent_bits
+                if extent == concept.extent_bits or extent & concept.extent_bits != extent:
+                    continue
+                if not any(extent & concepts[cover].extent_bits == extent for cover in covers):
+                    covers.append(j)
+            children_dict[i] = covers
+        index_by_extent = {concept.extent_bits: i for i, concept in enumerate(concepts)}
+        return cls(concepts, children_dict, cls._pruned_bottom(context, attribute_extents, index_by_extent))
+
+    @staticmethod
+    def _pruned_bottom(context, attribute_extents, index_by_extent):
+        """
+        Returns the bottom concept of the full lattice if it is not among the computed concepts.
+
+        :param context: The fcapy FormalContext.
+        :param attribute_extents: The attribute extents as returned by attribute_extents_of.
+        :param index_by_extent: A dict mapping the extents of the computed concepts to their indices.
+        :return: The bottom Concept or None.
+        """
+        bottom_extent = (1 << len(context.object_names)) - 1
+        for attribute_extent in attribute_extents:
+            bottom_extent &= attribute_extent
+        if bottom_extent in index_by_extent:
+            return None
+        return Concept(bottom_extent, (1 << len(attribute_extents)) - 1, context.object_names,
+                       context.attribute_names)
+
+    def to_fcapy(self):
+        """
+        Converts the lattice into a fcapy ConceptLattice, e.g. for the visualization. An iceberg lattice or AOC-poset
+        is completed with the bottom concept of the full lattice below its minimal concepts, as fcapy requires a single
+        top and bottom concept.
+
+        :return: The fcapy ConceptLattice.
+        """
+        concepts = [FormalConcept(concept.extent_i, concept.extent, concept.intent_i, concept.intent)
+                    for concept in self.concepts]
+        children_dict = dict(self.children_dict)
+        if self.pruned_bottom is not None:
+            bottom = self.pruned_bottom
+            for i, children in self.children_dict.items():
+                if not children:
+                    children_dict[i] = (len(concepts),)
+            children_dict[len(concepts)] = ()
+            concepts.append(FormalConcept(bottom.extent_i, bottom.extent, bottom.intent_i, bottom.intent))
+        return ConceptLattice(concepts, children_dict=children_dict)
@@ -0,0 +1,176 @@
+from array import array
+
+from bitarray import bitarray, frozenbitarray
+from fcapy.context import FormalContext
+
+from src.graph_type.element_set import ElementIndex
+
+
+class ContextBuilder:
+    """
+    Builds the formal context of nodes or edges incrementally, one graph element at a time. This allows the context
+    rows to be created while the elements are still being extracted.
+
+    Elements with the same attributes share a signature, so the context can also be built over the distinct
+    signatures only, with the number of elements behind each signature as its weight.
+
+    The elements are numbered by an ElementIndex, and the signature of every element is stored in an array at its
+    number. The index is shared with the ElementSets of the lattice, see FCAHelper.
+    """
+    def __init__(self, extraction_mode, element_index=None):
+        """
+        Initializes an empty context builder.
+
+        :param extraction_mode: Either label_based, property_based or label_property_based.
+        :param element_index: An optional empty ElementIndex or an index numbering the elements in the order they are
+                              added, like the StoreElementIndex of a CompactGraphData object.
+        """
+        self.extraction_mode = extraction_mode
+        self.element_index = ElementIndex() if element_index is None else element_index
+        self.element_signatures = array('l')
+        self.weights = {}
+        self.signatures = []
+        self.signature_ids = {}
+        self.labels = set()
+        self.properties = set()
+
+    def add_element(self, element):
+        """
+        Adds a node or edge as an object of the formal context. Its attributes are its labels, its property keys or
+        both, depending on the extraction mode.
+
+        :param element: The node or edge to be added.
+        """
+        attributes = set()
+        if self.extraction_mode == "label_based" or self.extraction_mode == "label_property_based":
+            attributes.update(element.labels)
+        if self.extraction_mode == "property_based" or self.extraction_mode == "label_property_based":
+            attributes.update(element.properties.keys())
+
+        attributes = frozenset(attributes)
+        signature_id = self.signature_ids.get(attributes)
+        if signature_id is None:
+            signature_id = len(self.signatures)
+            self.signature_ids[attributes] = signature_id
+            self.signatures.append(attributes)
+
+        position = self.element_index.number(element.id)
+        if position == len(self.element_signatures):
+            self.element_signatures.append(signature_id)
+        else:
+            self.element_signatures[position] = signature_id
+        if element.weight != 1:
+            self.weights[position] = element.weight
+        else:
+            self.weights.pop(position, None)
+        self.labels.update(element.labels)
+        self.properties.update(element.properties.keys())
+
+    def _columns(self):
+        """
+        Returns the attributes of the context in column order.
+
+        :return: A list of labels and/or properties, or [''] if there are none.
+        """
+        all_labels = sorted(self.labels)
+        all_properties = sorted(self.properties)
+
+        columns = []
+        if self.extraction_mode == "label_based":
+            columns = all_labels
+        elif self.extraction_mode == "property_based":
+            columns = all_properties
+        elif self.extraction_mode == "label_property_based":
+            columns = all_labels + all_properties
+        if not columns:
+            columns = ['']
+        return columns
+
+    def _rows(self, signatures, columns):
+        """
+        Creates one bitarray row per signature. Rows are shared by all objects with the same signature.
+
+        :param signatures: A list of attribute sets.
+        :param columns: The attributes of the context in column order.
+        :return: A list of frozenbitarrays, one per signature.
+        """
+        column_index = {column: i for i, column in enumerate(columns)}
+        rows = []
+        for attributes in signatures:
+            row = bitarray(len(columns))
+            row.setall(0)
+            for attribute in attributes:
+                if attribute in column_index:
+                    row[column_index[attribute]] = 1
+            rows.append(frozenbitarray(row))
+        return rows
+
+    def to_formal_context(self):
+        """
+        Creates the formal context of the added elements. Rows are bitarrays built directly from the signatures.
+
+        :return: A FormalContext with elements as objects and labels/properties as attributes.
+        """
+        columns = self._columns() if self.element_signatures else []
+        signature_rows = self._rows(self.signatures, columns)
+        data = [signature_rows[signature_id] for signature_id in self.element_signatures]
+        object_names = [self.element_index.get_id(position) for position in range(len(self.element_signatures))]
+        return FormalContext(data=data, object_names=object_names, attribute_names=columns)
+
+    def object_weights(self):
+        """
+        Returns the weights of the added elements in the order of the objects of the formal context.
+
+        :return: A list of element weights.
+        """
+        return [self.weights.get(position, 1) for position in range(len(self.element_signatures))]
+
+    def signature_weights(self):
+        """
+        Returns the distinct signatures of the added elements with the summed weight of their elements, without
+        grouping the element ids like group_by_signature.
+
+        :return: A tuple of a list of signatures and a list of their weights.
+        """
+        totals = {}
+        for position, signature_id in enumerate(self.element_signatures):
+            totals[signature_id] = totals.get(signature_id, 0) + self.weights.get(position, 1)
+        signature_ids = sorted(totals)
+        return [self.signatures[signature_id] for signature_id in signature_ids], \
+            [totals[signature_id] for signature_id in signature_ids]
+
+    def group_by_signature(self):
+        """
+        Groups the added elements by their signature.
+
+        :return: A tuple of the ElementIndex numbering the elements, a list holding the signature of every group and,
+                 per group, an array with the numbers of its elements and the summed weight of its elements. Groups
+                 are ordered by their first element.
+        """
+        group_ids = {}
+        signatures = []
+        positions = []
+        weights = []
+        for position, signature_id in enumerate(self.element_signatures):
+            group_id = group_ids.get(signature_id)
+            if group_id is None:
+                group_id = len(signatures)
+                group_ids[signature_id] = group_id
+                signatures.append(self.signatures[signature_id])
+                positions.append(array('q'))
+                weights.append(0)
+            positions[group_id].append(position)
+            weights[group_id] += self.weights.get(position, 1)
+        return self.element_index, signatures, positions, weights
+
+    def to_signature_context(self, signatures):
+        """
+        Creates the formal context over the signatures of the added elements.
+
+        :param signatures: The signatures as returned by group_by_signature.
+        :return: A FormalContext with signature indices as objects and labels/properties as attributes.
+        """
+        columns = self._columns() if signatures else []
+        return FormalContext(data=self._rows(signatures, columns),
+                             object_names=[str(signature_index) for signature_index in range(len(signatures))],
+                             attribute_names=columns)
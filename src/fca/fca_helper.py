@@ -1,11 +1,19 @@
-import pandas as pd
-from fcapy.context import FormalContext
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
 from fcapy.lattice import ConceptLattice
-import matplotlib
+from pyroaring import BitMap
 
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
-from fcapy.visualizer import LineVizNx
+from .context_builder import ContextBuilder
+from .signature_lattice import build_signature_lattice, build_incremental_signature_lattice
+from .incremental_lattice import IncrementalLattice
+from .lattice_cache import LatticeCache
+from .bitset_lattice import BitsetConceptLattice, object_intents_of
+from .lattice_visualizer import save_lattice
+from .lattice_estimation import estimate_lattice_size, lattice_size_bound
+from src.graph_data.compact_graph_data import CompactGraphData, StoreElementIndex
+from src.graph_type.element_set import ElementSet
 
 
 class FCAHelper:
@@ -13,131 +21,399 @@ class FCAHelper:
     Class to generate concept lattices for nodes and edges based ont the given graph data using the fcapy library.
     It also saves a visualization of the concept lattices. It also allows querying sub-concepts and super-concepts
     in these lattices.
+
+    If signature_context is enabled, the lattices are computed over the distinct signatures of the elements instead
+    of the elements themselves, and concept extents are expanded to element ids on request via
+    get_node_concept_extent and get_edge_concept_extent. The expanded extents are ElementSets, roaring bitmaps over
+    the positions of the elements in the context, which share one ElementIndex per lattice.
+
+    The lattices are computed by fcapy or, if lattice_backend is cbo, by the Close-by-One implementation of
+    BitsetConceptLattice. Both number the concepts the same way.
+
+    If iceberg_lattice is enabled, only the concepts with at least type_outlier_threshold elements are computed, as
+    all others would be removed as type outliers anyway. This always uses the Close-by-One implementation.
+
+    If aoc_poset is enabled, only the AOC-poset is computed: the object and attribute concepts with their Hasse
+    diagram. These are the concepts that can hold elements after the elements of subtypes are removed or introduce a
+    label or property, so types are only created for them.
+
+    If lattice_concept_budget is set, the size of a lattice is estimated before it is computed, and if it exceeds the
+    budget, the computation fails or falls back to the iceberg lattice or the AOC-poset, see _plan_lattice.
+
+    With lattice_workers bigger than 1, the Close-by-One enumeration is split across a process pool.
+
+    If lattice_state_dir is set, the signature lattices are maintained incrementally between runs by an
+    IncrementalLattice persisted in that directory. Otherwise, if lattice_cache_dir is set, signature lattices are
+    cached on disk by LatticeCache and only computed for contexts that are not cached yet.
+
+    The lattices are saved as PNG, DOT or JSON file depending on lattice_visualization, see save_lattice.
     """
     def __init__(self, config):
         self.config = config
         self.node_context = None
         self.node_concept_lattice = None
+        self.node_signature_extents = None
+        self.node_element_index = None
         self.edge_context = None
         self.edge_concept_lattice = None
+        self.edge_signature_extents = None
+        self.edge_element_index = None
+        self.visualization_processes = []
+
+    def generate_node_concept_lattice(self, graph_data, context_builder=None):
+        """
+        Generates a concept lattice for nodes of the given graph and saves its visualization.
+
+        :param graph_data: The graph data from which node concept lattices are generated.
+        :param context_builder: An optional ContextBuilder already holding all nodes of the graph.
+        """
+        self.compute_node_concept_lattice(graph_data, context_builder)
+        self.save_node_concept_lattice()
 
-    def generate_node_concept_lattice(self, graph_data):
+    def compute_node_concept_lattice(self, graph_data, context_builder=None):
         """
-        Generates a concept lattice for nodes of the given graph and saves the visualization output as a PNG.
+        Generates a concept lattice for nodes of the given graph without visualizing it.
 
         :param graph_data: The graph data from which node concept lattices are generated.
+        :param context_builder: An optional ContextBuilder already holding all nodes of the graph.
         """
-        node_data = self._create_node_dataframe(graph_data)
-        self.node_context = FormalContext.from_pandas(node_data)
-        self.node_concept_lattice = ConceptLattice.from_context(self.node_context)
+        if context_builder is None:
+            context_builder = self._create_node_context_builder(graph_data)
+        self.node_context, self.node_concept_lattice, self.node_signature_extents = \
+            self._build_lattice(context_builder, "node")
+        self.node_element_index = context_builder.element_index
 
-        fig, ax = plt.subplots(figsize=(10, 5))
-        vsl = LineVizNx()
-        vsl.draw_concept_lattice(self.node_concept_lattice, ax=ax, flg_node_indices=True)
-        ax.set_title('Node Concept Lattice', fontsize=18)
-        plt.tight_layout()
-        plt.savefig(self.config.get("out_dir") + "node_concept_lattice.png")
+    def save_node_concept_lattice(self):
+        """
+        Saves the visualization of the node concept lattice in the configured lattice_visualization format.
+        """
+        self._save_lattice_visualization(self.node_concept_lattice, 'Node Concept Lattice', "node_concept_lattice",
+                                         self.node_signature_extents)
+
+    def generate_edge_concept_lattice(self, graph_data, context_builder=None):
+        """
+        Generates a concept lattice for edges of the given graph and saves its visualization.
+
+        :param graph_data: The graph data from which edge concept lattices are generated.
+        :param context_builder: An optional ContextBuilder already holding all edges of the graph.
+        """
+        self.compute_edge_concept_lattice(graph_data, context_builder)
+        self.save_edge_concept_lattice()
 
-    def generate_edge_concept_lattice(self, graph_data):
+    def compute_edge_concept_lattice(self, graph_data, context_builder=None):
         """
-        Generates a concept lattice for edges of the given graph and saves the visualization output as a PNG.
+        Generates a concept lattice for edges of the given graph without visualizing it.
 
         :param graph_data: The graph data from which edge concept lattices are generated.
+        :param context_builder: An optional ContextBuilder already holding all edges of the graph.
         """
-        edge_data = self._create_edge_dataframe(graph_data)
-        self.edge_context = FormalContext.from_pandas(edge_data)
-        self.edge_concept_lattice = ConceptLattice.from_context(self.edge_context)
+        if context_builder is None:
+            context_builder = self._create_edge_context_builder(graph_data)
+        self.edge_context, self.edge_concept_lattice, self.edge_signature_extents = \
+            self._build_lattice(context_builder, "edge")
+        self.edge_element_index = context_builder.element_index
 
-        fig, ax = plt.subplots(figsize=(10, 5))
-        vsl = LineVizNx()
-        vsl.draw_concept_lattice(self.edge_concept_lattice, ax=ax, flg_node_indices=True)
-        ax.set_title('Edge Concept Lattice', fontsize=18)
-        plt.tight_layout()
-        plt.savefig(self.config.get("out_dir") + "edge_concept_lattice.png")
+    def save_edge_concept_lattice(self):
+        """
+        Saves the visualization of the edge concept lattice in the configured lattice_visualization format.
+        """
+        self._save_lattice_visualization(self.edge_concept_lattice, 'Edge Concept Lattice', "edge_concept_lattice",
+                                         self.edge_signature_extents)
+
+    def compute_concept_lattices(self, graph_data, node_context_builder=None, edge_context_builder=None):
+        """
+        Generates the node and the edge concept lattice without visualizing them. If lattice_workers is bigger than
+        1, both lattices are computed concurrently, each of them in its own process pool.
 
-    def _create_node_dataframe(self, graph_data):
+        :param graph_data: The graph data from which the concept lattices are generated.
+        :param node_context_builder: An optional ContextBuilder already holding all nodes of the graph.
+        :param edge_context_builder: An optional ContextBuilder already holding all edges of the graph.
+        """
+        if self.config.get("lattice_workers", 1) <= 1:
+            self.compute_node_concept_lattice(graph_data, node_context_builder)
+            self.compute_edge_concept_lattice(graph_data, edge_context_builder)
+            return
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            node_future = executor.submit(self.compute_node_concept_lattice, graph_data, node_context_builder)
+            edge_future = executor.submit(self.compute_edge_concept_lattice, graph_data, edge_context_builder)
+            node_future.result()
+            edge_future.result()
+
+    def _build_lattice(self, context_builder, entity):
+        """
+        Computes the concept lattice of the elements of a ContextBuilder, over their signatures if signature_context
+        is enabled. If lattice_state_dir is set, the signature lattice of the previous run is loaded from there,
+        updated with the added and removed signatures and persisted again.
+
+        :param context_builder: The ContextBuilder holding all nodes or edges.
+        :param entity: Either node or edge, used in the file name of the persisted lattice.
+        :return: A tuple of the formal context, the concept lattice and the SignatureExtents of the lattice, or None
+                 if the context is built over the elements.
+        """
+        min_support, aoc_poset = self._plan_lattice(context_builder, entity)
+        state_dir = self.config.get("lattice_state_dir", None)
+        if state_dir and self.config.get("signature_context", True) and not aoc_poset:
+            state_path = os.path.join(state_dir, f"{entity}_lattice_state.pkl")
+            incremental_lattice = IncrementalLattice.load(state_path, context_builder.extraction_mode)
+            result = build_incremental_signature_lattice(context_builder, incremental_lattice, min_support)
+            incremental_lattice.save(state_path)
+            return result
+        if self.config.get("signature_context", True):
+            cache = None
+            if self.config.get("lattice_cache_dir", None):
+                cache = LatticeCache(self.config.get("lattice_cache_dir"), self.config.get("lattice_cache_size_mb", 256))
+            return build_signature_lattice(context_builder, self.config.get("lattice_backend", "fcapy"),
+                                           min_support, aoc_poset, self.config.get("lattice_workers", 1), cache)
+        context = context_builder.to_formal_context()
+        return context, self._compute_lattice(context, context_builder, min_support, aoc_poset), None
+
+    def _plan_lattice(self, context_builder, entity):
         """
-       Creates a pandas DataFrame from the node data in the graph based on the extraction mode.
+        Chooses which concepts are computed. Without a lattice_concept_budget, these are the configured ones. With a
+        budget, the size of the configured lattice is estimated on the signature context, see lattice_size_bound and
+        estimate_lattice_size. If it exceeds the budget, a ValueError is raised if lattice_budget_action is fail.
+        Otherwise the computation is downgraded with a logged warning: to the iceberg lattice if its estimate fits
+        into the budget, else to the AOC-poset, whose size is bounded by the number of signatures and attributes.
+
+        :param context_builder: The ContextBuilder holding all nodes or edges.
+        :param entity: Either node or edge, used in the log messages.
+        :return: A tuple of the minimum support of the concepts and whether only the AOC-poset is computed.
+        """
+        min_support = self._min_support()
+        aoc_poset = self.config.get("aoc_poset", False)
+        budget = self.config.get("lattice_concept_budget", 0)
+        if budget <= 0 or aoc_poset:
+            return min_support, aoc_poset
+
+        signatures, weights = context_builder.signature_weights()
+        context = context_builder.to_signature_context(signatures)
+        if lattice_size_bound(context) <= budget:
+            return min_support, aoc_poset
+        samples = self.config.get("lattice_estimation_samples", 100)
+        estimate = estimate_lattice_size(context, samples, min_support, weights)
+        if estimate <= budget:
+            return min_support, aoc_poset
+
+        lattice_name = "iceberg lattice" if min_support > 0 else "concept lattice"
+        message = (f"The {entity} {lattice_name} has an estimated {estimate:.0f} concepts, more than the "
+                   f"lattice_concept_budget of {budget}")
+        if self.config.get("lattice_budget_action", "downgrade") == "fail":
+            raise ValueError(f"{message}.")
+        threshold = self.config.get("type_outlier_threshold", 0)
+        if min_support <= 0 < threshold:
+            iceberg_estimate = estimate_lattice_size(context, samples, threshold, weights)
+            if iceberg_estimate <= budget:
+                self.config.logger.warning(f"{message}. Computing the iceberg lattice with an estimated "
+                                           f"{iceberg_estimate:.0f} concepts instead.")
+                return threshold, False
+        self.config.logger.warning(f"{message}. Computing the AOC-poset with at most "
+                                   f"{len(signatures) + len(context.attribute_names) + 1} concepts instead.")
+        return min_support, True
+
+    def _min_support(self):
+        """
+        Returns the minimum support of the computed concepts.
 
-       :param graph_data: The graph data containing nodes and their properties.
-       :return: A pandas DataFrame with nodes as rows and labels/properties as columns.
-       """
-        nodes = list(graph_data.nodes.values())
+        :return: The type outlier threshold if iceberg_lattice is enabled, otherwise 0.
+        """
+        if self.config.get("iceberg_lattice", False):
+            return self.config.get("type_outlier_threshold", 0)
+        return 0
 
-        all_labels = sorted({label for node in nodes for label in node.labels})
-        all_properties = sorted({key for node in nodes for key in node.properties.keys()})
+    def _compute_lattice(self, context, context_builder, min_support, aoc_poset):
+        """
+        Computes the concept lattice of a formal context with the configured lattice backend.
 
-        extraction_mode = self.config.get("node_type_extraction")
-        columns = []
-        if extraction_mode == "label_based":
-            columns = all_labels
-        elif extraction_mode == "property_based":
-            columns = all_properties
-        elif extraction_mode == "label_property_based":
-            columns = all_labels + all_properties
-        if not columns:
-            columns = ['']
-        data = {node.id: {col: False for col in columns} for node in nodes}
+        :param context: The formal context.
+        :param context_builder: The ContextBuilder the context was created from.
+        :param min_support: The minimum support of the concepts, see _plan_lattice.
+        :param aoc_poset: Whether only the AOC-poset is computed.
+        :return: A fcapy ConceptLattice or a BitsetConceptLattice, holding the AOC-poset if aoc_poset is set.
+        """
+        workers = self.config.get("lattice_workers", 1)
+        if aoc_poset:
+            return BitsetConceptLattice.aoc_poset_from_context(context, min_support=min_support,
+                                                               weights=context_builder.object_weights())
+        if min_support > 0:
+            return BitsetConceptLattice.from_context(context, min_support=min_support,
+                                                     weights=context_builder.object_weights(), workers=workers)
+        if self.config.get("lattice_backend", "fcapy") == "cbo":
+            return BitsetConceptLattice.from_context(context, workers=workers)
+        return ConceptLattice.from_context(context)
+
+    @staticmethod
+    def _extent_set(concept, element_index, signature_extents):
+        """
+        Converts the extent of a concept into an ElementSet.
 
-        for node in nodes:
-            node_data = data[node.id]
+        :param concept: A concept of the lattice.
+        :param element_index: The ElementIndex of the lattice.
+        :param signature_extents: The SignatureExtents of the lattice, or None if the context is built over elements.
+        :return: An ElementSet of element ids.
+        """
+        if signature_extents is None:
+            return ElementSet(element_index, BitMap(concept.extent_i))
+        return ElementSet(element_index, signature_extents.bitmap(concept.extent_i))
 
-            if extraction_mode == "label_based" or extraction_mode == "label_property_based":
-                for label in node.labels:
-                    node_data[label] = True
+    def _save_lattice_visualization(self, lattice, title, file_name, signature_extents):
+        """
+        Saves a concept lattice in the output directory as PNG, DOT or JSON file, depending on lattice_visualization.
+        Lattices with more than lattice_visualization_max_concepts concepts are cut to their upper part. If
+        lattice_visualization_background is enabled, PNGs are rendered in a separate process, see
+        wait_for_visualizations.
+
+        :param lattice: The concept lattice to save.
+        :param title: The title of the figure.
+        :param file_name: The name of the file without extension.
+        :param signature_extents: The SignatureExtents of the lattice, whose weights give the number of elements per
+                                  signature, or None if the context is built over elements.
+        """
+        weights = None if signature_extents is None else signature_extents.weights
+        process = save_lattice(lattice, title, self.config.get("out_dir") + file_name,
+                               self.config.get("lattice_visualization", "png"),
+                               self.config.get("lattice_visualization_max_concepts", 0),
+                               self.config.get("lattice_visualization_background", False), weights)
+        if process is not None:
+            self.visualization_processes.append(process)
+
+    def wait_for_visualizations(self):
+        """
+        Waits until the lattice visualizations rendered in the background are saved.
+        """
+        for process in self.visualization_processes:
+            process.join()
+        self.visualization_processes = []
 
-            if extraction_mode == "property_based" or extraction_mode == "label_property_based":
-                for key in node.properties.keys():
-                    node_data[key] = True
+    @staticmethod
+    def _create_element_index(graph_data, entity):
+        """
+        Creates the ElementIndex numbering the nodes or edges of the graph in a ContextBuilder. For a CompactGraphData
+        object, the elements are numbered by their dense index in its store, so that their ids are not copied.
 
-            data[node.id] = node_data
+        :param graph_data: The graph data.
+        :param entity: Either NODE or EDGE.
+        :return: A StoreElementIndex, or None for a new ElementIndex.
+        """
+        if isinstance(graph_data, CompactGraphData):
+            return StoreElementIndex(graph_data.node_store if entity == "NODE" else graph_data.edge_store)
+        return None
 
-        df = pd.DataFrame.from_dict(data, orient='index').fillna(False)
+    def _create_node_context_builder(self, graph_data):
+        """
+        Adds all nodes of the graph to a ContextBuilder based on the extraction mode.
 
-        return df
+        :param graph_data: The graph data containing nodes and their properties.
+        :return: The ContextBuilder.
+        """
+        context_builder = ContextBuilder(self.config.get("node_type_extraction"),
+                                         self._create_element_index(graph_data, "NODE"))
+        for node in graph_data.nodes.values():
+            context_builder.add_element(node)
+        return context_builder
 
-    def _create_edge_dataframe(self, graph_data):
+    def _create_edge_context_builder(self, graph_data):
         """
-        Creates a pandas DataFrame from the edge data in the graph based on the extraction mode.
+        Adds all edges of the graph to a ContextBuilder based on the extraction mode.
 
         :param graph_data: The graph data containing edges and their properties.
-        :return: A pandas DataFrame with edges as rows and labels/properties as columns.
+        :return: The ContextBuilder.
         """
-        edges = list(graph_data.edges.values())
-
-        all_labels = sorted({label for edge in edges for label in edge.labels})
-        all_properties = sorted({key for edge in edges for key in edge.properties.keys()})
-        extraction_mode = self.config.get("edge_type_extraction")
+        context_builder = ContextBuilder(self.config.get("edge_type_extraction"),
+                                         self._create_element_index(graph_data, "EDGE"))
+        for edge in graph_data.edges.values():
+            context_builder.add_element(edge)
+        return context_builder
 
-        columns = []
-        if extraction_mode == "label_based":
-            columns = all_labels
-        elif extraction_mode == "property_based":
-            columns = all_properties
-        elif extraction_mode == "label_property_based":
-            columns = all_labels + all_properties
-        if not columns:
-            columns = ['']
+    def get_node_concept_extent(self, concept_id):
+        """
+        Retrieves the ids of the nodes in the extent of a concept in the node concept lattice.
 
-        data = {edge.id: {col: False for col in columns} for edge in edges}
+        :param concept_id: The ID of the concept in the node concept lattice.
+        :return: An ElementSet of node ids.
+        """
+        return self._extent_set(self.node_concept_lattice[concept_id], self.node_element_index,
+                                self.node_signature_extents)
 
-        for edge in edges:
+    def get_edge_concept_extent(self, concept_id):
+        """
+        Retrieves the ids of the edges in the extent of a concept in the edge concept lattice.
 
-            edge_data = data[edge.id]
+        :param concept_id: The ID of the concept in the edge concept lattice.
+        :return: An ElementSet of edge ids.
+        """
+        return self._extent_set(self.edge_concept_lattice[concept_id], self.edge_element_index,
+                                self.edge_signature_extents)
 
-            if extraction_mode == "label_based" or extraction_mode == "label_property_based":
-                for label in edge.labels:
-                    edge_data[label] = True
+    def get_node_type_extents(self, concept_ids):
+        """
+        Assigns every node to the most specific of the given concepts containing it, see _most_specific_extents.
 
-            if extraction_mode == "property_based" or extraction_mode == "label_property_based":
-                for key in edge.properties.keys():
-                    edge_data[key] = True
+        :param concept_ids: The IDs of the concepts in the node concept lattice that become types.
+        :return: A dict mapping each of the concept IDs to an ElementSet of the node ids assigned to it.
+        """
+        return self._most_specific_extents(self.node_concept_lattice, self.node_context, self.node_element_index,
+                                           self.node_signature_extents, concept_ids)
 
-            data[edge.id] = edge_data
+    def get_edge_type_extents(self, concept_ids):
+        """
+        Assigns every edge to the most specific of the given concepts containing it, see _most_specific_extents.
 
-        df = pd.DataFrame.from_dict(data, orient='index').fillna(False)
+        :param concept_ids: The IDs of the concepts in the edge concept lattice that become types.
+        :return: A dict mapping each of the concept IDs to an ElementSet of the edge ids assigned to it.
+        """
+        return self._most_specific_extents(self.edge_concept_lattice, self.edge_context, self.edge_element_index,
+                                           self.edge_signature_extents, concept_ids)
 
-        return df
+    @staticmethod
+    def _most_specific_extents(lattice, context, element_index, signature_extents, concept_ids):
+        """
+        Assigns the elements of a lattice to the most specific of the given concepts containing them, i.e. to the
+        concepts that have no subconcept among the given ones containing the element as well. An element belongs to
+        the concepts whose intent is a subset of its own intent, so these are the concepts with a maximal intent among
+        them. The intent of an element is the intent of its object concept, which is the only most specific concept
+        if it is among the given ones. Elements with the same intent are assigned together, so every element is
+        visited once.
+
+        :param lattice: The concept lattice.
+        :param context: The formal context of the lattice.
+        :param element_index: The ElementIndex of the lattice.
+        :param signature_extents: The SignatureExtents of the lattice, or None if the context is built over elements.
+        :param concept_ids: The IDs of the concepts the elements are assigned to.
+        :return: A dict mapping each of the concept IDs to an ElementSet of the element ids assigned to it.
+        """
+        intents = {}
+        concept_of_intent = {}
+        for concept_id in concept_ids:
+            intent = 0
+            for m in lattice[concept_id].intent_i:
+                intent |= 1 << m
+            intents[concept_id] = intent
+            concept_of_intent[intent] = concept_id
+
+        objects_by_intent = defaultdict(list)
+        for g, object_intent in enumerate(object_intents_of(context)):
+            objects_by_intent[object_intent].append(g)
+
+        objects_of_concept = {concept_id: [] for concept_id in intents}
+        for object_intent, objects in objects_by_intent.items():
+            if object_intent in concept_of_intent:
+                most_specific = [concept_of_intent[object_intent]]
+            else:
+                # The object concept is no type, e.g. in an iceberg lattice or if it was removed as type outlier
+                containing = [concept_id for concept_id, intent in intents.items()
+                              if intent & object_intent == intent]
+                most_specific = [concept_id for concept_id in containing
+                                 if not any(other_id != concept_id
+                                            and intents[other_id] & intents[concept_id] == intents[concept_id]
+                                            for other_id in containing)]
+            for concept_id in most_specific:
+                objects_of_concept[concept_id].extend(objects)
+
+        if signature_extents is None:
+            return {concept_id: ElementSet(element_index, BitMap(objects))
+                    for concept_id, objects in objects_of_concept.items()}
+        return {concept_id: ElementSet(element_index, signature_extents.bitmap(objects))
+                for concept_id, objects in objects_of_concept.items()}
 
     def get_node_sub_super_concepts(self, concept_id):
         """
@@ -0,0 +1,316 @@
+import os
+import pickle
+
+from .bitset_lattice import BitsetConceptLattice, Concept, attribute_extents_of, bit_indices, lower_covers, \
+    support_of
+
+
+class IncrementalLattice:
+    """
+    Concept lattice over element signatures that is maintained incrementally instead of being recomputed. New
+    signatures are inserted with the AddIntent algorithm, which only visits the concepts above the new object
+    concept. Signatures that no longer occur are removed by deleting the concepts whose extent is no longer closed
+    and recomputing the lower covers of their parents. The lattice can be persisted between runs, so that the work
+    of a run depends on the signatures that were added or removed since the previous one.
+
+    Objects and attributes are numbered in the order they are first seen. Concepts are stored by id with integer
+    bitsets as extent and intent and are only numbered like in fcapy when converted with to_lattice.
+    """
+    def __init__(self, extraction_mode):
+        """
+        Initializes a lattice without objects, consisting of a single concept.
+
+        :param extraction_mode: The extraction mode of the ContextBuilder the signatures are taken from.
+        """
+        self.extraction_mode = extraction_mode
+        self.attribute_index = {}
+        self.attribute_extents = []
+        self.present_attributes = 0
+        self.object_slots = {}
+        self.object_intents = {}
+        self.free_slots = []
+        self.intents = {0: 0}
+        self.extents = {0: 0}
+        self.parents = {0: set()}
+        self.children = {0: set()}
+        self.bottom = 0
+        self.next_concept_id = 1
+
+    @classmethod
+    def load(cls, path, extraction_mode):
+        """
+        Loads a persisted lattice. A new lattice is returned if there is none or it was built for another extraction
+        mode.
+
+        :param path: The path of the persisted lattice.
+        :param extraction_mode: The extraction mode of the ContextBuilder the signatures are taken from.
+        :return: An IncrementalLattice.
+        """
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                lattice = pickle.load(file)
+            if isinstance(lattice, cls) and lattice.extraction_mode == extraction_mode:
+                return lattice
+        return cls(extraction_mode)
+
+    def save(self, path):
+        """
+        Persists the lattice.
+
+        :param path: The path the lattice is written to.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as file:
+            pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def update(self, signatures):
+        """
+        Brings the lattice in line with the given signatures by removing the objects of all other signatures and
+        adding the missing ones.
+
+        :param signatures: The signatures (attribute sets) of the current elements.
+        """
+        current = set(signatures)
+        self.remove_objects([signature for signature in self.object_slots if signature not in current])
+        for signature in signatures:
+            self.add_object(signature)
+
+    def add_object(self, signature):
+        """
+        Adds a signature as object of the lattice with AddIntent.
+
+        :param signature: A set of attribute names.
+        """
+        if signature in self.object_slots:
+            return
+        intent = 0
+        for attribute in signature:
+            if attribute not in self.attribute_index:
+                self.attribute_index[attribute] = len(self.attribute_extents)
+                self.attribute_extents.append(0)
+            intent |= 1 << self.attribute_index[attribute]
+        if intent & ~self.present_attributes:
+            self._extend_bottom(intent & ~self.present_attributes)
+
+        slot = self.free_slots.pop() if self.free_slots else len(self.object_slots)
+        self.object_slots[signature] = slot
+        self.object_intents[slot] = intent
+        for m in bit_indices(intent):
+            self.attribute_extents[m] |= 1 << slot
+
+        # The new object belongs to its object concept and all concepts above it
+        stack = [self._add_intent(intent, self.bottom)]
+        while stack:
+            concept_id = stack.pop()
+            if not self.extents[concept_id] >> slot & 1:
+                self.extents[concept_id] |= 1 << slot
+                stack.extend(self.parents[concept_id])
+
+    def remove_objects(self, signatures):
+        """
+        Removes signatures from the objects of the lattice. Afterwards, concepts sharing their extent with a concept
+        with a bigger intent are deleted, and the lower covers of the concepts above them are recomputed.
+
+        :param signatures: The signatures to remove.
+        """
+        signatures = [signature for signature in signatures if signature in self.object_slots]
+        if not signatures:
+            return
+        removed_objects = 0
+        for signature in signatures:
+            slot = self.object_slots.pop(signature)
+            for m in bit_indices(self.object_intents.pop(slot)):
+                self.attribute_extents[m] &= ~(1 << slot)
+            self.free_slots.append(slot)
+            removed_objects |= 1 << slot
+        for concept_id in self.extents:
+            self.extents[concept_id] &= ~removed_objects
+        self.present_attributes = 0
+        for m, attribute_extent in enumerate(self.attribute_extents):
+            if attribute_extent:
+                self.present_attributes |= 1 << m
+        # Only the bottom concept can hold attributes no object has anymore, without them its extent may grow
+        bottom_extent = 0
+        for slot in self.object_intents:
+            bottom_extent |= 1 << slot
+        for m in bit_indices(self.present_attributes):
+            bottom_extent &= self.attribute_extents[m]
+        self.intents[self.bottom] = self.present_attributes
+        self.extents[self.bottom] = bottom_extent
+
+        # Concepts with the same extent form a chain, its concept with the biggest intent is the closed one. The
+        # bottom concept holds all attributes, so it is closed, and other concepts without objects are not.
+        closed = {self.extents[self.bottom]: self.bottom}
+        deleted = []
+        for concept_id, extent in self.extents.items():
+            if concept_id == self.bottom:
+                continue
+            other_id = closed.get(extent)
+            if not extent or other_id == self.bottom:
+                deleted.append(concept_id)
+            elif other_id is None:
+                closed[extent] = concept_id
+            elif self.intents[concept_id].bit_count() > self.intents[other_id].bit_count():
+                deleted.append(other_id)
+                closed[extent] = concept_id
+            else:
+                deleted.append(concept_id)
+        if not deleted:
+            return
+
+        affected = set()
+        for concept_id in deleted:
+            affected.update(self.parents[concept_id])
+        affected.difference_update(deleted)
+        for concept_id in deleted:
+            for parent_id in self.parents.pop(concept_id):
+                if parent_id in self.children:
+                    self.children[parent_id].discard(concept_id)
+            for child_id in self.children.pop(concept_id):
+                if child_id in self.parents:
+                    self.parents[child_id].discard(concept_id)
+            del self.intents[concept_id]
+            del self.extents[concept_id]
+        for concept_id in affected:
+            children = {closed[extent] for extent in lower_covers(self.extents[concept_id], self.intents[concept_id],
+                                                                   self.attribute_extents, closed)}
+            for child_id in self.children[concept_id] - children:
+                self.parents[child_id].discard(concept_id)
+            for child_id in children - self.children[concept_id]:
+                self.parents[child_id].add(concept_id)
+            self.children[concept_id] = children
+
+    def _extend_bottom(self, new_attributes):
+        """
+        Adds attributes that are not part of the lattice yet. The bottom concept holds all attributes, so a new bottom
+        concept is inserted if objects belong to the current one.
+
+        :param new_attributes: The integer bitset of the new attributes.
+        """
+        self.present_attributes |= new_attributes
+        if self.extents[self.bottom]:
+            bottom = self._create_concept(0, self.present_attributes)
+            self._link(self.bottom, bottom)
+            self.bottom = bottom
+        else:
+            self.intents[self.bottom] = self.present_attributes
+
+    def _add_intent(self, intent, generator):
+        """
+        Returns the concept with the given intent, creating it and all missing concepts above it (AddIntent).
+
+        :param intent: The closed integer bitset of the attributes.
+        :param generator: A concept whose intent contains the given one.
+        :return: The id of the concept.
+        """
+        generator = self._maximal_concept(intent, generator)
+        if self.intents[generator] == intent:
+            return generator
+        new_parents = []
+        for candidate in list(self.parents[generator]):
+            if self.intents[candidate] & intent != self.intents[candidate]:
+                candidate = self._add_intent(self.intents[candidate] & intent, candidate)
+            add_parent = True
+            for parent in list(new_parents):
+                if self.intents[candidate] & self.intents[parent] == self.intents[candidate]:
+                    add_parent = False
+                    break
+                if self.intents[parent] & self.intents[candidate] == self.intents[parent]:
+                    new_parents.remove(parent)
+            if add_parent:
+                new_parents.append(candidate)
+
+        concept_id = self._create_concept(self.extents[generator], intent)
+        for parent in new_parents:
+            self._unlink(parent, generator)
+            self._link(parent, concept_id)
+        self._link(concept_id, generator)
+        return concept_id
+
+    def _maximal_concept(self, intent, generator):
+        """
+        Moves up from a concept as long as a parent still contains the given intent.
+
+        :param intent: The integer bitset of the attributes.
+        :param generator: A concept whose intent contains the given one.
+        :return: The id of the most general concept found whose intent contains the given one.
+        """
+        is_parent_maximal = True
+        while is_parent_maximal:
+            is_parent_maximal = False
+            for parent in self.parents[generator]:
+                if self.intents[parent] & intent == intent:
+                    generator = parent
+                    is_parent_maximal = True
+                    break
+        return generator
+
+    def _create_concept(self, extent, intent):
+        concept_id = self.next_concept_id
+        self.next_concept_id += 1
+        self.extents[concept_id] = extent
+        self.intents[concept_id] = intent
+        self.parents[concept_id] = set()
+        self.children[concept_id] = set()
+        return concept_id
+
+    def _link(self, parent, child):
+        self.children[parent].add(child)
+        self.parents[child].add(parent)
+
+    def _unlink(self, parent, child):
+        self.children[parent].discard(child)
+        self.parents[child].discard(parent)
+
+    def to_lattice(self, context, signatures, sort_key, min_support=0, weights=None):
+        """
+        Converts the lattice into a BitsetConceptLattice over a signature context, numbering its concepts like a
+        lattice computed from scratch.
+
+        :param context: The signature context, see ContextBuilder.to_signature_context.
+        :param signatures: The signatures of the context objects in object order.
+        :param sort_key: A key function ordering the concepts.
+        :param min_support: If bigger than 0, only the concepts with at least this support and the top concept are
+                            kept, as in an iceberg lattice.
+        :param weights: An optional list of object weights the support is computed with.
+        :return: A BitsetConceptLattice.
+        """
+        object_of_slot = {self.object_slots[signature]: g for g, signature in enumerate(signatures)}
+        column_index = {attribute: m for m, attribute in enumerate(context.attribute_names)}
+        column_of_attribute = {bit: column_index[attribute] for attribute, bit in self.attribute_index.items()
+                               if attribute in column_index}
+        all_objects = (1 << len(signatures)) - 1
+        all_attributes = (1 << len(context.attribute_names)) - 1
+
+        concepts = []
+        concept_ids = []
+        for concept_id, extent in self.extents.items():
+            extent = sum(1 << object_of_slot[slot] for slot in bit_indices(extent))
+            if 0 < min_support and extent != all_objects and support_of(extent, weights) < min_support:
+                continue
+            intent = sum(1 << column_of_attribute[m] for m in bit_indices(self.intents[concept_id]))
+            if concept_id == self.bottom and not extent:
+                intent = all_attributes
+            concepts.append(Concept(extent, intent, context.object_names, context.attribute_names))
+            concept_ids.append(concept_id)
+
+        children = {concept_id: self.children[concept_id] for concept_id in concept_ids}
+        # Columns without objects, like the placeholder of a context without attributes, belong to a bottom concept
+        bottom_index = concept_ids.index(self.bottom) if self.bottom in concept_ids else None
+        if bottom_index is not None and concepts[bottom_index].intent_bits != all_attributes and min_support <= 0:
+            concepts.append(Concept(0, all_attributes, context.object_names, context.attribute_names))
+            concept_ids.append(None)
+            children[self.bottom] = {None}
+            children[None] = set()
+
+        order = sorted(range(len(concepts)), key=lambda i: sort_key(concepts[i]))
+        index_of_concept = {concept_ids[i]: index for index, i in enumerate(order)}
+        children_dict = {index: [index_of_concept[child] for child in children[concept_ids[i]]
+                                 if child in index_of_concept]
+                         for index, i in enumerate(order)}
+        concepts = [concepts[i] for i in order]
+        index_by_extent = {concept.extent_bits: i for i, concept in enumerate(concepts)}
+        return BitsetConceptLattice(concepts, children_dict, BitsetConceptLattice._pruned_bottom(
+            context, attribute_extents_of(context), index_by_extent))
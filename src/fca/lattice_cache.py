@@ -0,0 +1,172 @@
+import glob
+import hashlib
+import os
+import pickle
+import tempfile
+from array import array
+
+from .bitset_lattice import BitsetConceptLattice, Concept, attribute_extents_of, bit_indices
+
+CACHE_FORMAT_VERSION = 1
+
+
+class LatticeCache:
+    """
+    On-disk cache of signature concept lattices. A lattice is stored under a hash of its formal context, i.e. the
+    attribute vocabulary and the multiset of signatures, so that rerunning the pipeline on the same graph with
+    different type extraction settings loads the lattice instead of computing it.
+
+    Extents are stored over the signatures in a canonical order, so a cached lattice is found again when the
+    elements are read in another order. As the order of the concepts depends on the element positions, it is only
+    reused if the positions did not change, otherwise the concepts are sorted again. Files are evicted least
+    recently used first once the cache exceeds its size limit.
+    """
+    def __init__(self, directory, max_size_mb):
+        """
+        :param directory: The directory holding the cache files.
+        :param max_size_mb: The maximum size of all cache files in megabytes.
+        """
+        self.directory = directory
+        self.max_size = max_size_mb * 1024 * 1024
+
+    @staticmethod
+    def _canonical_order(signatures):
+        return sorted(range(len(signatures)), key=lambda g: sorted(signatures[g]))
+
+    def key(self, context, signatures, weights, variant):
+        """
+        Hashes a signature context.
+
+        :param context: The signature context.
+        :param signatures: The signatures of the context objects in object order.
+        :param weights: The number of elements of every signature.
+        :param variant: A tuple of the settings the lattice depends on, e.g. whether it is an AOC-poset.
+        :return: The hex digest identifying the lattice.
+        """
+        digest = hashlib.sha256()
+        digest.update(repr((CACHE_FORMAT_VERSION, variant, list(context.attribute_names))).encode())
+        for g in self._canonical_order(signatures):
+            digest.update(repr((sorted(signatures[g]), weights[g])).encode())
+        return digest.hexdigest()
+
+    def _positions_key(self, signatures, positions):
+        digest = hashlib.sha256()
+        for g in self._canonical_order(signatures):
+            digest.update(len(positions[g]).to_bytes(8, 'little'))
+            digest.update(positions[g].tobytes())
+        return digest.digest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.lattice")
+
+    def load(self, key, context, signatures, positions, sort_key):
+        """
+        Loads a cached lattice for a signature context.
+
+        :param key: The key of the context, see key.
+        :param context: The signature context.
+        :param signatures: The signatures of the context objects in object order.
+        :param positions: Per signature, the positions of its elements, see ContextBuilder.group_by_signature.
+        :param sort_key: A key function ordering the concepts.
+        :return: A BitsetConceptLattice, or None if the lattice is not cached.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                version, n_objects, n_attributes, positions_key, extents, intents, offsets, children = \
+                    pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if version != CACHE_FORMAT_VERSION or n_objects != len(signatures) or \
+                n_attributes != len(context.attribute_names):
+            return None
+        os.utime(path)
+
+        object_of = self._canonical_order(signatures)
+        extent_bytes = (n_objects + 7) // 8
+        intent_bytes = (n_attributes + 7) // 8
+        concepts = []
+        for i in range(len(offsets) - 1):
+            extent = int.from_bytes(extents[i * extent_bytes:(i + 1) * extent_bytes], 'little')
+            intent = int.from_bytes(intents[i * intent_bytes:(i + 1) * intent_bytes], 'little')
+            extent = sum(1 << object_of[position] for position in bit_indices(extent))
+            concepts.append(Concept(extent, intent, context.object_names, context.attribute_names))
+
+        is_sorted = positions_key == self._positions_key(signatures, positions)
+        if is_sorted:
+            order = range(len(concepts))
+        else:
+            order = sorted(range(len(concepts)), key=lambda i: sort_key(concepts[i]))
+        new_index = {old_index: index for index, old_index in enumerate(order)}
+        children_dict = {new_index[i]: [new_index[child] for child in children[offsets[i]:offsets[i + 1]]]
+                         for i in range(len(concepts))}
+        concepts = [concepts[i] for i in order]
+        index_by_extent = {concept.extent_bits: i for i, concept in enumerate(concepts)}
+        lattice = BitsetConceptLattice(concepts, children_dict, BitsetConceptLattice._pruned_bottom(
+            context, attribute_extents_of(context), index_by_extent))
+        if not is_sorted:
+            # The next run most likely reads the elements in the same order again
+            self.store(key, lattice, context, signatures, positions)
+        return lattice
+
+    def store(self, key, lattice, context, signatures, positions):
+        """
+        Writes a lattice to the cache and evicts the least recently used files if the cache is too big.
+
+        :param key: The key of the context, see key.
+        :param lattice: The concept lattice, a fcapy ConceptLattice or a BitsetConceptLattice.
+        :param context: The signature context.
+        :param signatures: The signatures of the context objects in object order.
+        :param positions: Per signature, the positions of its elements, see ContextBuilder.group_by_signature.
+        """
+        position_of = {g: position for position, g in enumerate(self._canonical_order(signatures))}
+        n_objects = len(signatures)
+        n_attributes = len(context.attribute_names)
+        extent_bytes = (n_objects + 7) // 8
+        intent_bytes = (n_attributes + 7) // 8
+        extents = bytearray()
+        intents = bytearray()
+        offsets = array('q', [0])
+        children = array('q')
+        for i, concept in enumerate(lattice):
+            extent = sum(1 << position_of[g] for g in concept.extent_i)
+            extents += extent.to_bytes(extent_bytes, 'little')
+            intents += sum(1 << m for m in concept.intent_i).to_bytes(intent_bytes, 'little')
+            children.extend(sorted(lattice.children_dict[i]))
+            offsets.append(len(children))
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        # Written to a temporary file first, so that concurrent runs never read a partially written lattice
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(file_descriptor, 'wb') as file:
+            data = (CACHE_FORMAT_VERSION, n_objects, n_attributes, self._positions_key(signatures, positions),
+                    bytes(extents), bytes(intents), offsets, children)
+            pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+        self._evict(path)
+
+    def _evict(self, keep_path):
+        """
+        Removes the least recently used cache files until the cache fits into its size limit.
+
+        :param keep_path: The file written last, which is never removed.
+        """
+        files = []
+        for path in glob.glob(os.path.join(self.directory, "*.lattice")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total_size <= self.max_size:
+                break
+            if path == keep_path:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
@@ -0,0 +1,51 @@
+import random
+
+from .bitset_lattice import attribute_extents_of, canonical_children, intent_of, object_intents_of
+
+
+def lattice_size_bound(context):
+    """
+    Returns an upper bound on the number of concepts of a formal context. Every intent of a concept with objects is
+    a subset of an object intent, so there are at most as many concepts as subsets of the distinct object intents,
+    plus the bottom concept. The lattice is also bounded by the power sets of the objects and of the attributes.
+
+    :param context: A fcapy FormalContext.
+    :return: The upper bound as integer.
+    """
+    subsets = 1 + sum(1 << intent.bit_count() for intent in set(object_intents_of(context)))
+    return min(subsets, 1 << len(context.object_names), 1 << len(context.attribute_names))
+
+
+def estimate_lattice_size(context, samples=100, min_support=0, weights=None, seed=0):
+    """
+    Estimates the number of concepts of a formal context with Knuth's estimator for the size of a search tree. Every
+    concept is a node of the Close-by-One search tree, so a random path from the top concept, choosing one of the
+    canonical children at every step, yields the unbiased estimate 1 + b1 + b1 * b2 + ..., where bi is the number of
+    children on the i-th level of the path. The estimate is averaged over several paths. With a min_support, the size
+    of the iceberg lattice is estimated.
+
+    :param context: A fcapy FormalContext.
+    :param samples: The number of random paths.
+    :param min_support: The minimum support of a concept.
+    :param weights: An optional list of object weights the support is computed with.
+    :param seed: The seed of the random paths, so that the estimate of a context is reproducible.
+    :return: The estimated number of concepts.
+    """
+    attribute_extents = attribute_extents_of(context)
+    all_objects = (1 << len(context.object_names)) - 1
+    top = (all_objects, intent_of(all_objects, attribute_extents), 0)
+    rng = random.Random(seed)
+    total = 0
+    for _ in range(samples):
+        estimate = 1
+        level_size = 1
+        node = top
+        while True:
+            children = list(canonical_children(*node, attribute_extents, min_support, weights))
+            if not children:
+                break
+            level_size *= len(children)
+            estimate += level_size
+            node = rng.choice(children)
+        total += estimate
+    return total / max(samples, 1)
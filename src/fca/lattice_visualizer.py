@@ -0,0 +1,151 @@
+import json
+import multiprocessing
+
+import matplotlib
+
+# Non-interactive backend, so that lattices can be rendered on headless servers and in worker processes
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from fcapy.lattice import ConceptLattice
+from fcapy.visualizer import LineVizNx
+
+from .bitset_lattice import BitsetConceptLattice
+
+
+def limit_lattice(lattice, max_concepts=0):
+    """
+    Converts a concept lattice into a fcapy ConceptLattice with at most max_concepts concepts. The concepts are
+    ordered by descending support and every parent has a bigger support than its children, so the first concepts
+    form an upper part of the lattice containing all their parents. It is drawn with the first max_concepts - 1
+    concepts and the bottom concept, which is linked to the minimal concepts of that part.
+
+    :param lattice: A fcapy ConceptLattice or a BitsetConceptLattice.
+    :param max_concepts: The maximum number of concepts, 0 for no limit.
+    :return: A tuple of the fcapy ConceptLattice and the ids its concepts have in the given lattice.
+    """
+    if isinstance(lattice, BitsetConceptLattice):
+        lattice = lattice.to_fcapy()
+    if max_concepts <= 0 or len(lattice) <= max_concepts:
+        return lattice, list(range(len(lattice)))
+
+    bottom_id = len(lattice) - 1
+    kept = list(range(max(max_concepts - 1, 1))) + [bottom_id]
+    new_index = {old_index: index for index, old_index in enumerate(kept)}
+    children_dict = {}
+    for old_index in kept[:-1]:
+        children = [new_index[child] for child in lattice.children_dict[old_index] if child in new_index]
+        children_dict[new_index[old_index]] = children or [new_index[bottom_id]]
+    children_dict[new_index[bottom_id]] = []
+    return ConceptLattice([lattice[old_index] for old_index in kept], children_dict=children_dict), kept
+
+
+def extent_size(concept, weights=None):
+    """
+    Returns the number of elements in the extent of a concept.
+
+    :param concept: A concept of the lattice.
+    :param weights: Per object of the lattice, the number of elements it stands for, e.g. the weights of the
+                    SignatureExtents of a signature lattice. None if every object is a single element.
+    :return: The number of elements.
+    """
+    if weights is None:
+        return len(concept.extent_i)
+    return sum(weights[i] for i in concept.extent_i)
+
+
+def lattice_to_dict(lattice, concept_ids, weights=None):
+    """
+    Describes a concept lattice by the intent, extent size and children of every concept.
+
+    :param lattice: A fcapy ConceptLattice.
+    :param concept_ids: The ids the concepts are described with, see limit_lattice.
+    :param weights: The number of elements per object, see extent_size.
+    :return: A dict that can be written as JSON.
+    """
+    return {
+        "concepts": [
+            {
+                "id": concept_ids[i],
+                "intent": list(concept.intent),
+                "extent_size": extent_size(concept, weights),
+                "children": sorted(concept_ids[child] for child in lattice.children_dict[i])
+            }
+            for i, concept in enumerate(lattice)
+        ]
+    }
+
+
+def lattice_to_dot(lattice, concept_ids, title, weights=None):
+    """
+    Describes a concept lattice in the DOT language of Graphviz, with an edge from every concept to its children.
+
+    :param lattice: A fcapy ConceptLattice.
+    :param concept_ids: The ids the concepts are described with, see limit_lattice.
+    :param title: The label of the graph.
+    :param weights: The number of elements per object, see extent_size.
+    :return: The DOT source.
+    """
+    lines = ["digraph lattice {", f"    label={json.dumps(title)};", "    node [shape=box];"]
+    for i, concept in enumerate(lattice):
+        label = f"{concept_ids[i]}\n{', '.join(concept.intent)}\n{extent_size(concept, weights)} elements"
+        lines.append(f"    {concept_ids[i]} [label={json.dumps(label)}];")
+    for i in range(len(lattice)):
+        for child in sorted(lattice.children_dict[i]):
+            lines.append(f"    {concept_ids[i]} -> {concept_ids[child]};")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def render_lattice_png(lattice, concept_ids, title, path):
+    """
+    Draws a concept lattice and saves it as a PNG.
+
+    :param lattice: A fcapy ConceptLattice.
+    :param concept_ids: The ids the concepts are labeled with, see limit_lattice.
+    :param title: The title of the figure.
+    :param path: The path of the PNG file.
+    """
+    fig, ax = plt.subplots(figsize=(10, 5))
+    vsl = LineVizNx()
+    if concept_ids == list(range(len(lattice))):
+        vsl.draw_concept_lattice(lattice, ax=ax, flg_node_indices=True)
+    else:
+        vsl.draw_concept_lattice(lattice, ax=ax, node_label_func=lambda i, _: str(concept_ids[i]))
+    ax.set_title(title, fontsize=18)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close(fig)
+
+
+def save_lattice(lattice, title, path_without_extension, output_format, max_concepts=0, background=False,
+                 weights=None):
+    """
+    Saves a concept lattice as PNG, DOT or JSON file. PNG files can be rendered in a separate process, so that the
+    caller does not wait for the drawing.
+
+    :param lattice: A fcapy ConceptLattice or a BitsetConceptLattice.
+    :param title: The title of the visualization.
+    :param path_without_extension: The path of the output file, the extension is added based on the format.
+    :param output_format: One of png, dot, json or none.
+    :param max_concepts: The maximum number of concepts drawn, see limit_lattice. 0 for no limit.
+    :param background: Whether a PNG is rendered in a separate process.
+    :param weights: The number of elements per object, see extent_size. Used for the extent sizes in DOT and JSON.
+    :return: The started process if the PNG is rendered in the background, otherwise None.
+    """
+    if output_format == "none":
+        return None
+    lattice, concept_ids = limit_lattice(lattice, max_concepts)
+    path = f"{path_without_extension}.{output_format}"
+    if output_format == "json":
+        with open(path, 'w') as file:
+            json.dump(lattice_to_dict(lattice, concept_ids, weights), file, indent=4)
+    elif output_format == "dot":
+        with open(path, 'w') as file:
+            file.write(lattice_to_dot(lattice, concept_ids, title, weights))
+    elif background:
+        process = multiprocessing.Process(target=render_lattice_png, args=(lattice, concept_ids, title, path))
+        process.start()
+        return process
+    else:
+        render_lattice_png(lattice, concept_ids, title, path)
+    return None
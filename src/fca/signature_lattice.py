@@ -0,0 +1,181 @@
+from array import array
+from functools import cmp_to_key
+from heapq import merge
+from itertools import zip_longest
+
+from fcapy.lattice import ConceptLattice
+from pyroaring import BitMap
+
+from .bitset_lattice import BitsetConceptLattice
+
+
+class SignatureExtents:
+    """
+    Maps the extents of a concept lattice computed over element signatures back to the elements. The objects of the
+    lattice are signature indices, the elements behind them are only looked up when an extent is expanded.
+    """
+    def __init__(self, element_index, positions, weights):
+        """
+        :param element_index: The ElementIndex numbering the elements of the context.
+        :param positions: Per signature, an ascending array of the numbers of its elements in element_index.
+        :param weights: Per signature, the summed weight of its elements.
+        """
+        self.element_index = element_index
+        self.positions = positions
+        self.weights = weights
+        self.position_bitmaps = [None] * len(positions)
+
+    def support(self, concept):
+        """
+        Returns the number of elements in the extent of a concept, taking the weights of the elements into account.
+
+        :param concept: A concept of the signature lattice.
+        :return: The weighted support.
+        """
+        return sum(self.weights[signature] for signature in concept.extent_i)
+
+    def element_positions(self, concept):
+        """
+        Returns the positions of the elements in the extent of a concept in ascending order.
+
+        :param concept: A concept of the signature lattice.
+        :return: An iterator over element positions.
+        """
+        return merge(*(self.positions[signature] for signature in concept.extent_i))
+
+    def expand(self, concept):
+        """
+        Expands the extent of a concept to the ids of its elements, in the order the elements were added.
+
+        :param concept: A concept of the signature lattice.
+        :return: A tuple of element ids.
+        """
+        get_id = self.element_index.get_id
+        return tuple(get_id(position) for position in self.element_positions(concept))
+
+    def bitmap(self, signatures):
+        """
+        Returns the positions of the elements of signatures, e.g. of the extent of a concept, as a roaring bitmap. The
+        bitmaps of the signatures are created once and combined with a bitmap union.
+
+        :param signatures: The signature indices.
+        :return: A BitMap of element positions.
+        """
+        for signature in signatures:
+            if self.position_bitmaps[signature] is None:
+                self.position_bitmaps[signature] = BitMap(array('I', self.positions[signature]))
+        return BitMap.union(BitMap(), *(self.position_bitmaps[signature] for signature in signatures))
+
+
+def compare_extents(extents):
+    """
+    Creates a comparison function ordering the concepts of a signature lattice the way fcapy orders the concepts of
+    the element lattice: by descending support and then by the comma separated list of element positions, compared
+    as strings. The position lists are only generated for concepts with equal support, and only as far as needed.
+
+    :param extents: The SignatureExtents of the lattice.
+    :return: A comparison function for two concepts.
+    """
+    def compare(concept_a, concept_b):
+        support_a = extents.support(concept_a)
+        support_b = extents.support(concept_b)
+        if support_a != support_b:
+            return -1 if support_a > support_b else 1
+        # Comparing the positions as string tokens equals comparing the joined strings, as ',' sorts before digits
+        tokens_a = map(str, extents.element_positions(concept_a))
+        tokens_b = map(str, extents.element_positions(concept_b))
+        for token_a, token_b in zip_longest(tokens_a, tokens_b):
+            if token_a == token_b:
+                continue
+            if token_a is None:
+                return -1
+            if token_b is None:
+                return 1
+            return -1 if token_a < token_b else 1
+        return 0
+    return compare
+
+
+def build_signature_lattice(context_builder, backend="fcapy", min_support=0, aoc_poset=False, workers=1,
+                            cache=None):
+    """
+    Computes the concept lattice of a context over the distinct element signatures of a ContextBuilder. Elements with
+    the same signature always share all concepts, so this lattice has the same intents and order as the lattice over
+    the elements, while its size only depends on the number of signatures. The concepts are numbered like in the
+    element lattice, so that type names do not depend on how the lattice was computed.
+
+    :param context_builder: The ContextBuilder holding all elements.
+    :param backend: Either fcapy or cbo, see FCAHelper.
+    :param min_support: If bigger than 0, only the concepts with at least this weighted support and the top concept
+                        are computed, always with the cbo backend. They keep the ids they have in the full lattice,
+                        as all other concepts have a smaller support and are ordered after them.
+    :param aoc_poset: Whether only the AOC-poset is computed instead of the lattice, see
+                      BitsetConceptLattice.aoc_poset_from_context.
+    :param workers: The number of processes computing the lattice with the cbo backend.
+    :param cache: An optional LatticeCache the lattice is loaded from or stored in.
+    :return: A tuple of the signature context, the concept lattice and the SignatureExtents to expand its extents.
+    """
+    element_index, signatures, positions, weights = context_builder.group_by_signature()
+    extents = SignatureExtents(element_index, positions, weights)
+
+    context = context_builder.to_signature_context(signatures)
+    compare = compare_extents(extents)
+    if cache is not None:
+        key = cache.key(context, signatures, weights, (aoc_poset, min_support))
+        lattice = cache.load(key, context, signatures, positions, cmp_to_key(compare))
+        if lattice is None:
+            lattice = _compute_signature_lattice(context, compare, weights, backend, min_support, aoc_poset, workers)
+            cache.store(key, lattice, context, signatures, positions)
+        return context, lattice, extents
+    return context, _compute_signature_lattice(context, compare, weights, backend, min_support, aoc_poset,
+                                               workers), extents
+
+
+def _compute_signature_lattice(context, compare, weights, backend, min_support, aoc_poset, workers):
+    """
+    Computes the concept lattice of a signature context, see build_signature_lattice.
+
+    :param context: The signature context.
+    :param compare: The comparison function ordering the concepts.
+    :param weights: Per signature, the summed weight of its elements.
+    :param backend: Either fcapy or cbo.
+    :param min_support: The minimum weighted support of a concept.
+    :param aoc_poset: Whether only the AOC-poset is computed.
+    :param workers: The number of processes computing the lattice with the cbo backend.
+    :return: The concept lattice.
+    """
+    if aoc_poset:
+        return BitsetConceptLattice.aoc_poset_from_context(context, sort_key=cmp_to_key(compare),
+                                                           min_support=min_support, weights=weights)
+    if backend == "cbo" or min_support > 0:
+        return BitsetConceptLattice.from_context(context, sort_key=cmp_to_key(compare), min_support=min_support,
+                                                 weights=weights, workers=workers)
+
+    lattice = ConceptLattice.from_context(context)
+    concepts = list(lattice)
+    order = sorted(range(len(concepts)), key=cmp_to_key(lambda i, j: compare(concepts[i], concepts[j])))
+    new_index = {old_index: index for index, old_index in enumerate(order)}
+    children_dict = {new_index[old_index]: [new_index[child] for child in lattice.children_dict[old_index]]
+                     for old_index in range(len(concepts))}
+    return ConceptLattice([concepts[old_index] for old_index in order], children_dict=children_dict)
+
+
+def build_incremental_signature_lattice(context_builder, incremental_lattice, min_support=0):
+    """
+    Computes the same concept lattice as build_signature_lattice by updating an IncrementalLattice with the current
+    signatures of a ContextBuilder, so that only added and removed signatures cause work on the lattice.
+
+    :param context_builder: The ContextBuilder holding all elements.
+    :param incremental_lattice: The IncrementalLattice of the previous run, or an empty one.
+    :param min_support: If bigger than 0, only the concepts with at least this weighted support and the top concept
+                        are kept.
+    :return: A tuple of the signature context, the concept lattice and the SignatureExtents to expand its extents.
+    """
+    element_index, signatures, positions, weights = context_builder.group_by_signature()
+    extents = SignatureExtents(element_index, positions, weights)
+
+    context = context_builder.to_signature_context(signatures)
+    incremental_lattice.update(signatures)
+    lattice = incremental_lattice.to_lattice(context, signatures, cmp_to_key(compare_extents(extents)), min_support,
+                                             weights)
+    return context, lattice, extents
@@ -0,0 +1,536 @@
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from collections.abc import Mapping
+
+from .graph_data import GraphData
+from ..graph_type.element_set import ElementIndex
+
+
+def create_graph_data(config):
+    """
+    Creates the graph data object to be filled by an extractor or the graph generator.
+
+    :param config: The configuration.
+    :return: A CompactGraphData object if compact_graph_data is enabled, a GraphData object otherwise.
+    """
+    if config.get("compact_graph_data", False):
+        return CompactGraphData()
+    return GraphData()
+
+
+class ElementStore:
+    """
+    Array-backed storage for the nodes or the edges of a CompactGraphData object. Every element is identified by a
+    dense integer index. Its labels and property types are stored once per distinct signature, the element itself
+    only stores the id of its signature and its weight.
+
+    Element ids of the form prefix + number (e.g. "123", "node_42" or "Person:7") are packed into a single integer
+    from an interned prefix id and the number. Packed ids are looked up by binary search in a sorted copy, elements
+    added since the last sort are kept in a small dict until it is merged. Other ids are kept as strings.
+    """
+    NUMBER_BITS = 40
+    MAX_PREFIXES = 1 << 22
+
+    def __init__(self, is_edge_store=False):
+        self.prefixes = []
+        self.prefix_ids = {}
+        self.keys = array('q')
+        self.sorted_keys = array('q')
+        self.sorted_indices = array('q')
+        self.pending = {}
+        self.irregular_ids = {}
+        self.irregular_index = {}
+        self.signature_ids = array('l')
+        self.weights = array('q')
+        self.signatures = []
+        self.signature_index = {}
+        self.signature_weights = []
+        if is_edge_store:
+            self.start_nodes = array('q')
+            self.end_nodes = array('q')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _pack(self, element_id, create):
+        """
+        Packs an element id into an integer.
+
+        :param element_id: The id of the element.
+        :param create: Whether a new prefix may be interned.
+        :return: The packed id, None if the id cannot be packed and -1 if its prefix is unknown.
+        """
+        split = len(element_id)
+        while split > 0 and element_id[split - 1] in "0123456789":
+            split -= 1
+        digits = element_id[split:]
+        if not digits or (digits[0] == "0" and len(digits) > 1) or len(digits) > 12:
+            return None
+        number = int(digits)
+        if number >= 1 << self.NUMBER_BITS:
+            return None
+        prefix = element_id[:split]
+        prefix_id = self.prefix_ids.get(prefix)
+        if prefix_id is None:
+            if not create:
+                return -1
+            if len(self.prefixes) >= self.MAX_PREFIXES:
+                return None
+            prefix_id = len(self.prefixes)
+            self.prefix_ids[prefix] = prefix_id
+            self.prefixes.append(prefix)
+        return (prefix_id << self.NUMBER_BITS) | number
+
+    def get_id(self, index):
+        """
+        Returns the id of the element with the given index.
+
+        :param index: The dense index of the element.
+        :return: The id of the element.
+        """
+        key = self.keys[index]
+        if key < 0:
+            return self.irregular_ids[index]
+        return self.prefixes[key >> self.NUMBER_BITS] + str(key & ((1 << self.NUMBER_BITS) - 1))
+
+    def get_index(self, element_id):
+        """
+        Returns the index of the element with the given id.
+
+        :param element_id: The id of the element.
+        :return: The dense index of the element or None if there is no such element.
+        """
+        key = self._pack(element_id, False)
+        if key is None:
+            return self.irregular_index.get(element_id)
+        if key < 0:
+            return None
+        index = self.pending.get(key)
+        if index is not None:
+            return index
+        position = bisect_left(self.sorted_keys, key)
+        if position < len(self.sorted_keys) and self.sorted_keys[position] == key:
+            return self.sorted_indices[position]
+        return None
+
+    def merge_pending(self):
+        """
+        Moves the packed ids of the recently added elements into the sorted arrays.
+        """
+        if not self.pending:
+            return
+        sorted_keys = array('q')
+        sorted_indices = array('q')
+        # Only the pending ids are sorted, the sorted arrays are merged with them without building a list of all ids
+        for key, index in merge(zip(self.sorted_keys, self.sorted_indices), sorted(self.pending.items())):
+            sorted_keys.append(key)
+            sorted_indices.append(index)
+        self.sorted_keys = sorted_keys
+        self.sorted_indices = sorted_indices
+        self.pending = {}
+
+    def add(self, element_id, signature, weight):
+        """
+        Adds an element, or replaces the element with the same id.
+
+        :param element_id: The id of the element.
+        :param signature: A tuple of label ids and (property key id, data type id) pairs.
+        :param weight: The number of elements the element stands for.
+        :return: The dense index of the element.
+        """
+        signature_id = self.signature_index.get(signature)
+        if signature_id is None:
+            signature_id = len(self.signatures)
+            self.signature_index[signature] = signature_id
+            self.signatures.append(signature)
+            self.signature_weights.append(0)
+        self.signature_weights[signature_id] += weight
+
+        index = self.get_index(element_id)
+        if index is None:
+            index = len(self.keys)
+            key = self._pack(element_id, True)
+            if key is None:
+                self.keys.append(-1)
+                self.irregular_ids[index] = element_id
+                self.irregular_index[element_id] = index
+            else:
+                self.keys.append(key)
+                self.pending[key] = index
+                # Merging when the pending ids outnumber the sorted ones keeps the total sorting cost low
+                if len(self.pending) >= max(1024, len(self.sorted_keys)):
+                    self.merge_pending()
+            self.signature_ids.append(signature_id)
+            self.weights.append(weight)
+        else:
+            self.signature_weights[self.signature_ids[index]] -= self.weights[index]
+            self.signature_ids[index] = signature_id
+            self.weights[index] = weight
+        return index
+
+
+class StoreElementIndex(ElementIndex):
+    """
+    ElementIndex numbering the elements of an ElementStore by their dense index, so that no id is copied. Ids that
+    are not part of the store are numbered after its elements. The store must not grow while the index is in use.
+    """
+    def __init__(self, store):
+        """
+        Initializes the index.
+
+        :param store: The node or edge store.
+        """
+        super().__init__()
+        store.merge_pending()
+        self.store = store
+        self.size = len(store)
+
+    def __len__(self):
+        return self.size + len(self.ids)
+
+    def number(self, element_id):
+        """
+        Returns the number of an element id, numbering it if it is not part of the index yet.
+
+        :param element_id: The element id.
+        :return: The number of the element id.
+        """
+        number = self.get_number(element_id)
+        if number is None:
+            number = len(self)
+            self.ids.append(element_id)
+            self.numbers[element_id] = number
+        return number
+
+    def get_number(self, element_id):
+        """
+        Returns the number of an element id without numbering it.
+
+        :param element_id: The element id.
+        :return: The number of the element id, or None if it is not part of the index.
+        """
+        index = self.store.get_index(element_id)
+        if index is not None and index < self.size:
+            return index
+        return self.numbers.get(element_id)
+
+    def get_id(self, number):
+        """
+        Returns the element id with the given number.
+
+        :param number: The number of the element id.
+        :return: The element id.
+        """
+        if number < self.size:
+            return self.store.get_id(number)
+        return self.ids[number - self.size]
+
+
+class CompactElement:
+    """
+    Read-only view of a single element of a CompactGraphData object, offering the attributes of a GraphElement.
+    As property values are not kept, properties maps every property key to its data type.
+    """
+    __slots__ = ("_graph_data", "_store", "_index")
+
+    def __init__(self, graph_data, store, index):
+        self._graph_data = graph_data
+        self._store = store
+        self._index = index
+
+    @property
+    def id(self):
+        return self._store.get_id(self._index)
+
+    @property
+    def labels(self):
+        label_names = self._graph_data.label_names
+        return [label_names[label_id] for label_id in self._store.signatures[self._store.signature_ids[self._index]][0]]
+
+    @property
+    def properties(self):
+        key_names = self._graph_data.key_names
+        type_names = self._graph_data.type_names
+        return {key_names[key_id]: type_names[type_id]
+                for key_id, type_id in self._store.signatures[self._store.signature_ids[self._index]][1]}
+
+    @property
+    def property_types(self):
+        return self.properties
+
+    @property
+    def weight(self):
+        return self._store.weights[self._index]
+
+
+class CompactNode(CompactElement):
+    """
+    Read-only view of a node of a CompactGraphData object.
+    """
+    __slots__ = ()
+
+
+class CompactEdge(CompactElement):
+    """
+    Read-only view of an edge of a CompactGraphData object, resolving the dense indices of its endpoints.
+    """
+    __slots__ = ()
+
+    @property
+    def start_node_id(self):
+        return self._graph_data.get_endpoint_id(self._store.start_nodes[self._index])
+
+    @property
+    def end_node_id(self):
+        return self._graph_data.get_endpoint_id(self._store.end_nodes[self._index])
+
+
+class CompactElements(Mapping):
+    """
+    Mapping from element ids to element views, used for the nodes and edges attributes of CompactGraphData so that
+    consumers can access them like the dicts of GraphData.
+    """
+    def __init__(self, graph_data, store, view_class):
+        self._graph_data = graph_data
+        self._store = store
+        self._view_class = view_class
+
+    def __getitem__(self, element_id):
+        self._store.merge_pending()
+        index = self._store.get_index(element_id)
+        if index is None:
+            raise KeyError(element_id)
+        return self._view_class(self._graph_data, self._store, index)
+
+    def __iter__(self):
+        return (self._store.get_id(index) for index in range(len(self._store)))
+
+    def __len__(self):
+        return len(self._store)
+
+    def __contains__(self, element_id):
+        return self._store.get_index(element_id) is not None
+
+    def values(self):
+        return (self._view_class(self._graph_data, self._store, index) for index in range(len(self._store)))
+
+    def items(self):
+        return ((view.id, view) for view in self.values())
+
+
+class CompactGraphData(GraphData):
+    """
+    Memory efficient variant of GraphData. Labels, property keys and data types are interned to small integer ids,
+    element ids are mapped to dense integer indices (see ElementStore) and every element is reduced to the id of its signature (its
+    labels and property types) and its weight, stored in arrays. Edge endpoints are stored as dense node indices.
+    Property values are not kept, their data types are inferred when an element is added.
+
+    The nodes and edges attributes are mappings from element ids to read-only element views, so the consumers of
+    GraphData work unchanged.
+    """
+    def __init__(self):
+        super().__init__()
+        self.label_names = []
+        self.label_ids = {}
+        self.key_names = []
+        self.key_ids = {}
+        self.type_names = []
+        self.type_ids = {}
+        self.unresolved_endpoint_ids = []
+        self.node_store = ElementStore()
+        self.edge_store = ElementStore(is_edge_store=True)
+        self.nodes = CompactElements(self, self.node_store, CompactNode)
+        self.edges = CompactElements(self, self.edge_store, CompactEdge)
+
+    def _intern(self, names, ids, name):
+        """
+        Returns the integer id of a name, assigning the next free id to new names.
+
+        :param names: The list of interned names.
+        :param ids: The dict mapping interned names to their ids.
+        :param name: The name.
+        :return: The id of the name.
+        """
+        name_id = ids.get(name)
+        if name_id is None:
+            name_id = len(names)
+            ids[name] = name_id
+            names.append(name)
+        return name_id
+
+    def _signature(self, element):
+        """
+        Computes the interned signature of an element.
+
+        :param element: The Node or Edge object.
+        :return: A tuple of label ids and (property key id, data type id) pairs, both in the order of the element.
+        """
+        labels = tuple(self._intern(self.label_names, self.label_ids, label) for label in element.labels)
+        property_types = tuple(
+            (self._intern(self.key_names, self.key_ids, prop),
+             self._intern(self.type_names, self.type_ids, GraphData.get_property_data_type(self, element, prop)))
+            for prop in element.properties)
+        return labels, property_types
+
+    def _endpoint_index(self, node_id):
+        """
+        Maps the id of an edge endpoint to its dense node index. Endpoints that are not (yet) part of the graph are
+        stored as negative indices into unresolved_endpoint_ids.
+
+        :param node_id: The id of the node.
+        :return: The index of the endpoint.
+        """
+        index = self.node_store.get_index(node_id)
+        if index is None:
+            self.unresolved_endpoint_ids.append(node_id)
+            index = -len(self.unresolved_endpoint_ids)
+        return index
+
+    def get_endpoint_id(self, index):
+        """
+        Maps an endpoint index as stored by _endpoint_index back to the id of the node.
+
+        :param index: The index of the endpoint.
+        :return: The id of the node.
+        """
+        if index < 0:
+            return self.unresolved_endpoint_ids[-index - 1]
+        return self.node_store.get_id(index)
+
+    def add_node(self, node):
+        """
+        Adds a node to the graph. Only the id, the signature and the weight of the node are kept.
+
+        :param node: The Node object to be added.
+        """
+        self.node_store.add(node.id, self._signature(node), node.weight)
+        if node.weight != 1:
+            self.is_weighted = True
+
+    def add_edge(self, edge):
+        """
+        Adds an edge to the graph. Only the id, the signature, the weight and the endpoint indices of the edge are
+        kept.
+
+        :param edge: The Edge object to be added.
+        """
+        store = self.edge_store
+        index = store.add(edge.id, self._signature(edge), edge.weight)
+        start_node = self._endpoint_index(edge.start_node_id)
+        end_node = self._endpoint_index(edge.end_node_id)
+        if index == len(store.start_nodes):
+            store.start_nodes.append(start_node)
+            store.end_nodes.append(end_node)
+        else:
+            store.start_nodes[index] = start_node
+            store.end_nodes[index] = end_node
+        if edge.weight != 1:
+            self.is_weighted = True
+
+    def count_elements(self, element_ids, entity):
+        """
+        Counts the elements behind the given ids, taking the weight of each element into account.
+
+        :param element_ids: A collection of node or edge IDs.
+        :param entity: Either NODE or EDGE.
+        :return: The number of elements represented by the given ids.
+        """
+        if not self.is_weighted:
+            return len(element_ids)
+        store = self.node_store if entity == "NODE" else self.edge_store
+        store.merge_pending()
+        return sum(store.weights[store.get_index(element_id)] for element_id in element_ids)
+
+    def infer_property_data_types(self):
+        """
+        Infers the most common data type for each property. The data type counts are computed once per signature,
+        visiting the signatures in the order of their first element, which yields the same counts and tie-breaking
+        as counting every element.
+        """
+        for store, type_counts in ((self.node_store, self.node_property_type_counts),
+                                   (self.edge_store, self.edge_property_type_counts)):
+            if type_counts:
+                continue
+            for (_, property_types), weight in zip(store.signatures, store.signature_weights):
+                if weight == 0:
+                    continue
+                for key_id, type_id in property_types:
+                    type_counts[self.key_names[key_id]][self.type_names[type_id]] += weight
+        super().infer_property_data_types()
+
+    def get_property_data_type(self, element, prop):
+        """
+        Returns the data type of a property of the given element, which is stored in its signature.
+
+        :param element: The node or edge.
+        :param prop: The property name.
+        :return: The data type as a string.
+        """
+        return element.property_types[prop]
+
+    def _used_signatures(self, store):
+        """
+        Returns the signatures that at least one element of the store has.
+
+        :param store: The node or edge store.
+        :return: A list of signatures.
+        """
+        used_signature_ids = set(store.signature_ids)
+        return [signature for signature_id, signature in enumerate(store.signatures)
+                if signature_id in used_signature_ids]
+
+    def get_all_node_labels(self):
+        """
+        Retrieves all unique labels from nodes in the graph.
+
+        :return: A set of unique labels across all nodes.
+        """
+        return {self.label_names[label_id] for labels, _ in self._used_signatures(self.node_store)
+                for label_id in labels}
+
+    def get_all_edge_labels(self):
+        """
+        Retrieves all unique labels from edges in the graph.
+
+        :return: A set of unique labels across all edges.
+        """
+        return {self.label_names[label_id] for labels, _ in self._used_signatures(self.edge_store)
+                for label_id in labels}
+
+    def get_all_node_properties(self):
+        """
+        Retrieves all unique property keys from nodes in the graph.
+
+        :return: A set of unique property keys across all nodes.
+        """
+        return {self.key_names[key_id] for _, property_types in self._used_signatures(self.node_store)
+                for key_id, _ in property_types}
+
+    def get_all_edge_properties(self):
+        """
+        Retrieves all unique property keys from edges in the graph.
+
+        :return: A set of unique property keys across all edges.
+        """
+        return {self.key_names[key_id] for _, property_types in self._used_signatures(self.edge_store)
+                for key_id, _ in property_types}
+
+    def is_top_concept_necessary(self, approach, entity):
+        """
+        Checks if there are nodes/edges that have no labels/properties, dependent on the approach and entity.
+        If there exist nodes/edges with no properties/labels than the top concept is necessary.
+
+        @param approach: Extraction approach used.
+        @param entity: Either NODE or EDGE.
+        @return: True if top concept is necessary, False otherwise.
+        """
+        store = self.node_store if entity == "NODE" else self.edge_store
+        for labels, property_types in self._used_signatures(store):
+            if approach == "label_based" and len(labels) == 0:
+                return True
+            if approach == "property_based" and len(property_types) == 0:
+                return True
+            if approach == "label_property_based" and len(labels) == 0 and len(property_types) == 0:
+                return True
+        return False
@@ -7,12 +7,18 @@ from datetime import date, timedelta, time, datetime
 class GraphElement:
     """
     Represents a general element in a graph (can be a node or an edge).
-    Holds an ID, a list of labels, and a dictionary of properties.
+    Holds an ID, a list of labels, and a dictionary of properties. An element can also stand for a whole group of
+    elements sharing the same labels and property types, in which case weight holds the size of the group and
+    property_types the data type of each property.
     """
-    def __init__(self, element_id, labels=None, properties=None):
+    __slots__ = ("id", "labels", "properties", "weight", "property_types")
+
+    def __init__(self, element_id, labels=None, properties=None, weight=1, property_types=None):
         self.id = str(element_id)
         self.labels = labels if labels is not None else []
         self.properties = properties if properties is not None else {}
+        self.weight = weight
+        self.property_types = property_types
 
     def add_label(self, label):
         """
@@ -37,16 +43,21 @@ class Node(GraphElement):
     """
     Represents a node in a graph.
     """
-    def __init__(self, node_id, labels=None, properties=None):
-        super().__init__(node_id, labels, properties)
+    __slots__ = ()
+
+    def __init__(self, node_id, labels=None, properties=None, weight=1, property_types=None):
+        super().__init__(node_id, labels, properties, weight, property_types)
 
 
 class Edge(GraphElement):
     """
    Represents an edge in a graph. Inherits from GraphElement and adds start and end node IDs.
    """
-    def __init__(self, edge_id, start_node_id, end_node_id, labels=None, properties=None):
-        super().__init__(edge_id, labels, properties)
+    __slots__ = ("start_node_id", "end_node_id")
+
+    def __init__(self, edge_id, start_node_id, end_node_id, labels=None, properties=None, weight=1,
+                 property_types=None):
+        super().__init__(edge_id, labels, properties, weight, property_types)
         self.start_node_id = str(start_node_id)
         self.end_node_id = str(end_node_id)
 
@@ -61,6 +72,9 @@ class GraphData:
         self.edges = {}
         self.node_property_data_types = {}
         self.edge_property_data_types = {}
+        self.node_property_type_counts = defaultdict(Counter)
+        self.edge_property_type_counts = defaultdict(Counter)
+        self.is_weighted = False
 
     def add_node(self, node):
         """
@@ -69,6 +83,8 @@ class GraphData:
        :param node: The Node object to be added.
        """
         self.nodes[node.id] = node
+        if node.weight != 1:
+            self.is_weighted = True
 
     def add_edge(self, edge):
         """
@@ -77,6 +93,8 @@ class GraphData:
        :param edge: The Edge object to be added.
        """
         self.edges[edge.id] = edge
+        if edge.weight != 1:
+            self.is_weighted = True
 
     def get_node_by_id(self, node_id):
         """
@@ -96,30 +114,71 @@ class GraphData:
         """
         return self.edges.get(edge_id)
 
-    def infer_property_data_types(self):
+    def count_elements(self, element_ids, entity):
         """
-        Infers the most common data type for each property across all nodes and edges.
+        Counts the elements behind the given ids, taking the weight of each element into account.
+
+        :param element_ids: A collection of node or edge IDs.
+        :param entity: Either NODE or EDGE.
+        :return: The number of elements represented by the given ids.
         """
-        node_property_data_type_dict = defaultdict(list)
-        edge_property_data_type_dict = defaultdict(list)
+        if not self.is_weighted:
+            return len(element_ids)
+        elements = self.nodes if entity == "NODE" else self.edges
+        return sum(elements[element_id].weight for element_id in element_ids)
 
-        for node in self.nodes.values():
-            for prop, val in node.properties.items():
-                node_property_data_type_dict[prop].append(self.infer_data_type(val))
+    def add_property_type_count(self, entity, prop, data_type, count):
+        """
+        Adds to the number of times a property occurs with a data type. Allows data sources to provide the property
+        data type histograms directly, in which case infer_property_data_types does not look at the property values.
 
-        for edge in self.edges.values():
-            for prop, val in edge.properties.items():
-                edge_property_data_type_dict[prop].append(self.infer_data_type(val))
+        :param entity: Either NODE or EDGE.
+        :param prop: The property name.
+        :param data_type: The data type as a string.
+        :param count: The number of occurrences.
+        """
+        if entity == "NODE":
+            self.node_property_type_counts[prop][data_type] += count
+        if entity == "EDGE":
+            self.edge_property_type_counts[prop][data_type] += count
+
+    def infer_property_data_types(self):
+        """
+        Infers the most common data type for each property across all nodes and edges. If no property data type
+        histograms were provided via add_property_type_count, they are counted from the elements first.
+        """
+        if not self.node_property_type_counts:
+            for node in self.nodes.values():
+                for prop in node.properties:
+                    self.node_property_type_counts[prop][self.get_property_data_type(node, prop)] += node.weight
+
+        if not self.edge_property_type_counts:
+            for edge in self.edges.values():
+                for prop in edge.properties:
+                    self.edge_property_type_counts[prop][self.get_property_data_type(edge, prop)] += edge.weight
 
         self.node_property_data_types = {
-            prop: Counter(types).most_common(1)[0][0]
-            for prop, types in node_property_data_type_dict.items()
+            prop: type_counts.most_common(1)[0][0]
+            for prop, type_counts in self.node_property_type_counts.items()
         }
         self.edge_property_data_types = {
-            prop: Counter(types).most_common(1)[0][0]
-            for prop, types in edge_property_data_type_dict.items()
+            prop: type_counts.most_common(1)[0][0]
+            for prop, type_counts in self.edge_property_type_counts.items()
         }
 
+    def get_property_data_type(self, element, prop):
+        """
+        Returns the data type of a property of the given element. Uses the stored property type if the element
+        carries one and infers it from the value otherwise.
+
+        :param element: The node or edge.
+        :param prop: The property name.
+        :return: The data type as a string.
+        """
+        if element.property_types is not None:
+            return element.property_types[prop]
+        return self.infer_data_type(element.properties[prop])
+
     def get_all_node_labels(self):
         """
        Retrieves all unique labels from nodes in the graph.
@@ -173,12 +232,13 @@ class GraphData:
         """
         if isinstance(value, str):
             return "STRING"
+        elif isinstance(value, bool):
+            # Tested before int, as bool is a subclass of int
+            return "BOOLEAN"
         elif isinstance(value, int):
             return "INTEGER"
         elif isinstance(value, float):
             return "FLOAT"
-        elif isinstance(value, bool):
-            return "BOOLEAN"
         elif isinstance(value, list):
             return "LIST"
         elif isinstance(value, dict):
@@ -202,6 +262,26 @@ class GraphData:
         else:
             return "UNKNOWN"
 
+    def map_cypher_type(self, value_type):
+        """
+        Maps a Cypher type name as returned by valueType() to the data type names used by infer_data_type.
+
+        @param value_type: The Cypher type name, e.g. "INTEGER NOT NULL" or "LIST<STRING NOT NULL> NOT NULL".
+        @return: The data type as a string.
+        """
+        if value_type is None:
+            return "UNKNOWN"
+        value_type = value_type.removesuffix(" NOT NULL")
+        if value_type.startswith("LIST"):
+            return "LIST"
+        if value_type.endswith("DATETIME"):
+            return "DATETIME"
+        if value_type.endswith("TIME"):
+            return "TIME"
+        if value_type in ("STRING", "INTEGER", "FLOAT", "BOOLEAN", "MAP", "DATE", "DURATION", "POINT"):
+            return value_type
+        return "UNKNOWN"
+
     def is_top_concept_necessary(self, approach, entity):
         """
         Checks if there are nodes/edges that have no labels/properties, dependent on the approach and entity.
@@ -0,0 +1,93 @@
+import asyncio
+
+from .base_extractor import BaseExtractor
+from neo4j import AsyncGraphDatabase
+from ..graph_data.graph_data import Node, Edge
+
+async def stream_nodes_labels_and_properties(session):
+    query = """
+        MATCH (n)
+        RETURN id(n) AS node_id, labels(n) AS labels, properties(n) AS props
+        """
+    result = await session.run(query)
+    async for record in result:
+        yield record["node_id"], record["labels"], record["props"]
+
+async def stream_edges_labels_and_properties(session):
+    query = """
+            MATCH (start)-[r]->(end)
+            RETURN id(r) AS edge_id, type(r) AS type, properties(r) AS props, id(start) AS start_node_id, id(end) AS end_node_id
+            """
+    result = await session.run(query)
+    async for record in result:
+        yield record["edge_id"], record["type"], record["props"], record["start_node_id"], record["end_node_id"]
+
+
+class AsyncNeo4jExtractor(BaseExtractor):
+    """
+    Class for extracting graph data from a Neo4j database with the asynchronous driver. Records are processed while
+    they are still arriving, so that work depending on the extracted elements can overlap with the network I/O.
+    """
+    def __init__(self, config):
+        super().__init__(config)
+
+    def extract_graph_data(self, node_consumer=None, edge_consumer=None, on_nodes_extracted=None):
+        """
+        Extracts graph data from the Neo4j database and populates the graph_data attribute. Every extracted node and
+        edge is passed to the given consumers as soon as its record arrives and the property data type counts of the
+        graph data are updated along the way.
+
+        :param node_consumer: An optional callable that is called with every extracted Node.
+        :param edge_consumer: An optional callable that is called with every extracted Edge.
+        :param on_nodes_extracted: An optional callable that is run in a worker thread as soon as all nodes are
+                                   extracted, while the edges are still being streamed.
+        :return: The return value of on_nodes_extracted, or None.
+        """
+        return asyncio.run(self._extract_graph_data_async(node_consumer, edge_consumer, on_nodes_extracted))
+
+    async def _extract_graph_data_async(self, node_consumer, edge_consumer, on_nodes_extracted):
+        """
+        Streams nodes and then edges from the database. If on_nodes_extracted is given, it runs in the default
+        executor concurrently with the edge stream.
+
+        :param node_consumer: An optional callable that is called with every extracted Node.
+        :param edge_consumer: An optional callable that is called with every extracted Edge.
+        :param on_nodes_extracted: An optional callable that is run once all nodes are extracted.
+        :return: The return value of on_nodes_extracted, or None.
+        """
+        driver = AsyncGraphDatabase.driver(self.config.get("neo4j.uri"),
+                                           auth=(self.config.get("neo4j.username"), self.config.get("neo4j.password")))
+        async with driver:
+            async with driver.session() as session:
+                async for node_id, labels, props in stream_nodes_labels_and_properties(session):
+                    node = Node(node_id, labels, props)
+                    self.graph_data.add_node(node)
+                    self._count_property_types("NODE", node)
+                    if node_consumer is not None:
+                        node_consumer(node)
+
+            nodes_extracted = None
+            if on_nodes_extracted is not None:
+                nodes_extracted = asyncio.get_running_loop().run_in_executor(None, on_nodes_extracted)
+
+            async with driver.session() as session:
+                async for edge_id, etype, props, start_node_id, end_node_id in stream_edges_labels_and_properties(session):
+                    edge = Edge(edge_id, start_node_id, end_node_id, [etype], props)
+                    self.graph_data.add_edge(edge)
+                    self._count_property_types("EDGE", edge)
+                    if edge_consumer is not None:
+                        edge_consumer(edge)
+
+            if nodes_extracted is not None:
+                return await nodes_extracted
+        return None
+
+    def _count_property_types(self, entity, element):
+        """
+        Adds the data types of the properties of an element to the property data type counts of the graph data.
+
+        :param entity: Either NODE or EDGE.
+        :param element: The extracted node or edge.
+        """
+        for prop, value in element.properties.items():
+            self.graph_data.add_property_type_count(entity, prop, self.graph_data.infer_data_type(value), 1)
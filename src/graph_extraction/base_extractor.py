@@ -1,4 +1,4 @@
-from ..graph_data.graph_data import GraphData
+from ..graph_data.compact_graph_data import create_graph_data
 class BaseExtractor:
     """
     Base class for extracting graph data. This class serves as a blueprint for
@@ -13,7 +13,7 @@ class BaseExtractor:
             config (dict): Configuration settings required for the extractor.
         """
         self.config = config  # Stores configuration settings
-        self.graph_data = GraphData()  # Initializes an empty graph data object
+        self.graph_data = create_graph_data(config)  # Initializes an empty graph data object
 
     def extract_graph_data(self):
         """
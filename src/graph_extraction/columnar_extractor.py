@@ -0,0 +1,213 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .base_extractor import BaseExtractor
+from ..graph_data.graph_data import Node, Edge
+
+IPC_EXTENSIONS = (".arrow", ".feather", ".ipc")
+
+def read_table(path):
+    """
+    Reads a Parquet or Arrow IPC file as a memory mapped Arrow table, the format is chosen by the file extension.
+
+    :param path: The path of the file.
+    :return: The Arrow table.
+    """
+    if path.lower().endswith(IPC_EXTENSIONS):
+        return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return pq.read_table(path, memory_map=True)
+
+def map_arrow_type(arrow_type):
+    """
+    Maps an Arrow data type to the data type names used by GraphData.infer_data_type.
+
+    :param arrow_type: The Arrow data type.
+    :return: The data type as a string.
+    """
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return "STRING"
+    if pa.types.is_boolean(arrow_type):
+        return "BOOLEAN"
+    if pa.types.is_integer(arrow_type):
+        return "INTEGER"
+    if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return "FLOAT"
+    if pa.types.is_list(arrow_type) or pa.types.is_large_list(arrow_type) or pa.types.is_fixed_size_list(arrow_type):
+        return "LIST"
+    if pa.types.is_struct(arrow_type) or pa.types.is_map(arrow_type):
+        return "MAP"
+    if pa.types.is_date(arrow_type):
+        return "DATE"
+    if pa.types.is_time(arrow_type):
+        return "TIME"
+    if pa.types.is_timestamp(arrow_type):
+        return "DATETIME"
+    if pa.types.is_duration(arrow_type):
+        return "DURATION"
+    return "UNKNOWN"
+
+
+class ColumnarExtractor(BaseExtractor):
+    """
+    Class for extracting graph data from node and edge tables stored as Parquet or Arrow IPC files.
+    The node table has the columns id, labels (list of strings) and properties (struct or map), the edge table
+    additionally has start_id and end_id. Rows are never turned into Python objects: the tables are grouped by
+    their labels and property types with Arrow compute functions and every distinct signature is added to the graph
+    data as a single element weighted by the number of rows sharing it, like the signature extraction of the
+    Neo4jExtractor.
+    """
+    def extract_graph_data(self):
+        """
+        Reads the node and edge tables and adds one weighted element per node and edge signature. Edges whose start
+        or end node is not in the node table are dropped with a logged warning.
+        """
+        nodes = read_table(self.config.get("columnar.nodes_path"))
+        node_codes, node_signatures = self._signature_codes(nodes, [])
+        for node_id, (signature, weight) in enumerate(node_signatures.items()):
+            labels, property_types = signature
+            self.graph_data.add_node(Node(node_id, list(labels), {key: None for key, _ in property_types}, weight,
+                                          dict(property_types)))
+
+        edges_path = self.config.get("columnar.edges_path")
+        if not edges_path:
+            return
+        edges = read_table(edges_path)
+        # Resolve the endpoints of every edge to the signature id of the node they point to
+        node_ids = pc.cast(nodes.column("id"), pa.string())
+        endpoint_codes = []
+        for column in ("start_id", "end_id"):
+            rows = pc.index_in(pc.cast(edges.column(column), pa.string()), value_set=node_ids).to_numpy(
+                zero_copy_only=False)
+            endpoint_codes.append(rows)
+        found = ~(np.isnan(endpoint_codes[0]) | np.isnan(endpoint_codes[1]))
+        if not found.all():
+            self.config.logger.warning(f"Dropped {int((~found).sum())} of {len(found)} edges whose start_id or "
+                                       f"end_id matches no node id.")
+            edges = edges.filter(pa.array(found))
+        start_codes = node_codes[endpoint_codes[0][found].astype(np.int64)]
+        end_codes = node_codes[endpoint_codes[1][found].astype(np.int64)]
+        _, edge_signatures = self._signature_codes(edges, [start_codes, end_codes])
+        for edge_id, (signature, weight) in enumerate(edge_signatures.items()):
+            labels, property_types, start_code, end_code = signature
+            self.graph_data.add_edge(Edge(edge_id, start_code, end_code, list(labels),
+                                          {key: None for key, _ in property_types}, weight, dict(property_types)))
+
+    def _signature_codes(self, table, extra_codes):
+        """
+        Groups the rows of a table by their labels, their present properties and the given extra codes.
+
+        :param table: The node or edge table.
+        :param extra_codes: A list of integer arrays with one entry per row that are part of the grouping key, used
+                            for the signature ids of the endpoints of edges.
+        :return: A tuple of an array holding the signature id of every row and a dict mapping each signature to its
+                 number of rows, in the order of the signature ids. A signature is a tuple of sorted labels and
+                 sorted (property, data type) pairs, followed by the extra codes.
+        """
+        key_parts = [self._label_keys(table)]
+        property_columns = self._property_columns(table)
+        for _, _, present in property_columns:
+            key_parts.append(pc.if_else(present, "1", "0"))
+        for codes in extra_codes:
+            key_parts.append(pc.cast(pa.array(codes), pa.string()))
+        if "properties" in table.column_names and pa.types.is_map(table.schema.field("properties").type):
+            key_parts.append(self._map_key_keys(table.column("properties")))
+        keys = pc.binary_join_element_wise(*key_parts, "\x1e") if len(key_parts) > 1 else key_parts[0]
+
+        encoded = pc.dictionary_encode(keys).combine_chunks()
+        row_codes = encoded.indices.to_numpy()
+        counts = np.bincount(row_codes, minlength=len(encoded.dictionary))
+        _, first_rows = np.unique(row_codes, return_index=True)
+
+        # Only one row per distinct key is looked at in Python, equal signatures are merged on the canonical form
+        labels_column = table.column("labels") if "labels" in table.column_names else None
+        signatures = {}
+        signature_ids = {}
+        code_to_signature = np.empty(len(first_rows), dtype=np.int64)
+        for code, row in enumerate(first_rows):
+            labels = self._row_labels(labels_column, row)
+            property_types = [(name, data_type) for name, data_type, present in property_columns
+                              if present[row].as_py()]
+            property_types.extend(self._row_map_property_types(table, row))
+            signature = (tuple(sorted(set(labels))), tuple(sorted(set(property_types))),
+                         *(int(codes[row]) for codes in extra_codes))
+            if signature not in signature_ids:
+                signature_ids[signature] = len(signature_ids)
+                signatures[signature] = 0
+            signatures[signature] += int(counts[code])
+            code_to_signature[code] = signature_ids[signature]
+        return code_to_signature[row_codes], signatures
+
+    def _label_keys(self, table):
+        """
+        Builds a string column joining the labels of every row.
+
+        :param table: The node or edge table.
+        :return: The joined labels, an empty string for rows without labels.
+        """
+        if "labels" not in table.column_names:
+            return pa.array([""] * table.num_rows, pa.string())
+        labels = table.column("labels")
+        if pa.types.is_string(labels.type) or pa.types.is_large_string(labels.type):
+            return pc.fill_null(labels, "")
+        return pc.fill_null(pc.binary_join(labels, "\x1f"), "")
+
+    def _row_labels(self, labels_column, row):
+        """
+        Returns the labels of a single row.
+
+        :param labels_column: The labels column, a list or string column, or None.
+        :param row: The row index.
+        :return: A list of labels.
+        """
+        if labels_column is None:
+            return []
+        value = labels_column[row].as_py()
+        if value is None:
+            return []
+        return [value] if isinstance(value, str) else value
+
+    def _property_columns(self, table):
+        """
+        Determines the properties of a struct properties column, or of the remaining top level columns if the table
+        has no properties column.
+
+        :param table: The node or edge table.
+        :return: A list of (property, data type, presence mask) tuples.
+        """
+        if "properties" in table.column_names:
+            properties = table.column("properties")
+            if not pa.types.is_struct(properties.type):
+                return []
+            return [(field.name, map_arrow_type(field.type), pc.is_valid(pc.struct_field(properties, [i])))
+                    for i, field in enumerate(properties.type)]
+        reserved = ("id", "labels", "start_id", "end_id")
+        return [(field.name, map_arrow_type(field.type), pc.is_valid(table.column(field.name)))
+                for field in table.schema if field.name not in reserved]
+
+    def _map_key_keys(self, properties):
+        """
+        Builds a string column joining the keys of a map properties column.
+
+        :param properties: The map column.
+        :return: The joined keys, an empty string for rows without properties.
+        """
+        properties = properties.combine_chunks()
+        keys = pa.ListArray.from_arrays(properties.offsets, properties.keys)
+        return pc.fill_null(pc.binary_join(keys, "\x1f"), "")
+
+    def _row_map_property_types(self, table, row):
+        """
+        Returns the (property, data type) pairs of a single row of a map properties column. All values of a map share
+        the value type of the map.
+
+        :param table: The node or edge table.
+        :param row: The row index.
+        :return: A list of (property, data type) pairs, empty if the table has no map properties column.
+        """
+        if "properties" not in table.column_names or not pa.types.is_map(table.schema.field("properties").type):
+            return []
+        properties = table.column("properties")
+        data_type = map_arrow_type(properties.type.item_type)
+        return [(key, data_type) for key, _ in properties[row].as_py() or []]
@@ -0,0 +1,281 @@
+import csv
+import ntpath
+import os
+import shlex
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .base_extractor import BaseExtractor
+from ..graph_data.graph_data import Node, Edge
+
+HEADER_DATA_TYPES = {
+    "int": "INTEGER",
+    "long": "INTEGER",
+    "short": "INTEGER",
+    "byte": "INTEGER",
+    "float": "FLOAT",
+    "double": "FLOAT",
+    "boolean": "BOOLEAN",
+    "string": "STRING",
+    "char": "STRING",
+    "point": "POINT",
+    "date": "DATE",
+    "time": "TIME",
+    "localtime": "TIME",
+    "datetime": "DATETIME",
+    "localdatetime": "DATETIME",
+    "duration": "DURATION"
+}
+
+def parse_header_field(field):
+    """
+    Parses a single field of a neo4j-admin import header, e.g. "name:string", ":ID(Person)", ":LABEL" or
+    "somaLocation:point{srid:9157}".
+
+    :param field: The header field.
+    :return: A tuple (name, kind, data_type, group) where kind is one of property, id, label, type, start_id,
+             end_id or ignore.
+    """
+    if "{" in field:
+        # Drop type options such as {srid:9157}, they may contain colons themselves
+        field = field[:field.index("{")]
+    if ":" not in field:
+        return field, "property", "STRING", None
+    name, _, type_spec = field.rpartition(":")
+    group = None
+    if "(" in type_spec and type_spec.endswith(")"):
+        type_spec, _, group = type_spec[:-1].partition("(")
+
+    field_kind = type_spec.upper()
+    if field_kind in ("ID", "LABEL", "TYPE", "START_ID", "END_ID", "IGNORE"):
+        return name, field_kind.lower(), "STRING", group
+    if type_spec.endswith("[]"):
+        return name, "property", "LIST", None
+    return name, "property", HEADER_DATA_TYPES.get(type_spec.lower(), "UNKNOWN"), None
+
+def parse_csv_chunk(path, start, end, header, entity, options):
+    """
+    Parses the lines of a CSV file that start in the byte range [start, end). Runs in a worker process.
+
+    :param path: The path of the CSV file.
+    :param start: The byte offset at which the chunk starts.
+    :param end: The byte offset at which the chunk ends, None for the end of the file.
+    :param header: A list of parsed header fields as returned by parse_header_field.
+    :param entity: Either NODE or EDGE.
+    :param options: A dict with the delimiter, array_delimiter and quote character.
+    :return: For nodes a list of (id, labels, properties) tuples, for edges a list of
+             (type, start_id, end_id, properties) tuples. Ids are already qualified by their id group.
+    """
+    records = []
+    with open(path, "rb") as file:
+        if start > 0:
+            # Skip the rest of the line that started in the previous chunk
+            file.seek(start - 1)
+            file.readline()
+        lines = []
+        while end is None or file.tell() < end:
+            line = file.readline()
+            if not line:
+                break
+            lines.append(line.decode("utf-8"))
+
+    reader = csv.reader(lines, delimiter=options["delimiter"], quotechar=options["quote"])
+    for row in reader:
+        if not row:
+            continue
+        element_id = None
+        start_id = None
+        end_id = None
+        labels = []
+        edge_type = None
+        properties = {}
+        for (name, kind, data_type, group), value in zip(header, row):
+            if kind == "property":
+                if value != "":
+                    properties[name] = value
+            elif kind == "id":
+                element_id = qualify_id(group, value)
+                if name and value != "":
+                    properties[name] = value
+            elif kind == "label":
+                labels.extend(label for label in value.split(options["array_delimiter"]) if label)
+            elif kind == "type":
+                edge_type = value or None
+            elif kind == "start_id":
+                start_id = qualify_id(group, value)
+            elif kind == "end_id":
+                end_id = qualify_id(group, value)
+        if entity == "NODE":
+            records.append((element_id, labels, properties))
+        else:
+            records.append((edge_type, start_id, end_id, properties))
+    return records
+
+def qualify_id(group, value):
+    """
+    Qualifies an id by its id group, since ids only have to be unique within their group.
+
+    :param group: The id group or None for the global id space.
+    :param value: The id as given in the CSV file.
+    :return: The qualified id.
+    """
+    return value if not group else f"{group}:{value}"
+
+
+class CsvImportExtractor(BaseExtractor):
+    """
+    Class for extracting graph data directly from the CSV files of a neo4j-admin database import, without loading
+    them into Neo4j first. The files, labels, relationship types and CSV options are read from the import command.
+    """
+    def __init__(self, config):
+        super().__init__(config)
+        self.options = {"delimiter": ",", "array_delimiter": ";", "quote": '"', "multiline_fields": False}
+
+    def extract_graph_data(self):
+        """
+        Parses the import command and reads all node and relationship files it references. Files are split into
+        chunks of neo4j_import.chunk_size bytes which are parsed in parallel worker processes and added to the
+        graph data in file order.
+        """
+        with open(self.config.get("neo4j_import.import_cmd_path"), 'r') as file:
+            node_sources, relationship_sources = self._parse_import_command(file.read())
+
+        workers = self.config.get("neo4j_import.workers", 0) or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for labels, paths in node_sources:
+                self._read_source(executor, workers, "NODE", labels, paths)
+            for relationship_type, paths in relationship_sources:
+                self._read_source(executor, workers, "EDGE", relationship_type, paths)
+
+    def _parse_import_command(self, command):
+        """
+        Parses a neo4j-admin database import command and sets the CSV options given in it.
+
+        :param command: The import command.
+        :return: A tuple of two lists, containing (labels, paths) for every --nodes option and
+                 (relationship type, paths) for every --relationships option.
+        """
+        node_sources = []
+        relationship_sources = []
+        for token in shlex.split(command, posix=False):
+            if not token.startswith("--") or "=" not in token:
+                continue
+            option, _, value = token[2:].partition("=")
+            value = value.strip('"\'')
+            if option == "nodes":
+                labels, _, paths = value.rpartition("=")
+                node_sources.append(([label for label in labels.split(":") if label], self._resolve_paths(paths)))
+            elif option == "relationships":
+                relationship_type, _, paths = value.rpartition("=")
+                relationship_sources.append((relationship_type or None, self._resolve_paths(paths)))
+            elif option == "delimiter":
+                self.options["delimiter"] = "\t" if value in ("TAB", "\\t") else value
+            elif option == "array-delimiter":
+                self.options["array_delimiter"] = "\t" if value in ("TAB", "\\t") else value
+            elif option == "quote":
+                self.options["quote"] = value
+            elif option == "multiline-fields":
+                self.options["multiline_fields"] = value.lower() == "true"
+        return node_sources, relationship_sources
+
+    def _resolve_paths(self, paths):
+        """
+        Resolves the comma separated file paths of an import command option. Paths in the command are relative to
+        the Neo4j installation, so the files are looked up by name in neo4j_import.directory.
+
+        :param paths: The comma separated paths.
+        :return: A list of paths to the CSV files.
+        """
+        directory = self.config.get("neo4j_import.directory")
+        return [os.path.join(directory, ntpath.basename(path)) for path in paths.split(",")]
+
+    def _read_header(self, path):
+        """
+        Reads and parses the header line of a CSV file.
+
+        :param path: The path of the CSV file.
+        :return: A tuple of the parsed header fields and the byte offset of the first data line.
+        """
+        with open(path, "rb") as file:
+            header_line = file.readline()
+            offset = file.tell()
+        row = next(csv.reader([header_line.decode("utf-8-sig")], delimiter=self.options["delimiter"],
+                              quotechar=self.options["quote"]), [])
+        return [parse_header_field(field) for field in row], offset
+
+    def _chunk_ranges(self, path, start):
+        """
+        Splits a CSV file into byte ranges of neo4j_import.chunk_size bytes. Fields spanning multiple lines are only
+        allowed with --multiline-fields=true, in which case the file is not split.
+
+        :param path: The path of the CSV file.
+        :param start: The byte offset of the first data line.
+        :return: A list of (start, end) byte ranges, the end of the last range being None.
+        """
+        chunk_size = self.config.get("neo4j_import.chunk_size", 16777216)
+        size = os.path.getsize(path)
+        if self.options["multiline_fields"] or chunk_size <= 0:
+            return [(start, None)]
+        offsets = list(range(start, size, chunk_size)) or [start]
+        return [(offset, offsets[i + 1] if i + 1 < len(offsets) else None) for i, offset in enumerate(offsets)]
+
+    def _read_source(self, executor, workers, entity, labels_or_type, paths):
+        """
+        Reads the files of one --nodes or --relationships option. The first file contains the header. Chunks are
+        parsed in the worker processes, at most two per worker are in flight, and the parsed records are added to
+        the graph data in order.
+
+        :param executor: The process pool.
+        :param workers: The number of worker processes.
+        :param entity: Either NODE or EDGE.
+        :param labels_or_type: The labels of the nodes or the default type of the relationships.
+        :param paths: The paths of the CSV files.
+        """
+        header, data_start = self._read_header(paths[0])
+        property_types = {name: data_type for name, kind, data_type, _ in header
+                          if kind == "property" or (kind == "id" and name)}
+
+        tasks = []
+        for i, path in enumerate(paths):
+            for start, end in self._chunk_ranges(path, data_start if i == 0 else 0):
+                tasks.append((path, start, end))
+
+        pending = deque()
+        row_number = 0
+        for path, start, end in tasks:
+            pending.append(executor.submit(parse_csv_chunk, path, start, end, header, entity, self.options))
+            if len(pending) < 2 * workers:
+                continue
+            row_number = self._add_records(pending.popleft().result(), entity, labels_or_type, property_types,
+                                           paths[0], row_number)
+        while pending:
+            row_number = self._add_records(pending.popleft().result(), entity, labels_or_type, property_types,
+                                           paths[0], row_number)
+
+    def _add_records(self, records, entity, labels_or_type, property_types, source, row_number):
+        """
+        Converts parsed records into Node or Edge objects and adds them to the graph data.
+
+        :param records: The records as returned by parse_csv_chunk.
+        :param entity: Either NODE or EDGE.
+        :param labels_or_type: The labels of the nodes or the default type of the relationships.
+        :param property_types: The data types of the properties as declared in the header.
+        :param source: The path of the first file of the source, used to name nodes without an id.
+        :param row_number: The number of records of this source that have already been added.
+        :return: The updated row number.
+        """
+        for record in records:
+            if entity == "NODE":
+                node_id, labels, properties = record
+                if node_id is None:
+                    node_id = f"{os.path.basename(source)}:{row_number}"
+                node = Node(node_id, labels_or_type + labels, properties, property_types=property_types)
+                self.graph_data.add_node(node)
+            else:
+                edge_type, start_id, end_id, properties = record
+                edge_type = edge_type or labels_or_type
+                edge = Edge(len(self.graph_data.edges), start_id, end_id, [edge_type] if edge_type else [],
+                            properties, property_types=property_types)
+                self.graph_data.add_edge(edge)
+            row_number += 1
+        return row_number
@@ -1,4 +1,7 @@
 from src.graph_extraction.neo4j_extractor import Neo4jExtractor
+from src.graph_extraction.async_neo4j_extractor import AsyncNeo4jExtractor
+from src.graph_extraction.csv_import_extractor import CsvImportExtractor
+from src.graph_extraction.columnar_extractor import ColumnarExtractor
 
 
 class ExtractorFactory:
@@ -24,6 +27,12 @@ class ExtractorFactory:
         data_source = config.get("data_source")
         if data_source == "neo4j":
             return Neo4jExtractor(config)
+        elif data_source == "neo4j_async":
+            return AsyncNeo4jExtractor(config)
+        elif data_source == "neo4j_import":
+            return CsvImportExtractor(config)
+        elif data_source == "columnar":
+            return ColumnarExtractor(config)
         # Add more data source extractors here
         else:
             raise ValueError("Unsupported data source")
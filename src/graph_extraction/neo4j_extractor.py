@@ -1,3 +1,8 @@
+import math
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from queue import Full, Queue
+from threading import Event
+
 from .base_extractor import BaseExtractor
 from neo4j import GraphDatabase
 from ..graph_data.graph_data import Node, Edge
@@ -5,7 +10,7 @@ from ..graph_data.graph_data import Node, Edge
 def get_nodes_labels_and_properties(tx):
     query = """
         MATCH (n)
-        RETURN DISTINCT id(n) AS node_id, labels(n) AS labels, properties(n) AS props
+        RETURN id(n) AS node_id, labels(n) AS labels, properties(n) AS props
         """
     result = tx.run(query)
     return [(record["node_id"], record["labels"], record["props"]) for record in result]
@@ -13,12 +18,122 @@ def get_nodes_labels_and_properties(tx):
 def get_edges_labels_and_properties(tx):
     query = """
             MATCH (start)-[r]->(end)
-            RETURN DISTINCT id(r) AS edge_id, type(r) AS type, properties(r) AS props, id(start) AS start_node_id, id(end) AS end_node_id
+            RETURN id(r) AS edge_id, type(r) AS type, properties(r) AS props, id(start) AS start_node_id, id(end) AS end_node_id
             """
     result = tx.run(query)
     return [(record["edge_id"], record["type"], record["props"], record["start_node_id"], record["end_node_id"]) for
             record in result]
 
+def stream_nodes_labels_and_properties(tx, batch_size, add_nodes):
+    query = """
+        MATCH (n)
+        RETURN id(n) AS node_id, labels(n) AS labels, properties(n) AS props
+        """
+    batch = []
+    for record in tx.run(query):
+        batch.append((record["node_id"], record["labels"], record["props"]))
+        if len(batch) == batch_size:
+            add_nodes(batch)
+            batch = []
+    add_nodes(batch)
+
+def stream_edges_labels_and_properties(tx, batch_size, add_edges):
+    query = """
+            MATCH (start)-[r]->(end)
+            RETURN id(r) AS edge_id, type(r) AS type, properties(r) AS props, id(start) AS start_node_id, id(end) AS end_node_id
+            """
+    batch = []
+    for record in tx.run(query):
+        batch.append((record["edge_id"], record["type"], record["props"], record["start_node_id"],
+                      record["end_node_id"]))
+        if len(batch) == batch_size:
+            add_edges(batch)
+            batch = []
+    add_edges(batch)
+
+def get_node_id_range(tx):
+    query = """
+        MATCH (n)
+        RETURN min(id(n)) AS min_id, max(id(n)) AS max_id
+        """
+    record = tx.run(query).single()
+    return record["min_id"], record["max_id"]
+
+def get_edge_id_range(tx):
+    query = """
+            MATCH ()-[r]->()
+            RETURN min(id(r)) AS min_id, max(id(r)) AS max_id
+            """
+    record = tx.run(query).single()
+    return record["min_id"], record["max_id"]
+
+def stream_nodes_in_id_range(tx, min_node_id, max_node_id, batch_size, add_nodes):
+    query = """
+        MATCH (n)
+        WHERE id(n) >= $min_node_id AND id(n) <= $max_node_id
+        RETURN id(n) AS node_id, labels(n) AS labels, properties(n) AS props
+        """
+    batch = []
+    for record in tx.run(query, min_node_id=min_node_id, max_node_id=max_node_id):
+        batch.append((record["node_id"], record["labels"], record["props"]))
+        if len(batch) == batch_size:
+            add_nodes(batch)
+            batch = []
+    add_nodes(batch)
+
+def stream_edges_in_id_range(tx, min_edge_id, max_edge_id, batch_size, add_edges):
+    query = """
+            MATCH (start)-[r]->(end)
+            WHERE id(r) >= $min_edge_id AND id(r) <= $max_edge_id
+            RETURN id(r) AS edge_id, type(r) AS type, properties(r) AS props, id(start) AS start_node_id, id(end) AS end_node_id
+            """
+    batch = []
+    for record in tx.run(query, min_edge_id=min_edge_id, max_edge_id=max_edge_id):
+        batch.append((record["edge_id"], record["type"], record["props"], record["start_node_id"],
+                      record["end_node_id"]))
+        if len(batch) == batch_size:
+            add_edges(batch)
+            batch = []
+    add_edges(batch)
+
+def get_node_signatures(tx):
+    query = """
+        MATCH (n)
+        RETURN labels(n) AS labels, [key IN keys(n) | [key, valueType(n[key])]] AS property_types, count(*) AS weight
+        """
+    result = tx.run(query)
+    return [(record["labels"], record["property_types"], record["weight"]) for record in result]
+
+def get_edge_signatures(tx):
+    query = """
+            MATCH (start)-[r]->(end)
+            RETURN labels(start) AS start_labels, [key IN keys(start) | [key, valueType(start[key])]] AS start_property_types,
+                   type(r) AS type, [key IN keys(r) | [key, valueType(r[key])]] AS property_types,
+                   labels(end) AS end_labels, [key IN keys(end) | [key, valueType(end[key])]] AS end_property_types,
+                   count(*) AS weight
+            """
+    result = tx.run(query)
+    return [(record["start_labels"], record["start_property_types"], record["type"], record["property_types"],
+             record["end_labels"], record["end_property_types"], record["weight"]) for record in result]
+
+def get_node_property_type_counts(tx):
+    query = """
+        MATCH (n)
+        UNWIND keys(n) AS key
+        RETURN key, valueType(n[key]) AS value_type, count(*) AS count
+        """
+    result = tx.run(query)
+    return [(record["key"], record["value_type"], record["count"]) for record in result]
+
+def get_edge_property_type_counts(tx):
+    query = """
+            MATCH ()-[r]->()
+            UNWIND keys(r) AS key
+            RETURN key, valueType(r[key]) AS value_type, count(*) AS count
+            """
+    result = tx.run(query)
+    return [(record["key"], record["value_type"], record["count"]) for record in result]
+
 
 class Neo4jExtractor(BaseExtractor):
     """
@@ -31,20 +146,221 @@ class Neo4jExtractor(BaseExtractor):
         """
        Extracts graph data from the Neo4j database.
        Connects to the database, retrieves nodes, edges and corresponding labels and properties and populates the
-       graph_data attribute.
+       graph_data attribute. If neo4j.batch_size is set, nodes and edges are streamed in batches of that size, so
+       only one batch of records is held in memory at a time. If neo4j.parallel_workers is bigger than 1,
+       the id space is split into ranges that are read concurrently. If neo4j.signature_extraction is enabled, only
+       the distinct signatures of nodes and edges are extracted, see _extract_signatures. If
+       neo4j.server_side_type_inference is enabled, the property data type histograms are computed by Neo4j.
        """
+        batch_size = self.config.get("neo4j.batch_size", 0)
+        parallel_workers = self.config.get("neo4j.parallel_workers", 1)
         driver = GraphDatabase.driver(self.config.get("neo4j.uri"),
-                                      auth=(self.config.get("neo4j.username"), self.config.get("neo4j.password")))
+                                      auth=(self.config.get("neo4j.username"), self.config.get("neo4j.password")),
+                                      max_connection_pool_size=max(parallel_workers, 100))
 
-        with driver.session() as session:
-            node_data = session.execute_read(get_nodes_labels_and_properties)
-            edge_data = session.execute_read(get_edges_labels_and_properties)
+        if self.config.get("neo4j.signature_extraction", False):
+            with driver.session() as session:
+                self._extract_signatures(session)
+        elif parallel_workers > 1:
+            self._extract_parallel(driver, parallel_workers, batch_size)
+        elif batch_size > 0:
+            with driver.session(fetch_size=batch_size) as session:
+                self._extract_streamed(session, batch_size)
+        else:
+            with driver.session() as session:
+                node_data = session.execute_read(get_nodes_labels_and_properties)
+                self._add_nodes(node_data)
+                del node_data
+                edge_data = session.execute_read(get_edges_labels_and_properties)
+                self._add_edges(edge_data)
+
+        if self.config.get("neo4j.server_side_type_inference", False):
+            with driver.session() as session:
+                self._extract_property_type_counts(session)
         driver.close()
 
+    def _extract_streamed(self, session, batch_size):
+        """
+        Streams all nodes and then all edges, each with a single query. The session fetches the records lazily in
+        batches of batch_size, and every batch is added to the graph data before the next one is pulled, so the
+        server scans the nodes and the relationships only once. If a transaction is retried, its records are read
+        again and replace the elements added before.
+
+        :param session: An open Neo4j session whose fetch_size is batch_size.
+        :param batch_size: The number of records added to the graph data at once.
+        """
+        session.execute_read(stream_nodes_labels_and_properties, batch_size, self._add_nodes)
+        session.execute_read(stream_edges_labels_and_properties, batch_size, self._add_edges)
+
+    def _extract_parallel(self, driver, parallel_workers, batch_size):
+        """
+        Splits the id space of nodes and edges into one range per worker and reads the ranges concurrently, every
+        range with a single streamed query in its own session of the shared driver. The records are added to the
+        graph data range by range, in id order of the ranges.
+
+        :param driver: The Neo4j driver whose connection pool is shared by the worker threads.
+        :param parallel_workers: The number of worker threads.
+        :param batch_size: If bigger than 0, the records of a range are fetched and handed over in batches of this
+                           size, otherwise every range is handed over at once.
+        """
+        with driver.session() as session:
+            node_id_range = session.execute_read(get_node_id_range)
+            edge_id_range = session.execute_read(get_edge_id_range)
+
+        node_ranges = self._split_id_range(*node_id_range, parallel_workers)
+        edge_ranges = self._split_id_range(*edge_id_range, parallel_workers)
+        session_config = {"fetch_size": batch_size} if batch_size > 0 else {}
+        stopped = Event()
+
+        def read_range(query_function, id_range, batches):
+            def put_batch(batch):
+                while not stopped.is_set():
+                    try:
+                        batches.put(batch, timeout=1)
+                        return
+                    except Full:
+                        continue
+                raise CancelledError()
+
+            try:
+                with driver.session(**session_config) as range_session:
+                    range_session.execute_read(query_function, *id_range, batch_size, put_batch)
+            finally:
+                try:
+                    put_batch(None)
+                except CancelledError:
+                    pass
+
+        with ThreadPoolExecutor(max_workers=parallel_workers) as executor:
+            try:
+                self._read_ranges(executor, read_range, stream_nodes_in_id_range, node_ranges, self._add_nodes)
+                self._read_ranges(executor, read_range, stream_edges_in_id_range, edge_ranges, self._add_edges)
+            finally:
+                stopped.set()
+                executor.shutdown(cancel_futures=True)
+
+    def _read_ranges(self, executor, read_range, query_function, id_ranges, add_records):
+        """
+        Reads id ranges in the worker threads and adds their records to the graph data in the order of the ranges.
+        Every range hands its batches over through a queue holding at most two of them, so a worker blocks until
+        the batches of the earlier ranges are added and only a bounded number of records is held next to the graph
+        data.
+
+        :param executor: The thread pool.
+        :param read_range: A function streaming the records of an id range with a query function into a queue,
+                           followed by None.
+        :param query_function: The transaction function streaming the nodes or edges of an id range.
+        :param id_ranges: The list of (min_id, max_id) tuples.
+        :param add_records: The function adding a batch of records to the graph data.
+        """
+        streams = []
+        for id_range in id_ranges:
+            batches = Queue(maxsize=2)
+            streams.append((executor.submit(read_range, query_function, id_range, batches), batches))
+        for future, batches in streams:
+            for batch in iter(batches.get, None):
+                add_records(batch)
+            future.result()
+
+    def _split_id_range(self, min_id, max_id, num_ranges):
+        """
+        Splits the id interval [min_id, max_id] into consecutive ranges of equal width.
+
+        :param min_id: The smallest id, None if there are no elements.
+        :param max_id: The biggest id, None if there are no elements.
+        :param num_ranges: The number of ranges.
+        :return: A list of (min_id, max_id) tuples with inclusive bounds.
+        """
+        if min_id is None or max_id is None:
+            return []
+        step = math.ceil((max_id - min_id + 1) / num_ranges)
+        return [(lower, min(lower + step - 1, max_id)) for lower in range(min_id, max_id + 1, step)]
+
+    def _extract_signatures(self, session):
+        """
+        Extracts only the distinct signatures of nodes and edges together with their multiplicities. The signature
+        of a node consists of its labels and the data types of its properties. The signature of an edge consists
+        of its type, the data types of its properties and the signatures of its start and end node. Every signature
+        is added to the graph data as a single element weighted by the number of elements sharing it. Property
+        values are not transferred.
+
+        :param session: An open Neo4j session.
+        """
+        node_signatures = {}
+        for labels, property_types, weight in session.execute_read(get_node_signatures):
+            signature = self._signature_key(labels, property_types)
+            node_signatures[signature] = node_signatures.get(signature, 0) + weight
+
+        node_signature_ids = {}
+        for signature, weight in node_signatures.items():
+            node_signature_ids[signature] = len(node_signature_ids)
+            self.graph_data.add_node(self._signature_node(node_signature_ids[signature], signature, weight))
+
+        edge_signatures = {}
+        for (start_labels, start_property_types, etype, property_types, end_labels, end_property_types,
+             weight) in session.execute_read(get_edge_signatures):
+            start_signature = self._signature_key(start_labels, start_property_types)
+            end_signature = self._signature_key(end_labels, end_property_types)
+            signature = (self._signature_key([etype], property_types), start_signature, end_signature)
+            edge_signatures[signature] = edge_signatures.get(signature, 0) + weight
+
+        for edge_id, ((edge_signature, start_signature, end_signature), weight) in enumerate(edge_signatures.items()):
+            labels, property_types = edge_signature
+            edge = Edge(edge_id, node_signature_ids.get(start_signature), node_signature_ids.get(end_signature),
+                        list(labels), {key: None for key, _ in property_types}, weight, dict(property_types))
+            self.graph_data.add_edge(edge)
+
+    def _signature_key(self, labels, property_types):
+        """
+        Builds a hashable, order independent signature from labels and (property key, Cypher type) pairs.
+
+        :param labels: A list of labels.
+        :param property_types: A list of [property key, Cypher type name] pairs.
+        :return: A tuple of the sorted labels and the sorted (property key, data type) pairs.
+        """
+        return (tuple(sorted(labels)),
+                tuple(sorted((key, self.graph_data.map_cypher_type(value_type)) for key, value_type in property_types)))
+
+    def _signature_node(self, node_id, signature, weight):
+        """
+        Creates a weighted node standing for all nodes with the given signature.
+
+        :param node_id: The ID of the new node.
+        :param signature: A signature as returned by _signature_key.
+        :param weight: The number of nodes sharing the signature.
+        :return: The created Node.
+        """
+        labels, property_types = signature
+        return Node(node_id, list(labels), {key: None for key, _ in property_types}, weight, dict(property_types))
+
+    def _extract_property_type_counts(self, session):
+        """
+        Lets Neo4j compute how often each property key occurs with each data type and loads only these histograms
+        into the graph data, so that the property data types do not have to be inferred from every single value.
+
+        :param session: An open Neo4j session.
+        """
+        for entity, query_function in (("NODE", get_node_property_type_counts),
+                                       ("EDGE", get_edge_property_type_counts)):
+            for key, value_type, count in session.execute_read(query_function):
+                self.graph_data.add_property_type_count(entity, key, self.graph_data.map_cypher_type(value_type), count)
+
+    def _add_nodes(self, node_data):
+        """
+        Converts node records into Node objects and adds them to the graph data.
+
+        :param node_data: A list of (node_id, labels, properties) tuples.
+        """
         for node_id, labels, props in node_data:
             node = Node(node_id, labels, props)
             self.graph_data.add_node(node)
 
+    def _add_edges(self, edge_data):
+        """
+        Converts edge records into Edge objects and adds them to the graph data.
+
+        :param edge_data: A list of (edge_id, type, properties, start_node_id, end_node_id) tuples.
+        """
         for edge_id, etype, props, start_node_id, end_node_id in edge_data:
             edge = Edge(edge_id, start_node_id, end_node_id, [etype], props)
             self.graph_data.add_edge(edge)
@@ -2,7 +2,8 @@ import random
 import string
 from datetime import date, timedelta, time, datetime
 
-from src.graph_data.graph_data import GraphData, Node, Edge
+from src.graph_data.graph_data import Node, Edge
+from src.graph_data.compact_graph_data import create_graph_data
 
 
 class GraphGenerator:
@@ -12,7 +13,7 @@ class GraphGenerator:
     def __init__(self, parser, config):
         self.config = config
         self.parser = parser
-        self.graph_data = GraphData()
+        self.graph_data = create_graph_data(config)
         self.node_type_to_nodes = {}
 
     def _random_string(self, length=6):
@@ -0,0 +1,137 @@
+from pyroaring import BitMap
+
+
+class ElementIndex:
+    """
+    Numbers element ids densely in the order they are added, so that sets of elements can be stored as roaring
+    bitmaps of their numbers. Ids that are not numbered yet get the next number when they are added to an ElementSet.
+    """
+    def __init__(self, element_ids=()):
+        """
+        Initializes the index.
+
+        @param element_ids: The element ids to number, in order.
+        """
+        self.ids = list(element_ids)
+        self.numbers = {element_id: number for number, element_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def number(self, element_id):
+        """
+        Returns the number of an element id, numbering it if it is not part of the index yet.
+
+        @param element_id: The element id.
+        @return: The number of the element id.
+        """
+        number = self.numbers.get(element_id)
+        if number is None:
+            number = len(self.ids)
+            self.ids.append(element_id)
+            self.numbers[element_id] = number
+        return number
+
+    def get_number(self, element_id):
+        """
+        Returns the number of an element id without numbering it.
+
+        @param element_id: The element id.
+        @return: The number of the element id, or None if it is not part of the index.
+        """
+        return self.numbers.get(element_id)
+
+    def get_id(self, number):
+        """
+        Returns the element id with the given number.
+
+        @param number: The number of the element id.
+        @return: The element id.
+        """
+        return self.ids[number]
+
+
+class ElementSet:
+    """
+    Set of element ids stored as a roaring bitmap of their numbers in an ElementIndex. Sets sharing an index are
+    combined with bitmap operations, other collections of ids element by element. An empty set without an index
+    takes over the index of the first ElementSet added to it. Iterating yields the ids in the order of their numbers.
+    """
+    __slots__ = ("index", "bitmap")
+
+    def __init__(self, index=None, bitmap=None):
+        """
+        Initializes the set.
+
+        @param index: The ElementIndex numbering the ids, created on the first added id if not given.
+        @param bitmap: An optional BitMap with the numbers of the ids in the set.
+        """
+        self.index = index
+        self.bitmap = BitMap() if bitmap is None else bitmap
+
+    def add(self, element_id):
+        """
+        Adds an element id to the set.
+
+        @param element_id: The element id to add.
+        """
+        if self.index is None:
+            self.index = ElementIndex()
+        self.bitmap.add(self.index.number(element_id))
+
+    def update(self, element_ids):
+        """
+        Adds all given element ids to the set.
+
+        @param element_ids: An ElementSet or any other iterable of element ids.
+        """
+        if isinstance(element_ids, ElementSet):
+            if self.index is None and not self.bitmap:
+                self.index = element_ids.index
+            if element_ids.index is self.index:
+                self.bitmap |= element_ids.bitmap
+                return
+        for element_id in element_ids:
+            self.add(element_id)
+
+    def difference_update(self, element_ids):
+        """
+        Removes all given element ids from the set.
+
+        @param element_ids: An ElementSet or any other iterable of element ids.
+        """
+        if isinstance(element_ids, ElementSet) and element_ids.index is self.index:
+            self.bitmap -= element_ids.bitmap
+            return
+        if self.index is None:
+            return
+        for element_id in element_ids:
+            number = self.index.get_number(element_id)
+            if number is not None:
+                self.bitmap.discard(number)
+
+    def copy(self):
+        """
+        Returns a copy of the set sharing its index.
+
+        @return: An ElementSet.
+        """
+        return ElementSet(self.index, BitMap(self.bitmap))
+
+    def __contains__(self, element_id):
+        if self.index is None:
+            return False
+        number = self.index.get_number(element_id)
+        return number is not None and number in self.bitmap
+
+    def __iter__(self):
+        if self.index is None:
+            return iter(())
+        get_id = self.index.get_id
+        return (get_id(number) for number in self.bitmap)
+
+    def __len__(self):
+        return len(self.bitmap)
+
+    def __repr__(self):
+        return f"ElementSet({list(self)!r})"
@@ -1,3 +1,6 @@
+from .element_set import ElementSet
+
+
 class Type:
     """
     Represents a Type instance with the provided configuration, labels, properties, and relationships
@@ -23,8 +26,8 @@ class Type:
         self.optional_labels = set()
         self.properties = properties
         self.optional_properties = {}
-        self.nodes = set()
-        self.edges = set()
+        self.nodes = ElementSet()
+        self.edges = ElementSet()
         self.supertypes = set(supertypes)
         self.subtypes = set(subtypes)
         self.is_abstract = is_abstract
@@ -261,13 +264,14 @@ class Type:
 
         self.subtypes.clear()
 
-    def remove_inherited_features(self, type_dict):
+    def remove_inherited_features(self, type_dict, hierarchy):
         """
         Removes the features that are already present in supertypes.
 
         @param type_dict: A dict of types to look up the type instances.
+        @param hierarchy: A TypeHierarchy of the types, providing the transitive supertypes.
         """
-        supertypes = self.get_all_supertypes(type_dict)
+        supertypes = hierarchy.ancestors(self.name)
         for supertype_name in supertypes:
             supertype = type_dict.get(supertype_name)
             self.labels.difference_update(supertype.labels)
@@ -279,25 +283,3 @@ class Type:
             for key in list(self.optional_properties.keys()):
                 if key in supertype.optional_properties:
                     del self.optional_properties[key]
-
-    def get_all_supertypes(self, type_dict):
-        """
-        Recursively get all transitive supertypes.
-
-        @param type_dict: A dict of types to look up the type instances.
-        """
-        all_supertypes = set(self.supertypes)
-        for supertype in self.supertypes:
-            all_supertypes.update(type_dict.get(supertype).get_all_supertypes(type_dict))
-        return all_supertypes
-
-    def get_all_subtypes(self, type_dict):
-        """
-        Recursively get all transitive subtypes.
-
-        @param type_dict: A dict of types to look up the type instances.
-        """
-        all_subtypes = set(self.subtypes)
-        for subtype in self.subtypes:
-            all_subtypes.update(type_dict.get(subtype).get_all_subtypes(type_dict))
-        return all_subtypes
\ No newline at end of file
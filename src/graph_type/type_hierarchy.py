@@ -0,0 +1,145 @@
+class TypeHierarchy:
+    """
+    Transitive closure of the supertype and subtype relations of a set of types. Every type name is numbered, and the
+    ancestors and descendants of every type are stored as bitsets of these numbers, computed once in topological
+    order. Testing whether a type is an ancestor or descendant of another one is a bit test, and listing them does
+    not walk the hierarchy again, which the recursive walks did once per path on hierarchies with shared supertypes.
+
+    Ancestors follow the supertypes sets and descendants the subtypes sets of the types. Names that are referenced
+    but not part of the set are numbered as well, they are ancestors or descendants without relations of their own.
+    """
+    def __init__(self, types):
+        """
+        Computes the closure of the relations of the types.
+
+        @param types: A list of Type objects.
+        """
+        self.names = []
+        self.numbers = {}
+        for type_ in types:
+            self._number(type_.name)
+        supertypes = [[] for _ in self.names]
+        subtypes = [[] for _ in self.names]
+        for type_ in types:
+            number = self.numbers[type_.name]
+            supertypes[number] = [self._number(name) for name in type_.supertypes]
+            subtypes[number] = [self._number(name) for name in type_.subtypes]
+        supertypes.extend([] for _ in range(len(self.names) - len(supertypes)))
+        subtypes.extend([] for _ in range(len(self.names) - len(subtypes)))
+        self.ancestor_bits = self._closure(supertypes)
+        self.descendant_bits = self._closure(subtypes)
+
+    def _number(self, name):
+        """
+        Returns the number of a type name, numbering it if it is new.
+
+        @param name: The type name.
+        @return: The number of the name.
+        """
+        number = self.numbers.get(name)
+        if number is None:
+            number = len(self.names)
+            self.names.append(name)
+            self.numbers[name] = number
+        return number
+
+    @staticmethod
+    def _closure(direct):
+        """
+        Computes the transitive closure of a relation. Every number is handled after the numbers it is related to,
+        so its closure is the union of their closures. Numbers on a cycle are updated until nothing changes.
+
+        @param direct: Per number, the list of numbers it is directly related to.
+        @return: Per number, the bitset of the numbers it is transitively related to.
+        """
+        order = []
+        state = [0] * len(direct)  # 0 unvisited, 1 on the stack, 2 done
+        cyclic = False
+        for root in range(len(direct)):
+            if state[root]:
+                continue
+            state[root] = 1
+            stack = [(root, iter(direct[root]))]
+            while stack:
+                number, related = stack[-1]
+                for other in related:
+                    if not state[other]:
+                        state[other] = 1
+                        stack.append((other, iter(direct[other])))
+                        break
+                    cyclic |= state[other] == 1
+                else:
+                    stack.pop()
+                    state[number] = 2
+                    order.append(number)
+
+        closure = [0] * len(direct)
+        changed = True
+        while changed:
+            changed = False
+            for number in order:
+                bits = closure[number]
+                for other in direct[number]:
+                    bits |= (1 << other) | closure[other]
+                if bits != closure[number]:
+                    closure[number] = bits
+                    changed = cyclic
+        return closure
+
+    def _names(self, bits):
+        """
+        Returns the type names whose numbers are set in a bitset.
+
+        @param bits: A bitset of type name numbers.
+        @return: A set of type names.
+        """
+        names = set()
+        while bits:
+            lowest = bits & -bits
+            names.add(self.names[lowest.bit_length() - 1])
+            bits ^= lowest
+        return names
+
+    def ancestors(self, name):
+        """
+        Returns all transitive supertypes of a type.
+
+        @param name: The name of the type.
+        @return: A set of type names.
+        """
+        number = self.numbers.get(name)
+        return set() if number is None else self._names(self.ancestor_bits[number])
+
+    def descendants(self, name):
+        """
+        Returns all transitive subtypes of a type.
+
+        @param name: The name of the type.
+        @return: A set of type names.
+        """
+        number = self.numbers.get(name)
+        return set() if number is None else self._names(self.descendant_bits[number])
+
+    def is_ancestor(self, ancestor, name):
+        """
+        Checks whether a type is a transitive supertype of another type.
+
+        @param ancestor: The name of the potential supertype.
+        @param name: The name of the type.
+        @return: True if ancestor is reachable from the type over supertypes.
+        """
+        number = self.numbers.get(name)
+        other = self.numbers.get(ancestor)
+        return number is not None and other is not None and bool(self.ancestor_bits[number] >> other & 1)
+
+    def is_descendant(self, descendant, name):
+        """
+        Checks whether a type is a transitive subtype of another type.
+
+        @param descendant: The name of the potential subtype.
+        @param name: The name of the type.
+        @return: True if descendant is reachable from the type over subtypes.
+        """
+        number = self.numbers.get(name)
+        other = self.numbers.get(descendant)
+        return number is not None and other is not None and bool(self.descendant_bits[number] >> other & 1)
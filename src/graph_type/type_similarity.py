@@ -0,0 +1,152 @@
+import numpy as np
+
+# Feature categories of a type in the order their similarities are summed by Type.jaccard_similarity
+CATEGORIES = ("labels", "optional_labels", "properties", "optional_properties")
+
+
+class TypeFeatureMatrix:
+    """
+    Encodes the labels, optional labels, properties and optional properties of a list of types as 0/1 matrices over
+    a shared vocabulary of labels and of property keys, so that the weighted Jaccard similarities of many pairs of
+    types are computed with matrix products instead of set operations per pair.
+
+    The similarities are computed with the same floating point operations as Type.jaccard_similarity, so they are
+    equal to it and ties are broken the same way. Rows are re-encoded with update when the features of a type change.
+    """
+    def __init__(self, types, block_size=1 << 20):
+        """
+        Encodes the features of the types.
+
+        @param types: A list of Type objects, a type is addressed by its position in the list.
+        @param block_size: The maximum number of similarities computed at once by similarity_blocks, divided by the
+        vocabulary size the maximum number of pairs computed at once by pair_similarities.
+        """
+        self.types = types
+        self.block_size = block_size
+        self.vocabularies = {"labels": {}, "properties": {}}
+        for type_ in types:
+            for category in CATEGORIES:
+                self._vocabulary_of(category).update((feature, None) for feature in getattr(type_, category))
+        for vocabulary in self.vocabularies.values():
+            for column, feature in enumerate(vocabulary):
+                vocabulary[feature] = column
+        self.matrices = {category: np.zeros((len(types), len(self._vocabulary_of(category))), dtype=np.float32)
+                         for category in CATEGORIES}
+        self.sizes = {category: np.zeros(len(types), dtype=np.float64) for category in CATEGORIES}
+        for row in range(len(types)):
+            self.update(row)
+
+    def _vocabulary_of(self, category):
+        return self.vocabularies["labels" if category.endswith("labels") else "properties"]
+
+    def update(self, row):
+        """
+        Re-encodes the features of a type, e.g. after it was merged with another type.
+
+        @param row: The position of the type.
+        """
+        type_ = self.types[row]
+        for category in CATEGORIES:
+            vocabulary = self._vocabulary_of(category)
+            features = getattr(type_, category)
+            for feature in features:
+                if feature not in vocabulary:
+                    vocabulary[feature] = len(vocabulary)
+            columns = [vocabulary[feature] for feature in features]
+            matrix = self.matrices[category]
+            if len(vocabulary) > matrix.shape[1]:
+                matrix = np.pad(matrix, ((0, 0), (0, len(vocabulary) - matrix.shape[1])))
+                self.matrices[category] = matrix
+            matrix[row] = 0
+            matrix[row, columns] = 1
+            self.sizes[category][row] = len(columns)
+
+    def _encoded(self, positions):
+        """
+        Returns the encoding of some types for the categories any type has features in.
+
+        @param positions: A range or an array of type positions. The rows of a range with step 1 are not copied.
+        @return: A list of tuples of the category matrix of the types and their feature counts.
+        """
+        if isinstance(positions, range) and positions.step == 1:
+            positions = slice(positions.start, positions.stop)
+        return [(self.matrices[category][positions], self.sizes[category][positions])
+                for category in CATEGORIES if self.matrices[category].shape[1]]
+
+    def similarities(self, rows, columns):
+        """
+        Computes the similarities of every type of the rows with every type of the columns.
+
+        @param rows: The positions of the first types of the pairs, a list, range or array.
+        @param columns: The positions of the second types of the pairs, a list, range or array.
+        @return: A float64 array of shape (len(rows), len(columns)).
+        """
+        rows = rows if isinstance(rows, range) else np.asarray(rows, dtype=np.intp)
+        columns = columns if isinstance(columns, range) else np.asarray(columns, dtype=np.intp)
+        weighted_sum = np.zeros((len(rows), len(columns)))
+        total = np.zeros((len(rows), len(columns)))
+        for (row_matrix, row_sizes), (column_matrix, column_sizes) in zip(self._encoded(rows),
+                                                                          self._encoded(columns)):
+            # Exact, as the counts stay far below the 2^24 integers a float32 represents
+            intersection = (row_matrix @ column_matrix.T).astype(np.float64)
+            union = np.add.outer(row_sizes, column_sizes)
+            union -= intersection
+            self._add_weighted(weighted_sum, total, intersection, union)
+        return self._normalize(weighted_sum, total)
+
+    def pair_similarities(self, rows, columns):
+        """
+        Computes the similarities of the pairs rows[i], columns[i].
+
+        @param rows: The positions of the first types of the pairs.
+        @param columns: The positions of the second types of the pairs.
+        @return: A float64 array with one similarity per pair.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        columns = np.asarray(columns, dtype=np.intp)
+        pairs_per_chunk = max(1, self.block_size // max(sum(matrix.shape[1] for matrix in self.matrices.values()), 1))
+        if len(rows) > pairs_per_chunk:
+            return np.concatenate([self.pair_similarities(rows[start:start + pairs_per_chunk],
+                                                          columns[start:start + pairs_per_chunk])
+                                   for start in range(0, len(rows), pairs_per_chunk)])
+        weighted_sum = np.zeros(len(rows))
+        total = np.zeros(len(rows))
+        for category in CATEGORIES:
+            matrix = self.matrices[category]
+            sizes = self.sizes[category]
+            intersection = np.einsum('ij,ij->i', matrix[rows], matrix[columns], dtype=np.float64)
+            union = sizes[rows] + sizes[columns]
+            union -= intersection
+            self._add_weighted(weighted_sum, total, intersection, union)
+        return self._normalize(weighted_sum, total)
+
+    def similarity_blocks(self, rows=None, columns=None):
+        """
+        Computes the similarities of rows and columns in blocks of consecutive rows, so that the similarities of many
+        types never have to be held in memory at once. A block is computed when it is requested, i.e. with the
+        features the types have at that time.
+
+        @param rows: The positions of the rows, all types if not given.
+        @param columns: The positions of the columns, all types if not given.
+        @return: A generator of tuples of the positions of the block rows and their similarity array.
+        """
+        rows = range(len(self.types)) if rows is None else rows
+        columns = range(len(self.types)) if columns is None else columns
+        rows_per_block = max(1, self.block_size // max(len(columns), 1))
+        for start in range(0, len(rows), rows_per_block):
+            block_rows = rows[start:start + rows_per_block]
+            yield np.asarray(block_rows, dtype=np.intp), self.similarities(block_rows, columns)
+
+    @staticmethod
+    def _add_weighted(weighted_sum, total, intersection, union):
+        # (intersection / union) * union as in Type.jaccard_similarity, which is not always equal to intersection.
+        # An empty union has an empty intersection, so dividing it by 1 instead adds 0 like skipping the category.
+        weighted = np.divide(intersection, np.maximum(union, 1), out=intersection)
+        weighted *= union
+        weighted_sum += weighted
+        total += union
+
+    @staticmethod
+    def _normalize(weighted_sum, total):
+        # Pairs without any features have a weighted sum of 0, so dividing it by 1 yields a similarity of 0
+        return np.divide(weighted_sum, np.maximum(total, 1), out=weighted_sum)
@@ -9,6 +9,7 @@ from src.schema_merger.schema_merger import SchemaMerger
 from src.utils.validator import Validator
 from utils.logger import setup_logger
 from fca.fca_helper import FCAHelper
+from fca.context_builder import ContextBuilder
 import time
 
 def main():
@@ -36,6 +37,9 @@ def main():
     if not config.validate_config():
         return
 
+    node_fca_helper = FCAHelper(config)
+    edge_context_builder = None
+
     # Step 1: Extract data
     if config.get("graph_generator"):
         schema_file_path = config.get("graph_generator_schema_path")
@@ -46,6 +50,18 @@ def main():
         graph_generator = GraphGenerator(schema_parser, config)
         graph_data = graph_generator.generate_graph()
         log_with_time(f'Graph successfully generated. Graph has {len(graph_data.nodes)} nodes and {len(graph_data.edges)} edges.')
+    elif config.get("data_source") == "neo4j_async":
+        # Build the formal contexts while records arrive and the node lattice while edges are still streamed
+        extractor = ExtractorFactory.get_extractor(config)
+        node_context_builder = ContextBuilder(config.get("node_type_extraction"))
+        edge_context_builder = ContextBuilder(config.get("edge_type_extraction"))
+        extractor.extract_graph_data(
+            node_consumer=node_context_builder.add_element,
+            edge_consumer=edge_context_builder.add_element,
+            on_nodes_extracted=lambda: node_fca_helper.compute_node_concept_lattice(extractor.graph_data,
+                                                                                    node_context_builder))
+        graph_data = extractor.graph_data
+        log_with_time('Data successfully extracted.')
     else:
         extractor = ExtractorFactory.get_extractor(config)
         extractor.extract_graph_data()
@@ -55,16 +71,19 @@ def main():
     graph_data.infer_property_data_types()
 
     # Step 2: Perform FCA and extract Types from Concept Lattice
-    node_fca_helper = FCAHelper(config)
     graph_type = GraphType(config)
-    node_fca_helper.generate_node_concept_lattice(graph_data)
+    if node_fca_helper.node_concept_lattice is None:
+        node_fca_helper.compute_concept_lattices(graph_data, edge_context_builder=edge_context_builder)
+    node_fca_helper.save_node_concept_lattice()
     log_with_time('Node Concept Lattice successfully generated.')
 
     type_extractor = TypeExtractor(config, node_fca_helper, graph_data, graph_type, "NODE")
     graph_type.node_types = type_extractor.extract_types()
     log_with_time('Node Types successfully extracted.')
 
-    node_fca_helper.generate_edge_concept_lattice(graph_data)
+    if node_fca_helper.edge_concept_lattice is None:
+        node_fca_helper.compute_edge_concept_lattice(graph_data, edge_context_builder)
+    node_fca_helper.save_edge_concept_lattice()
     log_with_time('Edge Concept Lattice successfully generated.')
 
     type_extractor.extraction_mode = "EDGE"
@@ -97,6 +116,8 @@ def main():
 
         log_with_time(f'Merged the new schema with the original one.')
 
+    node_fca_helper.wait_for_visualizations()
+
     total_time = time.time() - start_time
     log_with_time(f'Total execution time: {total_time:.2f}s')
 
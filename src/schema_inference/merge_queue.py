@@ -0,0 +1,213 @@
+import heapq
+from collections import defaultdict
+
+import numpy as np
+
+from src.graph_type.type_similarity import TypeFeatureMatrix
+
+
+class SupertypeMergeQueue:
+    """
+    Priority queue of the (subtype, supertype) pairs of a list of types, ordered by their Jaccard similarity. Types
+    are looked up by name, and the types referencing a type as supertype or subtype are indexed, so that a merge
+    only updates the pairs whose types changed instead of rescanning all pairs.
+
+    Ties are broken like a scan over the types in list order and over the supertypes of every type in set iteration
+    order would break them, so merging the best pair until the similarity drops below a threshold yields the same
+    merge sequence as rescanning all pairs after every merge. The queue can be restricted to the pairs of types
+    without subtypes, and ties between types can be broken in favor of the last type in list order instead.
+    """
+    def __init__(self, types, leaves_only=False, prefer_last=False):
+        """
+        Initializes the queue with all pairs of a type and one of its supertypes.
+
+        @param types: A list of Type objects with unique names.
+        @param leaves_only: Whether only the pairs of subtypes that have no subtypes themselves are returned.
+        @param prefer_last: Whether ties between pairs of different subtypes are won by the last subtype in list order.
+        """
+        self.leaves_only = leaves_only
+        self.prefer_last = prefer_last
+        self.types = {type_.name: type_ for type_ in types}
+        self.positions = {type_.name: position for position, type_ in enumerate(types)}
+        self.supertype_referrers = defaultdict(set)
+        self.subtype_referrers = defaultdict(set)
+        self.features = TypeFeatureMatrix(types)
+        self.pairs = {}
+        self.heap = []
+        for type_ in types:
+            for supertype_name in type_.supertypes:
+                self.supertype_referrers[supertype_name].add(type_.name)
+            for subtype_name in type_.subtypes:
+                self.subtype_referrers[subtype_name].add(type_.name)
+        self._update_pairs(types)
+
+    def _push(self, pairs):
+        """
+        Computes the similarities of pairs and pushes them onto the queue.
+
+        @param pairs: A list of tuples of a subtype name, the rank of the pair and a supertype name.
+        """
+        subtype_rows = [self.positions[type_name] for type_name, _, _ in pairs]
+        supertype_rows = [self.positions[supertype_name] for _, _, supertype_name in pairs]
+        similarities = self.features.pair_similarities(subtype_rows, supertype_rows)
+        for (type_name, rank, supertype_name), similarity in zip(pairs, similarities.tolist()):
+            self.pairs[type_name][supertype_name] = (similarity, rank)
+            position = -self.positions[type_name] if self.prefer_last else self.positions[type_name]
+            heapq.heappush(self.heap, (-similarity, position, rank, type_name, supertype_name))
+
+    def _update_pairs(self, types):
+        """
+        Recomputes the pairs of types with their supertypes, ranked by the iteration order of their supertype sets.
+
+        @param types: The subtypes of the pairs.
+        """
+        pairs = []
+        for type_ in types:
+            self.pairs[type_.name] = {}
+            pairs.extend((type_.name, rank, supertype_name) for rank, supertype_name in enumerate(type_.supertypes)
+                         if supertype_name in self.types)
+        self._push(pairs)
+
+    def _update_similarities(self, type_names, supertype):
+        """
+        Recomputes the similarities of pairs whose supertype changed.
+
+        @param type_names: The names of the subtypes of the pairs.
+        @param supertype: The supertype of the pairs.
+        """
+        self._push([(type_name, self.pairs[type_name][supertype.name][1], supertype.name) for type_name in type_names])
+
+    def best_pair(self):
+        """
+        Returns the most similar pair, dropping outdated entries of the queue.
+
+        @return: A tuple of the similarity, the subtype and the supertype, or None if there are no pairs.
+        """
+        while self.heap:
+            negative_similarity, _, rank, type_name, supertype_name = self.heap[0]
+            if type_name in self.types and \
+                    self.pairs[type_name].get(supertype_name) == (-negative_similarity, rank) and \
+                    not (self.leaves_only and self.types[type_name].subtypes):
+                return -negative_similarity, self.types[type_name], self.types[supertype_name]
+            heapq.heappop(self.heap)
+        return None
+
+    def merge(self, subtype, supertype):
+        """
+        Merges a subtype into its supertype, replaces the references to the subtype and updates the affected pairs.
+
+        @param subtype: The type to be merged into the supertype.
+        @param supertype: The supertype into which the subtype is being merged.
+        """
+        for subtype_name in subtype.subtypes:
+            self.subtype_referrers[subtype_name].add(supertype.name)
+        subtype.merge_into_other_type(supertype)
+        self.features.update(self.positions[supertype.name])
+        del self.types[subtype.name]
+        del self.pairs[subtype.name]
+
+        changed_types = {supertype.name: supertype}
+        for type_name in self.supertype_referrers.pop(subtype.name, ()):
+            type_ = self.types.get(type_name)
+            if type_ and subtype.name in type_.supertypes:
+                type_.supertypes.remove(subtype.name)
+                type_.supertypes.add(supertype.name)
+                self.supertype_referrers[supertype.name].add(type_name)
+                changed_types[type_name] = type_
+        for type_name in self.subtype_referrers.pop(subtype.name, ()):
+            type_ = self.types.get(type_name)
+            if type_ and subtype.name in type_.subtypes:
+                type_.subtypes.remove(subtype.name)
+                if self.leaves_only and not type_.subtypes:
+                    # The pairs of a new leaf may have been dropped from the queue before
+                    changed_types[type_name] = type_
+
+        # The features of the supertype and the supertype sets of the referrers changed
+        self._update_pairs(changed_types.values())
+        referrers = [type_name for type_name in self.supertype_referrers[supertype.name]
+                     if type_name not in changed_types and supertype.name in self.pairs.get(type_name, {})]
+        self._update_similarities(referrers, supertype)
+
+    def __contains__(self, type_):
+        return type_.name in self.types
+
+    def __len__(self):
+        return len(self.types)
+
+
+class MostSimilarPairIndex:
+    """
+    Index of the most similar pair of a list of types, for merging types pairwise. For every type, the most similar
+    of the types after it in list order is cached, and only recomputed if that partner was merged away or became
+    less similar, so a merge costs a comparison of the changed type with all types instead of all pairs.
+
+    Ties are broken like a scan over all pairs (i, j) with i < j in list order would break them: the pair returned is
+    the first of the most similar pairs.
+    """
+    def __init__(self, types):
+        """
+        Initializes the index with the most similar partner of every type.
+
+        @param types: A list of Type objects.
+        """
+        self.types = list(types)
+        self.features = TypeFeatureMatrix(self.types)
+        self.positions = {id(type_): position for position, type_ in enumerate(self.types)}
+        self.alive = np.ones(len(self.types), dtype=bool)
+        self.partners = np.full(len(self.types), -1, dtype=np.intp)
+        self.similarities = np.full(len(self.types), -1.0)
+        self._update_partners(np.arange(len(self.types)))
+
+    def _update_partners(self, rows):
+        """
+        Recomputes the most similar partners of types among the types after them.
+
+        @param rows: An array of the positions of the types.
+        """
+        columns = np.flatnonzero(self.alive)
+        if not len(columns):
+            return
+        for block_rows, similarities in self.features.similarity_blocks(rows, columns):
+            similarities[columns <= block_rows[:, None]] = -1
+            best = np.argmax(similarities, axis=1)
+            self.similarities[block_rows] = similarities[np.arange(len(block_rows)), best]
+            self.partners[block_rows] = np.where(self.similarities[block_rows] >= 0, columns[best], -1)
+
+    def most_similar_pair(self):
+        """
+        Returns the most similar pair of types.
+
+        @return: A tuple of the two types in list order, or (None, None) if there are less than two types.
+        """
+        if not self.alive.any():
+            return None, None
+        row = int(np.argmax(np.where(self.alive, self.similarities, -np.inf)))
+        if self.partners[row] < 0:
+            return None, None
+        return self.types[row], self.types[self.partners[row]]
+
+    def merge(self, type1, type2):
+        """
+        Updates the index after the first type of a pair was merged into the second one and removed.
+
+        @param type1: The type merged into the other type.
+        @param type2: The type that absorbed the features of the other type.
+        """
+        removed = self.positions[id(type1)]
+        changed = self.positions[id(type2)]
+        self.alive[removed] = False
+        self.features.update(changed)
+
+        recompute = [np.flatnonzero(self.alive & (self.partners == removed)), [changed]]
+        # The types before the changed type compare their partner with it
+        rows = np.flatnonzero(self.alive[:changed])
+        if len(rows):
+            similarities = self.features.similarities(rows, [changed])[:, 0]
+            partners = self.partners[rows]
+            less_similar = (partners == changed) & (similarities < self.similarities[rows])
+            recompute.append(rows[less_similar])
+            better = ((partners == changed) & ~less_similar) | (similarities > self.similarities[rows]) | \
+                ((similarities == self.similarities[rows]) & (changed < partners))
+            self.similarities[rows[better]] = similarities[better]
+            self.partners[rows[better]] = changed
+        self._update_partners(np.unique(np.concatenate(recompute).astype(np.intp)))
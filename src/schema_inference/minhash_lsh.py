@@ -0,0 +1,105 @@
+import numpy as np
+
+# Mersenne prime of the universal hash functions (a * x + b) mod p, small enough for 64 bit products
+PRIME = (1 << 31) - 1
+
+
+class MinHashLSH:
+    """
+    Locality-sensitive hashing of feature sets with MinHash signatures. The signature of a set holds its minimum
+    under every one of num_permutations random hash functions, two sets agree on a signature value with a probability
+    equal to their Jaccard similarity. The signatures are cut into bands of consecutive rows, and sets that agree on
+    all rows of at least one band become candidate pairs, so a pair of similarity s is a candidate with probability
+    1 - (1 - s^rows)^bands.
+
+    The number of rows per band is tuned from the similarity threshold: the most rows per band, i.e. the fewest
+    dissimilar candidates, for which a pair at the threshold is still a candidate with the given recall.
+    """
+    def __init__(self, threshold, num_permutations=128, recall=0.99, seed=0):
+        """
+        Initializes the hash functions and the banding.
+
+        @param threshold: The Jaccard similarity the candidate pairs should have.
+        @param num_permutations: The number of hash functions, i.e. the length of the signatures.
+        @param recall: The minimum probability of a pair with the threshold similarity to be a candidate.
+        @param seed: The seed of the hash functions, so that the candidates are reproducible.
+        """
+        self.num_permutations = num_permutations
+        self.banding = self.tune_banding(threshold, num_permutations, recall)
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, PRIME, size=num_permutations, dtype=np.int64)
+        self.b = rng.integers(0, PRIME, size=num_permutations, dtype=np.int64)
+
+    @staticmethod
+    def tune_banding(threshold, num_permutations, recall):
+        """
+        Chooses the number of bands and rows per band of the signatures.
+
+        @param threshold: The Jaccard similarity the candidate pairs should have.
+        @param num_permutations: The length of the signatures.
+        @param recall: The minimum probability of a pair with the threshold similarity to be a candidate.
+        @return: A tuple of the number of bands and rows, or None if even bands of one row miss the recall, e.g.
+        for a threshold of 0, for which every pair is a candidate.
+        """
+        banding = None
+        for rows in range(1, num_permutations + 1):
+            if num_permutations % rows:
+                continue
+            bands = num_permutations // rows
+            if 1 - (1 - max(threshold, 0) ** rows) ** bands >= recall:
+                banding = (bands, rows)
+        return banding
+
+    def signatures(self, feature_sets):
+        """
+        Computes the MinHash signatures of feature sets.
+
+        @param feature_sets: A list of sets of hashable features. The sets must not be empty.
+        @return: An int64 array with a column of num_permutations values per set.
+        """
+        # Numbered in sorted order, so that the signatures do not depend on the iteration order of the sets
+        vocabulary = {feature: column for column, feature in enumerate(sorted(set().union(*feature_sets)))}
+        columns = [vocabulary[feature] for features in feature_sets for feature in features]
+        columns = np.array(columns, dtype=np.int64)
+        offsets = np.cumsum([0] + [len(features) for features in feature_sets[:-1]])
+        signatures = np.empty((self.num_permutations, len(feature_sets)), dtype=np.int64)
+        for k in range(self.num_permutations):
+            signatures[k] = np.minimum.reduceat((self.a[k] * columns + self.b[k]) % PRIME, offsets)
+        return signatures
+
+    def candidate_pairs(self, feature_sets):
+        """
+        Returns the pairs of feature sets that collide in at least one band. Empty sets have a similarity of 0 with
+        every set and are never part of a candidate pair.
+
+        @param feature_sets: A list of sets of hashable features.
+        @return: A sorted list of tuples (i, j) with i < j of the positions of the sets of a pair.
+        """
+        bands, rows = self.banding
+        positions = np.array([i for i, features in enumerate(feature_sets) if features], dtype=np.int64)
+        if len(positions) < 2:
+            return []
+        signatures = self.signatures([feature_sets[i] for i in positions])
+        pair_codes = []
+        bucket_pairs = {}
+        for band in range(bands):
+            # The rows of a band are combined into one bucket key. Distinct rows rarely share a key, and such
+            # collisions only add candidates that are verified anyway
+            keys = np.zeros(len(positions), dtype=np.uint64)
+            for row in signatures[band * rows:(band + 1) * rows]:
+                keys = keys * np.uint64(PRIME) + row.astype(np.uint64)
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            bucket_starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+            bucket_ends = np.append(bucket_starts[1:], len(order))
+            for start, end in zip(*(bounds[bucket_ends - bucket_starts > 1].tolist()
+                                    for bounds in (bucket_starts, bucket_ends))):
+                members = positions[order[start:end]]
+                if len(members) not in bucket_pairs:
+                    bucket_pairs[len(members)] = np.triu_indices(len(members), 1)
+                first, second = bucket_pairs[len(members)]
+                pair_codes.append(members[first] * len(feature_sets) + members[second])
+        if not pair_codes:
+            return []
+        pair_codes = np.unique(np.concatenate(pair_codes))
+        return list(zip((pair_codes // len(feature_sets)).tolist(), (pair_codes % len(feature_sets)).tolist()))
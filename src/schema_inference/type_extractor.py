@@ -1,6 +1,13 @@
+import heapq
 from collections import defaultdict, Counter
 
+import numpy as np
+
 from src.graph_type.type import Type
+from src.graph_type.type_hierarchy import TypeHierarchy
+from src.graph_type.type_similarity import TypeFeatureMatrix
+from src.schema_inference.merge_queue import MostSimilarPairIndex, SupertypeMergeQueue
+from src.schema_inference.minhash_lsh import MinHashLSH
 
 
 class TypeExtractor:
@@ -38,8 +45,8 @@ class TypeExtractor:
             approach = self.config.get("edge_type_extraction")
 
         types = self._initialize_types(approach)
-        self._remove_type_outliers(types, self.config.get("type_outlier_threshold"))
-        self._remove_elements_in_subtypes(types)
+        self._remove_type_outliers(types, self.config.get("type_outlier_threshold"), self._concept_supports(types))
+        self._assign_elements(types)
 
         if approach == "label_based":
             self._compute_properties(types)
@@ -69,8 +76,9 @@ class TypeExtractor:
             self._remove_type_outliers(types)
 
         type_dict = {type_.name: type_ for type_ in types}
+        hierarchy = TypeHierarchy(types)
         for type_ in types:
-            type_.remove_inherited_features(type_dict)
+            type_.remove_inherited_features(type_dict, hierarchy)
 
         return types
 
@@ -101,7 +109,6 @@ class TypeExtractor:
             if concept_id == bottom_concept_id and remove_bottom_concept:
                 continue
             labels, properties = self._set_lattice_intent(concept.intent, approach)
-            elements = concept.extent
             if self.extraction_mode == "NODE":
                 subtypes, supertypes = self.fca_helper.get_node_sub_super_concepts(concept_id)
             if self.extraction_mode == "EDGE":
@@ -116,11 +123,6 @@ class TypeExtractor:
                          supertypes=supertypes, subtypes=subtypes, entity=self.extraction_mode)
             type_.open_labels = self.config.get("open_labels")
             type_.open_properties = self.config.get("open_properties")
-            for element in elements:
-                if self.extraction_mode == "NODE":
-                    type_.add_node(element)
-                if self.extraction_mode == "EDGE":
-                    type_.add_edge(element)
             types.append(type_)
         self._change_references(types)
         return types
@@ -191,40 +193,39 @@ class TypeExtractor:
             properties = self._compute_property_data_types(properties)
         return labels, properties
 
-    def _remove_elements_in_subtypes(self, types):
+    def _concept_supports(self, types):
         """
-        Removes nodes or edges from a type if they are present in one of its subtypes.
-        Operates recursively based on the types subtype hierarchy.
+        Counts the elements in the concept extent of every type, i.e. the elements of the type and of all its subtypes.
 
-        @param types: Types List.
-        @return Updated Types List.
+        @param types: A list of Type objects created from the concept lattice.
+        @return: A dict mapping type names to element counts.
         """
-        type_dict = {type_obj.name: type_obj for type_obj in types}
-        for type_obj in types:
-            if self.extraction_mode == 'NODE':
-                all_subtypes = self._get_all_subtypes(type_obj, type_dict)
-                for subtype in all_subtypes:
-                    type_obj.nodes.difference_update(type_dict[subtype].nodes)
-
-            elif self.extraction_mode == 'EDGE':
-                all_subtypes = self._get_all_subtypes(type_obj, type_dict)
-                for subtype in all_subtypes:
-                    type_obj.edges.difference_update(type_dict[subtype].edges)
+        supports = {}
+        for type_ in types:
+            if self.extraction_mode == "NODE":
+                extent = self.fca_helper.get_node_concept_extent(type_.concept_id)
+            if self.extraction_mode == "EDGE":
+                extent = self.fca_helper.get_edge_concept_extent(type_.concept_id)
+            supports[type_.name] = self.graph_data.count_elements(extent, self.extraction_mode)
+        return supports
 
-    def _get_all_subtypes(self, type_obj, type_dict):
+    def _assign_elements(self, types):
         """
-        Recursively retrieves all transitive subtypes for a given Type instance.
+        Assigns every node or edge directly to its most specific types, the types containing it without a subtype
+        containing it as well. Usually this is the type of its object concept, the concept of its own labels and
+        properties, see FCAHelper.get_node_type_extents.
 
-        @param type_obj: The Type instance for which to find subtypes.
-        @param type_dict: A dictionary mapping type names to Type instances.
-        @return: A set of all subtypes.
+        @param types: A list of Type objects created from the concept lattice.
         """
-        all_subtypes = set(type_obj.subtypes)
-        for subtype_name in type_obj.subtypes:
-            if subtype_name in type_dict:
-                subtype = type_dict[subtype_name]
-                all_subtypes.update(self._get_all_subtypes(subtype, type_dict))
-        return all_subtypes
+        concept_ids = [type_.concept_id for type_ in types]
+        if self.extraction_mode == 'NODE':
+            extents = self.fca_helper.get_node_type_extents(concept_ids)
+            for type_ in types:
+                type_.nodes.update(extents[type_.concept_id])
+        elif self.extraction_mode == 'EDGE':
+            extents = self.fca_helper.get_edge_type_extents(concept_ids)
+            for type_ in types:
+                type_.edges.update(extents[type_.concept_id])
 
     def _compute_properties(self, types):
         """
@@ -238,20 +239,20 @@ class TypeExtractor:
 
         for type_instance in types:
             if self.extraction_mode == "NODE":
-                element_ids = set(type_instance.nodes)
+                element_ids = type_instance.nodes
             if self.extraction_mode == "EDGE":
-                element_ids = set(type_instance.edges)
+                element_ids = type_instance.edges
 
             property_counts = defaultdict(lambda: {'count': 0})
-            total_elements = len(element_ids)
+            total_elements = self.graph_data.count_elements(element_ids, self.extraction_mode)
 
             for element_id in element_ids:
                 if self.extraction_mode == "NODE":
-                    for prop, val in self.graph_data.nodes[element_id].properties.items():
-                        property_counts[prop]['count'] += 1
+                    element = self.graph_data.nodes[element_id]
                 if self.extraction_mode == "EDGE":
-                    for prop, val in self.graph_data.edges[element_id].properties.items():
-                        property_counts[prop]['count'] += 1
+                    element = self.graph_data.edges[element_id]
+                for prop in element.properties:
+                    property_counts[prop]['count'] += element.weight
 
 
             for prop, data in property_counts.items():
@@ -277,11 +278,11 @@ class TypeExtractor:
 
         for type_instance in types:
             if self.extraction_mode == "NODE":
-                element_ids = set(type_instance.nodes)
+                element_ids = type_instance.nodes
             if self.extraction_mode == "EDGE":
-                element_ids = set(type_instance.edges)
+                element_ids = type_instance.edges
             label_counts = defaultdict(int)
-            total_nodes = len(element_ids)
+            total_nodes = self.graph_data.count_elements(element_ids, self.extraction_mode)
 
             for element_id in element_ids:
                 if self.extraction_mode == "NODE":
@@ -290,7 +291,7 @@ class TypeExtractor:
                     element = self.graph_data.get_edge_by_id(element_id)
 
                 for label in element.labels:
-                    label_counts[label] += 1
+                    label_counts[label] += element.weight
 
             for label, count in label_counts.items():
                 if count == total_nodes:
@@ -298,89 +299,30 @@ class TypeExtractor:
                 elif count >= threshold and self.config.get("optional_labels"):
                     type_instance.optional_labels.add(label)
 
-    def _find_most_similar_supertype(self, subtype, types):
-        """
-        Finds the most similar supertype for a given subtype using Jaccard similarity.
-
-        @param subtype: The subtype for which the closest supertype is being searched.
-        @param types: A list of all available types to search for potential supertypes.
-        @return: The most similar supertype to the provided subtype.
-        """
-        best_similarity = -1
-        best_supertype = None
-        for supertype_name in subtype.supertypes:
-            supertype = next((t for t in types if t.name == supertype_name), None)
-            if supertype:
-                similarity = subtype.jaccard_similarity(supertype)
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_supertype = supertype
-        return best_supertype
-
-    def _merge_with_supertype(self, subtype, supertype, types):
-        """
-       Merges a subtype into its supertype and updates relationships in the types list.
-
-       @param subtype: The type to be merged into the supertype.
-       @param supertype: The supertype into which the subtype is being merged.
-       @param types: A list of all available types, which will be updated during merging.
-       """
-        subtype.merge_into_other_type(supertype)
-        types.remove(subtype)
-        for type_ in types:
-            if subtype.name in type_.supertypes:
-                type_.supertypes.remove(subtype.name)
-                type_.supertypes.add(supertype.name)
-            if subtype.name in type_.subtypes:
-                type_.subtypes.remove(subtype.name)
-
     def _merge_types(self, types):
         """
         Recursively looks for the most similar super/subtype relation in the types list. Merges until a pair
         of subtype and supertype is found where the similarity is not greater than the specified threshold for merging.
+        The pairs are kept in a SupertypeMergeQueue, so only the pairs touched by a merge are compared again.
 
         @param types: A list of all types to be merged.
         @return: A list of merged types.
         """
+        merge_queue = SupertypeMergeQueue(types)
         while True:
-            best_similarity = 0
-            best_pair = None
-
-            for type_ in types:
-                for supertype_name in type_.supertypes:
-                    supertype = next((t for t in types if t.name == supertype_name), None)
-                    if supertype:
-                        similarity = type_.jaccard_similarity(supertype)
-                        if similarity > best_similarity:
-                            best_similarity = similarity
-                            best_pair = (type_, supertype)
-
-            if best_pair is None or best_similarity < self.config.get("merge_threshold"):
+            best_pair = merge_queue.best_pair()
+            if best_pair is None:
                 break
 
-            subtype, supertype = best_pair
+            best_similarity, subtype, supertype = best_pair
+            if best_similarity <= 0 or best_similarity < self.config.get("merge_threshold"):
+                break
 
-            self._merge_with_supertype(subtype, supertype, types)
+            merge_queue.merge(subtype, supertype)
 
+        types[:] = [type_ for type_ in types if type_ in merge_queue]
         return types
 
-    def _find_most_similar_pair(self, types):
-        """
-        Finds the two most similar types based on Jaccard similarity.
-
-        @param types: A list of all available types to compare.
-        @return: A tuple containing the two most similar types.
-        """
-        best_similarity = -1
-        best_pair = (None, None)
-        for i in range(len(types)):
-            for j in range(i + 1, len(types)):
-                similarity = types[i].jaccard_similarity(types[j])
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_pair = (types[i], types[j])
-        return best_pair
-
     def _max_types_merge(self, types):
         """
         Merges types until the number of types is reduced to the maximum allowed,
@@ -395,63 +337,157 @@ class TypeExtractor:
             max_types = self.config.get("max_edge_types")
 
 
-        while len(types) > max_types:
-            types_without_subtypes = [t for t in types if not t.subtypes]
-
-            all_without_supertypes = all(not t.supertypes for t in types_without_subtypes)
-
-            if types_without_subtypes and not all_without_supertypes:
-                type_to_merge = None
-                best_supertype = None
-                best_similarity = -1
-
-                for type_ in reversed(types_without_subtypes):
-                    supertype = self._find_most_similar_supertype(type_, types)
-                    if supertype:
-                        similarity = type_.jaccard_similarity(supertype)
-                        if similarity > best_similarity:
-                            best_similarity = similarity
-                            type_to_merge = type_
-                            best_supertype = supertype
-                self._merge_with_supertype(type_to_merge, best_supertype, types)
-
-            else:
-                type1, type2 = self._find_most_similar_pair(types)
+        # Subtypes without subtypes are merged into their most similar supertype first, the leaf with the most
+        # similar supertype and, among equally similar ones, the last leaf in list order at a time
+        merge_queue = SupertypeMergeQueue(types, leaves_only=True, prefer_last=True)
+        while len(merge_queue) > max_types:
+            best_pair = merge_queue.best_pair()
+            if best_pair is None:
+                break
+            _, subtype, supertype = best_pair
+            merge_queue.merge(subtype, supertype)
+        types[:] = [type_ for type_ in types if type_ in merge_queue]
+
+        # Once no leaf has a supertype, the most similar pair of types is merged
+        if len(types) > max_types:
+            pair_index = MostSimilarPairIndex(types)
+            while len(types) > max_types:
+                type1, type2 = pair_index.most_similar_pair()
                 type1.merge_into_other_type(type2)
                 types.remove(type1)
                 type2.supertypes.clear()
                 type2.subtypes.clear()
+                pair_index.merge(type1, type2)
 
         return types
 
     def _find_and_create_abstract_types(self, types):
         """
         Finds and creates abstract types by identifying pairs of types with high similarity
-        and merging their common features into a new abstract type.
+        and merging their common features into a new abstract type. From abstract_type_lsh_min_types types on, only
+        the candidate pairs found by MinHash LSH are compared instead of all pairs.
 
         @param types: A list of all available types from which abstract types are created.
         """
-        created_abstract_types = []
-        supertypes_map = defaultdict(set)
-        type_dict = {type_.name: type_ for type_ in types}
-        for type_ in types:
-            supertypes_map[type_] = type_.get_all_supertypes(type_dict)
-
-        for i in range(len(types)):
-            for j in range(i + 1, len(types)):
-                type1 = types[i]
-                type2 = types[j]
+        hierarchy = TypeHierarchy(types)
 
-                if (type2.name not in supertypes_map[type1] and
-                        type1.name not in supertypes_map[type2]):
+        threshold = self.config.get("abstract_type_threshold")
+        lsh = None
+        min_lsh_types = self.config.get("abstract_type_lsh_min_types", 5000)
+        if 0 < min_lsh_types <= len(types):
+            lsh = MinHashLSH(threshold, self.config.get("abstract_type_lsh_permutations", 128))
+        if lsh and lsh.banding:
+            candidate_pairs = lsh.candidate_pairs([self._feature_set(type_) for type_ in types])
+            created_abstract_types = self._create_candidate_abstract_types(types, candidate_pairs, hierarchy, threshold)
+        else:
+            created_abstract_types = self._create_all_abstract_types(types, hierarchy, threshold)
 
-                    similarity = type1.jaccard_similarity(type2)
+        types.extend(created_abstract_types)
 
-                    if similarity >= self.config.get("abstract_type_threshold"):
-                        abstract_type = self._create_abstract_type(type1, type2)
-                        created_abstract_types.append(abstract_type)
+    def _create_all_abstract_types(self, types, hierarchy, threshold):
+        """
+        Compares all pairs of types that are not related and creates an abstract type for every pair whose similarity
+        reaches the threshold, in the order of the pairs.
 
-        types.extend(created_abstract_types)
+        @param types: A list of all available types.
+        @param hierarchy: A TypeHierarchy of the types before any abstract type was created.
+        @param threshold: The minimum similarity of a pair.
+        @return: A list of the created abstract types.
+        """
+        created_abstract_types = []
+        features = TypeFeatureMatrix(types)
+        for rows, block in features.similarity_blocks():
+            # Creating an abstract type removes the shared features from both types, so the similarities of the
+            # types changed since the block was computed are recomputed before they are compared
+            changed = set()
+            for i, similarities in zip(rows.tolist(), block):
+                if i in changed:
+                    similarities = features.similarities([i], range(len(types)))[0]
+                elif changed:
+                    changed_columns = sorted(changed)
+                    similarities[changed_columns] = features.similarities([i], changed_columns)[0]
+
+                candidates = np.flatnonzero(similarities[i + 1:] >= threshold) + i + 1
+                while len(candidates):
+                    j = int(candidates[0])
+                    type1 = types[i]
+                    type2 = types[j]
+                    if (hierarchy.is_ancestor(type2.name, type1.name) or
+                            hierarchy.is_ancestor(type1.name, type2.name)):
+                        candidates = candidates[1:]
+                        continue
+
+                    abstract_type = self._create_abstract_type(type1, type2)
+                    created_abstract_types.append(abstract_type)
+                    features.update(i)
+                    features.update(j)
+                    changed.update((i, j))
+                    similarities = features.similarities([i], range(len(types)))[0]
+                    candidates = np.flatnonzero(similarities[j + 1:] >= threshold) + j + 1
+
+        return created_abstract_types
+
+    def _create_candidate_abstract_types(self, types, candidate_pairs, hierarchy, threshold):
+        """
+        Compares only the candidate pairs of types, in the order of the pairs, and creates an abstract type for every
+        pair that is not related and whose similarity reaches the threshold.
+
+        @param types: A list of all available types.
+        @param candidate_pairs: A sorted list of tuples of type positions, see MinHashLSH.candidate_pairs.
+        @param hierarchy: A TypeHierarchy of the types before any abstract type was created.
+        @param threshold: The minimum similarity of a pair.
+        @return: A list of the created abstract types.
+        """
+        created_abstract_types = []
+        unrelated_pairs = [(i, j) for i, j in candidate_pairs
+                           if not hierarchy.is_ancestor(types[j].name, types[i].name) and
+                           not hierarchy.is_ancestor(types[i].name, types[j].name)]
+        if not unrelated_pairs:
+            return created_abstract_types
+        rows, columns = (np.array(positions, dtype=np.intp) for positions in zip(*unrelated_pairs))
+        features = TypeFeatureMatrix(types)
+        similarities = features.pair_similarities(rows, columns)
+
+        # The pairs of every type, to recompute them once the type changed by the creation of an abstract type
+        endpoints = np.concatenate((rows, columns))
+        order = np.argsort(endpoints, kind='stable')
+        pairs_of_type = np.concatenate((np.arange(len(rows)), np.arange(len(rows))))[order]
+        type_starts = np.searchsorted(endpoints[order], np.arange(len(types) + 1))
+
+        # Positions of the pairs reaching the threshold, pushed again when a recomputed pair reaches it
+        pending = np.flatnonzero(similarities >= threshold).tolist()
+        last_position = -1
+        while pending:
+            position = heapq.heappop(pending)
+            if position <= last_position or similarities[position] < threshold:
+                continue
+            last_position = position
+            i, j = int(rows[position]), int(columns[position])
+            created_abstract_types.append(self._create_abstract_type(types[i], types[j]))
+
+            features.update(i)
+            features.update(j)
+            changed = np.concatenate((pairs_of_type[type_starts[i]:type_starts[i + 1]],
+                                      pairs_of_type[type_starts[j]:type_starts[j + 1]]))
+            changed = changed[changed > position]
+            similarities[changed] = features.pair_similarities(rows[changed], columns[changed])
+            for changed_position in changed[similarities[changed] >= threshold].tolist():
+                heapq.heappush(pending, changed_position)
+        return created_abstract_types
+
+    @staticmethod
+    def _feature_set(type_):
+        """
+        Returns the labels, optional labels, properties and optional properties of a type as one set. The Jaccard
+        similarity of the sets of two types is their weighted Jaccard similarity, up to rounding.
+
+        @param type_: A Type object.
+        @return: A set of tuples of the feature category and the feature.
+        """
+        return ({("label", label) for label in type_.labels} |
+                {("optional_label", label) for label in type_.optional_labels} |
+                {("property", key) for key in type_.properties} |
+                {("optional_property", key) for key in type_.optional_properties})
 
     def _create_abstract_type(self, type1, type2):
         """
@@ -528,10 +564,10 @@ class TypeExtractor:
 
                 if start_node_types:
                     for type_ in start_node_types:
-                        edge_type_to_startpoint_types[edge_type.name][type_] += 1
+                        edge_type_to_startpoint_types[edge_type.name][type_] += edge.weight
                 if end_node_types:
                     for type_ in end_node_types:
-                        edge_type_to_endpoint_types[edge_type.name][type_] += 1
+                        edge_type_to_endpoint_types[edge_type.name][type_] += edge.weight
 
         for edge_type in edge_types:
             startpoint_candidates = edge_type_to_startpoint_types[edge_type.name]
@@ -546,12 +582,14 @@ class TypeExtractor:
             )
 
 
-    def _remove_type_outliers(self, types, threshold=1):
+    def _remove_type_outliers(self, types, threshold=1, supports=None):
         """
         Checks if the number of entities that belong to a type are bigger than the outlier threshold.
         If not, the type will be removed.
 
         @param types: A list types.
+        @param supports: An optional dict mapping type names to the number of entities counted instead of the
+                         entities of the type, see _concept_supports.
         """
         type_dict = {t.name: t for t in types}
         types_to_remove = []
@@ -564,7 +602,11 @@ class TypeExtractor:
                 entities = type_.nodes
             if self.extraction_mode == "EDGE":
                 entities = type_.edges
-            if len(entities) < threshold:
+            if supports is not None:
+                count = supports[type_.name]
+            else:
+                count = self.graph_data.count_elements(entities, self.extraction_mode)
+            if count < threshold:
                 for supertype_name in type_.supertypes:
                     if supertype_name in type_dict:
                         type_dict[supertype_name].subtypes.update(type_.subtypes)
@@ -623,7 +665,7 @@ class TypeExtractor:
         @param edge_types: A list of edge types to validate.
         """
         type_dict = {type_.name: type_ for type_ in edge_types}
-        node_type_dict = {node_type.name: node_type for node_type in self.graph_type.node_types}
+        node_hierarchy = TypeHierarchy(self.graph_type.node_types)
 
         for edge_type in edge_types:
             invalid_supertypes = set()
@@ -634,11 +676,9 @@ class TypeExtractor:
 
                 for start_node_type in edge_type.start_node_types:
 
-                    start_node_obj = node_type_dict[start_node_type]
-
                     if not any(
                             (start_node_type == super_start_node or
-                             start_node_obj in self._get_all_subtypes(node_type_dict[super_start_node], node_type_dict))
+                             node_hierarchy.is_descendant(start_node_type, super_start_node))
                             for super_start_node in supertype.start_node_types
                     ):
                         invalid_supertypes.add(supertype_name)
@@ -646,11 +686,9 @@ class TypeExtractor:
 
                 for end_node_type in edge_type.end_node_types:
 
-                    end_node_obj = node_type_dict[end_node_type]
-
                     if not any(
                             (end_node_type == super_end_node or
-                             end_node_obj in self._get_all_subtypes(node_type_dict[super_end_node], node_type_dict))
+                             node_hierarchy.is_descendant(end_node_type, super_end_node))
                             for super_end_node in supertype.end_node_types
                     ):
                         invalid_supertypes.add(supertype_name)
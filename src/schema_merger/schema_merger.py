@@ -1,4 +1,8 @@
+import numpy as np
+
 from src.graph_type.type import Type
+from src.graph_type.type_hierarchy import TypeHierarchy
+from src.graph_type.type_similarity import TypeFeatureMatrix
 
 
 class SchemaMerger:
@@ -35,12 +39,14 @@ class SchemaMerger:
         self.check_and_update_supertype_relations(self.edge_types)
 
         node_type_dict = {type_.name: type_ for type_ in self.node_types}
+        node_hierarchy = TypeHierarchy(self.node_types)
         for type_ in self.node_types:
-            type_.remove_inherited_features(node_type_dict)
+            type_.remove_inherited_features(node_type_dict, node_hierarchy)
 
         edge_type_dict = {type_.name: type_ for type_ in self.edge_types}
+        edge_hierarchy = TypeHierarchy(self.edge_types)
         for type_ in self.edge_types:
-            type_.remove_inherited_features(edge_type_dict)
+            type_.remove_inherited_features(edge_type_dict, edge_hierarchy)
 
         return self.node_types, self.edge_types
 
@@ -52,9 +58,10 @@ class SchemaMerger:
         @param edge_types: List of EdgeTypes.
         """
         type_dict = {type_obj.name: type_obj for type_obj in node_types + edge_types}
+        hierarchy = TypeHierarchy(node_types + edge_types)
 
         for type_obj in node_types + edge_types:
-            supertypes = type_obj.get_all_supertypes(type_dict)
+            supertypes = hierarchy.ancestors(type_obj.name)
             for supertype_name in supertypes:
                 supertype = type_dict.get(supertype_name)
                 if supertype:
@@ -72,14 +79,12 @@ class SchemaMerger:
                         type_obj.start_node_types.update(supertype.start_node_types)
                         type_obj.end_node_types.update(supertype.end_node_types)
 
-        type_dict = {type_.name: type_ for type_ in node_types}
+        node_hierarchy = TypeHierarchy(node_types)
         for edge in edge_types:
             for node_name in list(edge.start_node_types):
-                subtypes = type_dict.get(node_name).get_all_subtypes(type_dict)
-                edge.start_node_types.update(subtypes)
+                edge.start_node_types.update(node_hierarchy.descendants(node_name))
             for node_name in list(edge.end_node_types):
-                subtypes = type_dict.get(node_name).get_all_subtypes(type_dict)
-                edge.end_node_types.update(subtypes)
+                edge.end_node_types.update(node_hierarchy.descendants(node_name))
 
     def _merge_types(self, original_types, new_types, type_entity):
         """
@@ -92,20 +97,27 @@ class SchemaMerger:
         """
         merged_types = []
 
-        for o_type in original_types:
+        candidates = [n_type for n_type in new_types if not n_type.is_abstract]
+        available = np.ones(len(candidates), dtype=bool)
+        features = TypeFeatureMatrix(original_types + candidates)
+        blocks = features.similarity_blocks(range(len(original_types)),
+                                            range(len(original_types), len(original_types) + len(candidates)))
+        rows = (similarities for _, block in blocks for similarities in block)
+
+        for o_type, similarities in zip(original_types, rows):
             if o_type.is_abstract:
                 merged_types.append(o_type)
                 self.type_mapping[o_type.name] = o_type.name
                 continue
             best_match = None
-            best_similarity = 0
-            for n_type in new_types:
-                if n_type.is_abstract:
-                    continue
-                similarity = o_type.jaccard_similarity(n_type)
-                if similarity > self.config.get("schema_merge_threshold") and similarity > best_similarity:
-                    best_match = n_type
-                    best_similarity = similarity
+            # The first of the most similar new types that are not merged yet, as long as it exceeds the threshold
+            similarities = np.where(available & (similarities > self.config.get("schema_merge_threshold")),
+                                    similarities, 0)
+            if available.any():
+                best_index = int(np.argmax(similarities))
+                if similarities[best_index] > 0:
+                    best_match = candidates[best_index]
+                    available[best_index] = False
             if best_match:
                 merged_type = self._merge_two_types(o_type, best_match, type_entity)
                 merged_types.append(merged_type)
@@ -209,6 +221,7 @@ class SchemaMerger:
         @param types_list: A list of Type instances to validate.
         """
         type_dict = {t.name: t for t in types_list}
+        node_hierarchy = TypeHierarchy(self.node_types)
 
         for type_ in types_list:
             valid_supertypes = set()
@@ -229,16 +242,11 @@ class SchemaMerger:
 
                 valid_end_nodes = True
                 if type_.entity == "EDGE":
-                    node_type_dict = {node_type.name: node_type for node_type in self.node_types}
-
                     for start_node_type in type_.start_node_types:
 
-                        start_node_obj = node_type_dict[start_node_type]
-
                         if not any(
                                 (start_node_type == super_start_node or
-                                 start_node_obj in self._get_all_subtypes(node_type_dict[super_start_node],
-                                                                          node_type_dict))
+                                 node_hierarchy.is_descendant(start_node_type, super_start_node))
                                 for super_start_node in supertype.start_node_types
                         ):
                             valid_end_nodes = False
@@ -246,11 +254,9 @@ class SchemaMerger:
 
                     for end_node_type in type_.end_node_types:
 
-                        end_node_obj = node_type_dict[end_node_type]
-
                         if not any(
                                 (end_node_type == super_end_node or
-                                 end_node_obj in self._get_all_subtypes(node_type_dict[super_end_node], node_type_dict))
+                                 node_hierarchy.is_descendant(end_node_type, super_end_node))
                                 for super_end_node in supertype.end_node_types
                         ):
                             valid_end_nodes = False
@@ -296,18 +302,3 @@ class SchemaMerger:
                     type_b.supertypes.add(type_a.name)
                 if is_b_supertype_of_a:
                     type_a.supertypes.add(type_b.name)
-
-    def _get_all_subtypes(self, type_obj, type_dict):
-        """
-        Recursively retrieves all transitive subtypes for a given Type instance.
-
-        @param type_obj: The Type instance for which to find subtypes.
-        @param type_dict: A dictionary mapping type names to Type instances.
-        @return: A set of all subtypes.
-        """
-        all_subtypes = set(type_obj.subtypes)
-        for subtype_name in type_obj.subtypes:
-            if subtype_name in type_dict:
-                subtype = type_dict[subtype_name]
-                all_subtypes.update(self._get_all_subtypes(subtype, type_dict))
-        return all_subtypes
\ No newline at end of file
@@ -72,12 +72,12 @@ class Validator:
         if not node_type.open_properties and extra_properties:
             return False
 
-        for prop, value in node.properties.items():
+        for prop in node.properties:
             expected_data_type = self.graph_data.node_property_data_types.get(prop)
             if expected_data_type is None:
                 continue
 
-            actual_data_type = self.graph_data.infer_data_type(value)
+            actual_data_type = self.graph_data.get_property_data_type(node, prop)
 
             if actual_data_type != expected_data_type:
                 return False
@@ -116,12 +116,12 @@ class Validator:
         if not edge_type.open_properties and extra_properties:
             return False
 
-        for prop, value in edge.properties.items():
+        for prop in edge.properties:
             expected_data_type = self.graph_data.edge_property_data_types.get(prop)
             if expected_data_type is None:
                 continue
 
-            actual_data_type = self.graph_data.infer_data_type(value)
+            actual_data_type = self.graph_data.get_property_data_type(edge, prop)
 
             if actual_data_type != expected_data_type:
                 return False
@@ -0,0 +1,49 @@
+import json
+import logging
+
+import pytest
+
+pytest.importorskip("fcapy")
+pytest.importorskip("bitarray")
+pytest.importorskip("pyroaring")
+pytest.importorskip("matplotlib")
+
+from src.fca.fca_helper import FCAHelper
+from src.graph_data.graph_data import GraphData, Node
+
+
+class DictConfig:
+    """
+    Minimal stand-in for Config, backed by a flat dict.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+
+    def get(self, key, default=None):
+        return self.config.get(key, default)
+
+
+def make_graph_data():
+    graph_data = GraphData()
+    labels = [["Person"], ["Person"], ["Person", "Student"], ["Person", "Student"], ["Person", "Student"], ["Course"]]
+    for node_id, node_labels in enumerate(labels):
+        graph_data.add_node(Node(node_id, node_labels, {"name": f"n{node_id}"}))
+    return graph_data
+
+
+@pytest.mark.parametrize("signature_context", [False, True])
+def test_top_concept_extent_size_counts_nodes(tmp_path, signature_context):
+    graph_data = make_graph_data()
+    config = DictConfig({
+        "out_dir": f"{tmp_path}/",
+        "node_type_extraction": "label_based",
+        "signature_context": signature_context,
+        "lattice_visualization": "json",
+    })
+    fca_helper = FCAHelper(config)
+    fca_helper.generate_node_concept_lattice(graph_data)
+
+    with open(tmp_path / "node_concept_lattice.json") as file:
+        concepts = json.load(file)["concepts"]
+    assert concepts[0]["extent_size"] == len(graph_data.nodes)
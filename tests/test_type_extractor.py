@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pyroaring")
+
+from src.graph_type.graph_type import GraphType
+from src.graph_type.type import Type
+from src.schema_inference.type_extractor import TypeExtractor
+
+
+def make_type(concept_id, entity, supertypes=(), subtypes=()):
+    return Type({}, concept_id, [], {}, supertypes, subtypes, entity)
+
+
+def test_edge_supertype_kept_for_node_subtype_endpoints():
+    person = make_type(0, "NODE", subtypes=["NodeType1"])
+    student = make_type(1, "NODE", supertypes=["NodeType0"])
+    course = make_type(2, "NODE")
+    graph_type = GraphType({})
+    graph_type.node_types = [person, student, course]
+
+    knows = make_type(0, "EDGE", subtypes=["EdgeType1", "EdgeType2"])
+    knows.start_node_types = {person.name}
+    knows.end_node_types = {person.name}
+    # The start node type is a subtype of the start node type of the supertype
+    studies_with = make_type(1, "EDGE", supertypes=[knows.name])
+    studies_with.start_node_types = {student.name}
+    studies_with.end_node_types = {person.name}
+    # The start node type is unrelated to the start node type of the supertype
+    attends = make_type(2, "EDGE", supertypes=[knows.name])
+    attends.start_node_types = {course.name}
+    attends.end_node_types = {person.name}
+
+    type_extractor = TypeExtractor({}, None, None, graph_type, "EDGE")
+    type_extractor._check_edge_type_supertype_relations([knows, studies_with, attends])
+
+    assert studies_with.supertypes == {knows.name}
+    assert attends.supertypes == set()